@@ -1,3 +1,33 @@
 from django.contrib import admin
+from django.urls import reverse
+from django.utils.html import format_html
+from .models import RequestProfile
+from .profiling import profile_summary
 
-# Register your models here.
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'method', 'path', 'view_name', 'duration_ms', 'function_calls', 'trigger', 'status_code', 'streamed', 'download']
+    list_filter = ['trigger', 'streamed', 'view_name']
+    search_fields = ['path', 'view_name']
+    date_hierarchy = 'created_at'
+    fields = ['created_at', 'user', 'method', 'path', 'view_name', 'status_code', 'trigger', 'duration_ms', 'overhead_ms', 'function_calls', 'streamed', 'download', 'summary']
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def download(self, obj):
+        return format_html('<a href="{}">.prof</a>', reverse('download_profile', args=[obj.id]))
+
+    def summary(self, obj):
+        # Top functions by cumulative time, as printed by pstats
+        summary = format_html('<pre>{}</pre>', profile_summary(obj) or 'Profile file is missing')
+        if obj.streamed:
+            return format_html(
+                '<p>Streamed response: only the view is profiled, not the body sent after it returned.</p>{}', summary
+            )
+        return summary
@@ -0,0 +1,108 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.utils import timezone
+from .models import SocialAccount, Post
+from .search import create_search_index, drop_search_index
+
+ALIAS = 'benchmark'
+POST_TYPES = ['reel', 'carousel', 'static', 'video', 'photo', 'story']
+CAPTION_WORDS = (
+    "new launch product behind scenes tips tricks sunday vibes travel food fitness coffee "
+    "morning sale giveaway collab project team summer winter style recipe workout weekend "
+    "motivation success business design music art nature city family friends update"
+).split()
+INSERT_CHUNK = 50000
+
+
+@contextmanager
+def benchmark_database(path=None, keep=False, log=print):
+    # Registers a throwaway, fully migrated SQLite database under ALIAS
+    db_path = path or os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')
+    connections.databases[ALIAS] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': db_path,
+    }
+    # Drop any connection left over from an earlier benchmark database
+    if hasattr(connections._connections, ALIAS):
+        del connections[ALIAS]
+    try:
+        log(f"Migrating {db_path}")
+        call_command('migrate', database=ALIAS, verbosity=0)
+        yield db_path
+    finally:
+        connections[ALIAS].close()
+        del connections[ALIAS]
+        if not keep and not path:
+            os.remove(db_path)
+
+
+def seed_posts(post_count, account_count, users_per_account=5, days=365, seed=42):
+    # Raw executemany keeps million-row seeds to seconds rather than minutes
+    now = timezone.now()
+    user_count = max(1, account_count // users_per_account)
+    rng = random.Random(seed)
+
+    User.objects.using(ALIAS).bulk_create([
+        User(username=f"bench{i}", password="!") for i in range(user_count)
+    ])
+    users = list(User.objects.using(ALIAS).order_by('id'))
+
+    SocialAccount.objects.using(ALIAS).bulk_create([
+        SocialAccount(
+            user=users[i % user_count],
+            platform='instagram',
+            username=f"bench{i}",
+            followers_count=rng.randint(1000, 100000),
+        )
+        for i in range(account_count)
+    ])
+    account_ids = list(SocialAccount.objects.using(ALIAS).order_by('id').values_list('id', flat=True))
+
+    columns = [
+        'account_id', 'post_id', 'post_type', 'caption', 'url', 'likes', 'comments', 'shares',
+        'views', 'reach', 'engagement_rate', 'posted_at', 'created_at', 'updated_at',
+    ]
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        Post._meta.db_table, ', '.join(columns), ', '.join(['%s'] * len(columns))
+    )
+
+    stamp = now.strftime('%Y-%m-%d %H:%M:%S')
+    # Index captions once at the end rather than row by row through the triggers
+    with connections[ALIAS].schema_editor() as editor:
+        drop_search_index(editor)
+
+    with transaction.atomic(using=ALIAS), connections[ALIAS].cursor() as cursor:
+        for start in range(0, post_count, INSERT_CHUNK):
+            rows = []
+            for i in range(start, min(start + INSERT_CHUNK, post_count)):
+                likes = int(rng.paretovariate(1.5) * 50)
+                posted_at = now - timedelta(minutes=rng.randint(0, days * 24 * 60))
+                caption = " ".join(rng.choices(CAPTION_WORDS, k=8)) + f" #{rng.choice(CAPTION_WORDS)}"
+                rows.append((
+                    account_ids[i % account_count], f"p{i}", rng.choice(POST_TYPES), caption, "https://example.com",
+                    likes, likes // 20, likes // 50, likes * 5, likes * 4, rng.uniform(0, 15),
+                    posted_at.strftime('%Y-%m-%d %H:%M:%S.%f'), stamp, stamp,
+                ))
+            cursor.executemany(sql, rows)
+
+    with connections[ALIAS].schema_editor() as editor:
+        create_search_index(editor)
+
+    return users, account_ids
+
+
+def median_ms(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
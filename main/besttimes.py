@@ -0,0 +1,168 @@
+from collections import Counter, defaultdict
+from django.db import transaction
+from django.db.models import Sum, Count
+from django.db.models.functions import ExtractIsoWeekDay, ExtractHour
+from django.utils import timezone
+from .models import Post, BestTimeToPost, SocialAccount, audience_tz
+
+BEST_TIMES_PER_ACCOUNT = 5
+
+
+def posting_slot(posted_at, tzinfo=None):
+    # Same (weekday, hour) bucket the grouped query produces: Monday is 0
+    if timezone.is_naive(posted_at):
+        posted_at = timezone.make_aware(posted_at)
+    posted_at = timezone.localtime(posted_at, tzinfo)
+    return posted_at.weekday(), posted_at.hour
+
+
+def engagement_key(engagement_rate):
+    # Slots count posts per rate at the precision rates are shown at, which keeps the
+    # distribution small however many posts a slot has
+    return f"{engagement_rate or 0:.2f}"
+
+
+def merge_counts(counts, change):
+    merged = Counter(counts)
+    merged.update(change)
+    return {key: count for key, count in merged.items() if count > 0}
+
+
+def recompute_best_times(accounts=None):
+    # Full rebuild with one grouped query per audience timezone (usually just one);
+    # incremental updates go through apply_best_time_deltas
+    if accounts is None:
+        accounts = SocialAccount.objects.all()
+    accounts = list(accounts)
+    existing = BestTimeToPost.objects.filter(account__in=accounts)
+    zones = {account.audience_timezone for account in accounts}
+
+    slots = {}
+    for zone in zones:
+        tzinfo = audience_tz(zone)
+        # Grouped by rate as well, so each slot's distribution comes from the same read
+        rows = Post.objects.filter(
+            account__in=accounts,
+            account__audience_timezone=zone
+        ).annotate(
+            weekday=ExtractIsoWeekDay('posted_at', tzinfo=tzinfo),
+            slot_hour=ExtractHour('posted_at', tzinfo=tzinfo),
+        ).values('account_id', 'weekday', 'slot_hour', 'engagement_rate').annotate(
+            post_count=Count('id'),
+            engagement_sum=Sum('engagement_rate'),
+        ).order_by()
+
+        for row in rows:
+            key = (row['account_id'], row['weekday'] - 1, row['slot_hour'])
+            slot = slots.get(key)
+            if slot is None:
+                slot = slots[key] = BestTimeToPost(
+                    account_id=key[0], day_of_week=key[1], hour=key[2],
+                    post_count=0, engagement_sum=0, engagement_counts={},
+                )
+            slot.post_count += row['post_count']
+            slot.engagement_sum += row['engagement_sum'] or 0
+            key = engagement_key(row['engagement_rate'])
+            slot.engagement_counts[key] = slot.engagement_counts.get(key, 0) + row['post_count']
+
+    for slot in slots.values():
+        slot.avg_engagement = slot.engagement_sum / slot.post_count
+
+    with transaction.atomic():
+        existing.delete()
+        BestTimeToPost.objects.bulk_create(slots.values(), batch_size=500)
+
+    return len(slots)
+
+
+def apply_best_time_deltas(account, deltas):
+    # deltas maps (day_of_week, hour) -> [engagement_sum change, post_count change,
+    # Counter of per-rate count changes]
+    deltas = {slot: change for slot, change in deltas.items() if change[0] or change[1] or any(change[2].values())}
+    if not deltas:
+        return
+
+    days = {day for day, _ in deltas}
+    hours = {hour for _, hour in deltas}
+
+    with transaction.atomic():
+        existing = {
+            (slot.day_of_week, slot.hour): slot
+            for slot in BestTimeToPost.objects.select_for_update().filter(
+                account=account,
+                day_of_week__in=days,
+                hour__in=hours
+            )
+        }
+
+        to_create = []
+        to_update = []
+        to_delete = []
+        for (day, hour), (engagement, count, rates) in deltas.items():
+            slot = existing.get((day, hour))
+            if slot is None:
+                slot = BestTimeToPost(account=account, day_of_week=day, hour=hour, post_count=0, engagement_sum=0)
+
+            slot.post_count += count
+            slot.engagement_sum += engagement
+            if slot.post_count <= 0:
+                if slot.id:
+                    to_delete.append(slot.id)
+                continue
+
+            slot.avg_engagement = slot.engagement_sum / slot.post_count
+            slot.engagement_counts = merge_counts(slot.engagement_counts, rates)
+            if slot.id:
+                to_update.append(slot)
+            else:
+                to_create.append(slot)
+
+        if to_delete:
+            BestTimeToPost.objects.filter(id__in=to_delete).delete()
+        BestTimeToPost.objects.bulk_create(to_create)
+        if to_update:
+            BestTimeToPost.objects.bulk_update(to_update, ['post_count', 'engagement_sum', 'avg_engagement', 'engagement_counts'])
+
+
+class BestTimeTracker:
+    # Accumulates per-slot changes while posts are written, then applies them in one pass
+
+    def __init__(self, tzinfo=None):
+        self.tzinfo = tzinfo
+        self.deltas = defaultdict(lambda: [0.0, 0, Counter()])
+
+    def remove(self, posted_at, engagement_rate):
+        if posted_at is None:
+            return
+        change = self.deltas[posting_slot(posted_at, self.tzinfo)]
+        change[0] -= engagement_rate or 0
+        change[1] -= 1
+        change[2][engagement_key(engagement_rate)] -= 1
+
+    def add(self, posted_at, engagement_rate):
+        if posted_at is None:
+            return
+        change = self.deltas[posting_slot(posted_at, self.tzinfo)]
+        change[0] += engagement_rate or 0
+        change[1] += 1
+        change[2][engagement_key(engagement_rate)] += 1
+
+    def apply(self, account):
+        apply_best_time_deltas(account, self.deltas)
+        self.deltas.clear()
+
+
+def best_times_for_user(user, per_account=BEST_TIMES_PER_ACCOUNT):
+    # Every account is listed, with no times until it has posts. One read of the slots,
+    # ordered by the (account, -avg_engagement) index; the distributions are left behind.
+    slots = BestTimeToPost.objects.filter(
+        account__user=user
+    ).defer('engagement_counts').order_by('account_id', '-avg_engagement', 'day_of_week', 'hour')
+
+    best_times = [{'account': account, 'times': []} for account in SocialAccount.objects.filter(user=user)]
+    times = {item['account'].id: item['times'] for item in best_times}
+    for slot in slots:
+        account_times = times.get(slot.account_id)
+        if account_times is not None and len(account_times) < per_account:
+            account_times.append(slot)
+    return best_times
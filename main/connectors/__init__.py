@@ -0,0 +1,37 @@
+from importlib import import_module
+from django.conf import settings
+
+# Dotted paths only; a connector module is imported the first time its platform is used
+CONNECTORS = {
+    'instagram': 'main.connectors.instagram.InstagramConnector',
+    'twitter': 'main.connectors.sample.SampleConnector',
+    'facebook': 'main.connectors.sample.SampleConnector',
+    'youtube': 'main.connectors.sample.SampleConnector',
+    'tiktok': 'main.connectors.sample.SampleConnector',
+}
+
+_loaded = {}
+
+
+class UnsupportedPlatform(Exception):
+    pass
+
+
+def connector_paths():
+    return {**CONNECTORS, **getattr(settings, 'SOCIAL_CONNECTORS', {})}
+
+
+def available_platforms():
+    return list(connector_paths())
+
+
+def get_connector(platform):
+    connector = _loaded.get(platform)
+    if connector is None:
+        path = connector_paths().get(platform)
+        if path is None:
+            raise UnsupportedPlatform(f"No connector registered for {platform!r}")
+        module_path, class_name = path.rsplit('.', 1)
+        connector = getattr(import_module(module_path), class_name)(platform)
+        _loaded[platform] = connector
+    return connector
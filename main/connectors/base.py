@@ -0,0 +1,26 @@
+POST_BATCH_SIZE = 50
+
+
+def batched(records, size=POST_BATCH_SIZE):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Connector:
+    # fetch() must not touch the database; it returns
+    #   {"followers_count", "following_count", "posts_count",
+    #    "batches": [[(post_id, fields), ...], ...], "newest": (posted_at, post_id) or None}
+    # where fields are Post field values ready for PostBatchWriter.add().
+    live = True
+
+    def __init__(self, platform):
+        self.platform = platform
+
+    def fetch(self, username, last_post_at=None, last_post_shortcode="", limiter=None):
+        raise NotImplementedError
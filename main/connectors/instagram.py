@@ -0,0 +1,16 @@
+from .base import Connector, batched
+
+
+class InstagramConnector(Connector):
+
+    def fetch(self, username, last_post_at=None, last_post_shortcode="", limiter=None):
+        from main.insta import fetch_instagram_account
+
+        result = fetch_instagram_account(
+            username,
+            last_post_at=last_post_at,
+            last_post_shortcode=last_post_shortcode,
+            limiter=limiter,
+        )
+        result["batches"] = list(batched(result.pop("posts")))
+        return result
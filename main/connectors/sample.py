@@ -0,0 +1,50 @@
+import random
+from datetime import timedelta
+from django.utils import timezone
+from .base import Connector
+
+SAMPLE_POST_TYPES = ['photo', 'video', 'carousel']
+
+SAMPLE_CAPTIONS = [
+    "Check out our latest product! 🚀",
+    "Behind the scenes content 🎬",
+    "Thank you for all the support! ❤️",
+    "New blog post is live! 📝",
+    "Weekend vibes ✨",
+    "Excited to announce... 🎉",
+    "Throwback to this amazing moment 📸",
+    "Stay tuned for more updates! 👀",
+    "Loving this community! 🙌",
+    "What's your favorite? Comment below! 💬"
+]
+
+
+class SampleConnector(Connector):
+    # Platforms without a real API integration get random demo data
+    live = False
+
+    def fetch(self, username, last_post_at=None, last_post_shortcode="", limiter=None, count=15):
+        posts = []
+        for i in range(count):
+            posts.append((
+                f"{self.platform}_{username}_{i}_{random.randint(1000, 9999)}",
+                {
+                    "post_type": random.choice(SAMPLE_POST_TYPES),
+                    "caption": random.choice(SAMPLE_CAPTIONS),
+                    "likes": random.randint(100, 10000),
+                    "comments": random.randint(10, 500),
+                    "shares": random.randint(5, 200),
+                    "views": random.randint(1000, 50000) if random.choice([True, False]) else 0,
+                    "engagement_rate": round(random.uniform(3, 15), 2),
+                    "posted_at": timezone.now() - timedelta(days=random.randint(1, 60)),
+                    "url": f"https://{self.platform}.com/p/{random.randint(100000, 999999)}",
+                }
+            ))
+
+        return {
+            "followers_count": random.randint(1000, 50000),
+            "following_count": 0,
+            "posts_count": count,
+            "batches": [posts],
+            "newest": None,
+        }
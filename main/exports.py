@@ -0,0 +1,336 @@
+import csv
+import io
+import json
+import os
+import shutil
+import zlib
+from datetime import datetime, time, timedelta
+from pathlib import Path
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from .models import ExportJob, Post, PostAnalytics
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_JOB_CHUNK_SIZE = getattr(settings, 'EXPORT_JOB_CHUNK_SIZE', 5000)
+EXPORT_ROOT = Path(getattr(settings, 'EXPORT_ROOT', settings.BASE_DIR / 'exports'))
+# Rows are joined into roughly this many bytes before being handed to the response
+STREAM_BUFFER_SIZE = 64 * 1024
+
+CSV_HEADER = ['Post ID', 'Platform', 'Type', 'Likes', 'Comments', 'Shares', 'Engagement Rate', 'Posted At']
+CSV_FIELDS = ['post_id', 'account__platform', 'post_type', 'likes', 'comments', 'shares', 'engagement_rate', 'posted_at']
+
+
+class InvalidExportFilter(ValueError):
+    pass
+
+
+def parse_day(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise InvalidExportFilter(f"{name} must be a YYYY-MM-DD date")
+
+
+def export_filters(params):
+    # Same filters as the analytics page (platform, post_type, date_range in days),
+    # plus an explicit start/end day range. Everything is optional.
+    filters = {}
+    for name in ('platform', 'post_type'):
+        if params.get(name):
+            filters[name] = params[name]
+    if params.get('date_range'):
+        try:
+            filters['days'] = int(params['date_range'])
+        except ValueError:
+            raise InvalidExportFilter("date_range must be a number of days")
+    for name in ('start', 'end'):
+        if params.get(name):
+            filters[name] = parse_day(params[name], name)
+    return filters
+
+
+def export_posts(user, filters):
+    posts = Post.objects.filter(account__user=user)
+    if 'platform' in filters:
+        posts = posts.filter(account__platform=filters['platform'])
+    if 'post_type' in filters:
+        posts = posts.filter(post_type=filters['post_type'])
+    if 'days' in filters:
+        posts = posts.filter(posted_at__gte=timezone.now() - timedelta(days=filters['days']))
+    if 'start' in filters:
+        posts = posts.filter(posted_at__gte=timezone.make_aware(datetime.combine(filters['start'], time.min)))
+    if 'end' in filters:
+        posts = posts.filter(posted_at__lt=timezone.make_aware(datetime.combine(filters['end'] + timedelta(days=1), time.min)))
+    return posts
+
+
+class LineBuffer:
+    # csv.writer target that hands back each row instead of storing it
+    def write(self, value):
+        return value
+
+
+def csv_lines(posts, chunk_size=EXPORT_CHUNK_SIZE):
+    # Plain tuples straight from the cursor; the platform comes from the join, not per-row queries
+    writer = csv.writer(LineBuffer())
+    yield writer.writerow(CSV_HEADER)
+    rows = posts.order_by('-posted_at', '-id').values_list(*CSV_FIELDS)
+    for post_id, platform, post_type, likes, comments, shares, engagement_rate, posted_at in rows.iterator(chunk_size=chunk_size):
+        yield writer.writerow([
+            post_id,
+            platform,
+            post_type,
+            likes,
+            comments,
+            shares,
+            f"{engagement_rate:.2f}%",
+            posted_at.strftime('%Y-%m-%d %H:%M'),
+        ])
+
+
+def buffered(lines, size=STREAM_BUFFER_SIZE):
+    pending = []
+    pending_size = 0
+    for line in lines:
+        pending.append(line)
+        pending_size += len(line)
+        if pending_size >= size:
+            yield ''.join(pending).encode()
+            pending = []
+            pending_size = 0
+    if pending:
+        yield ''.join(pending).encode()
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_csv(posts, compress=False):
+    chunks = buffered(csv_lines(posts))
+    return gzipped(chunks) if compress else chunks
+
+
+# Background export jobs: full post histories plus PostAnalytics, written to disk in chunks
+
+POST_EXPORT_FIELDS = [
+    'id', 'post_id', 'account__platform', 'account__username', 'post_type', 'caption', 'url',
+    'likes', 'comments', 'shares', 'views', 'reach', 'engagement_rate', 'posted_at', 'updated_at',
+]
+EXPORT_COLUMNS = [
+    'id', 'post_id', 'platform', 'username', 'post_type', 'caption', 'url',
+    'likes', 'comments', 'shares', 'views', 'reach', 'engagement_rate', 'posted_at', 'updated_at',
+    'viral_score', 'sentiment_score',
+]
+EXTENSIONS = {'ndjson': 'ndjson', 'parquet': 'parquet', 'csv': 'csv'}
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def enqueue_export(user, format='ndjson', incremental=False):
+    # Parquet needs pyarrow; without it the job quietly becomes a CSV export
+    if format == 'parquet' and not parquet_available():
+        format = 'csv'
+
+    job = ExportJob.objects.filter(user=user, format=format, status__in=['pending', 'running']).first()
+    if job:
+        return job
+
+    since = None
+    if incremental:
+        last = ExportJob.objects.filter(user=user, status='success').order_by('-until').first()
+        since = last.until if last else None
+    return ExportJob.objects.create(user=user, format=format, since=since, until=timezone.now())
+
+
+def claim_next_export():
+    pending = ExportJob.objects.filter(status='pending').order_by('created_at')
+    for job_id in pending.values_list('id', flat=True)[:10]:
+        # Same conditional-update claim as sync jobs
+        claimed = ExportJob.objects.filter(id=job_id, status='pending').update(
+            status='running',
+            started_at=timezone.now()
+        )
+        if claimed:
+            return ExportJob.objects.select_related('user').get(id=job_id)
+    return None
+
+
+def requeue_stale_exports(older_than, include_failed=False):
+    # Requeued jobs keep their checkpoint and resume where they stopped
+    cutoff = timezone.now() - older_than
+    stale = ExportJob.objects.filter(status='running', started_at__lt=cutoff)
+    requeued = stale.update(status='pending', started_at=None)
+    if include_failed:
+        requeued += ExportJob.objects.filter(status='failed').update(status='pending', started_at=None, error='')
+    return requeued
+
+
+def export_file(job):
+    return EXPORT_ROOT / str(job.user_id) / f"export-{job.id}.{EXTENSIONS[job.format]}"
+
+
+def export_source(job):
+    posts = Post.objects.filter(account__user_id=job.user_id)
+    if job.since is not None:
+        return posts.filter(updated_at__gt=job.since, updated_at__lte=job.until)
+    # A full export is pinned to the posts that existed when it was requested
+    return posts.filter(created_at__lte=job.until)
+
+
+def export_chunk(posts, after_id, size):
+    # Keyset page of posts plus one query for their analytics (the latest row per post)
+    rows = [
+        dict(zip(EXPORT_COLUMNS, values))
+        for values in posts.filter(id__gt=after_id).order_by('id').values_list(*POST_EXPORT_FIELDS)[:size]
+    ]
+    if rows:
+        analytics = {}
+        for post_id, viral_score, sentiment_score in PostAnalytics.objects.filter(
+            post_id__in=[row['id'] for row in rows]
+        ).order_by('id').values_list('post_id', 'viral_score', 'sentiment_score'):
+            analytics[post_id] = (viral_score, sentiment_score)
+        for row in rows:
+            row['viral_score'], row['sentiment_score'] = analytics.get(row['id'], (None, None))
+    return rows
+
+
+def open_checkpointed(path, size):
+    # Anything past the last recorded checkpoint came from an interrupted chunk
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle = open(path, 'r+b' if path.exists() else 'w+b')
+    handle.truncate(size)
+    handle.seek(size)
+    return handle
+
+
+def encode_ndjson(rows, with_header):
+    return ''.join(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in rows).encode()
+
+
+def encode_csv(rows, with_header):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if with_header:
+        writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow([
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in (row[column] for column in EXPORT_COLUMNS)
+        ])
+    return buffer.getvalue().encode()
+
+
+ENCODERS = {'ndjson': encode_ndjson, 'csv': encode_csv}
+
+
+def parquet_schema():
+    import pyarrow as pa
+    timestamp = pa.timestamp('us', tz='UTC')
+    types = {
+        'id': pa.int64(), 'likes': pa.int64(), 'comments': pa.int64(), 'shares': pa.int64(),
+        'views': pa.int64(), 'reach': pa.int64(), 'engagement_rate': pa.float64(),
+        'viral_score': pa.float64(), 'sentiment_score': pa.float64(),
+        'posted_at': timestamp, 'updated_at': timestamp,
+    }
+    return pa.schema([(column, types.get(column, pa.string())) for column in EXPORT_COLUMNS])
+
+
+def parts_dir(job):
+    return export_file(job).with_suffix('.parts')
+
+
+def write_parquet_part(job, rows, number):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    directory = parts_dir(job)
+    directory.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pylist(rows, schema=parquet_schema())
+    pq.write_table(table, directory / f"part-{number:05d}.parquet")
+
+
+def merge_parquet_parts(job, count):
+    # Parts are streamed into one file, so memory stays at one chunk
+    import pyarrow.parquet as pq
+    directory = parts_dir(job)
+    with pq.ParquetWriter(export_file(job), parquet_schema()) as writer:
+        for number in range(count):
+            writer.write_table(pq.read_table(directory / f"part-{number:05d}.parquet"))
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def save_checkpoint(job):
+    ExportJob.objects.filter(id=job.id).update(
+        cursor=job.cursor,
+        rows_written=job.rows_written,
+        bytes_written=job.bytes_written,
+        parts=job.parts,
+    )
+
+
+def run_export_job(job, chunk_size=EXPORT_JOB_CHUNK_SIZE):
+    posts = export_source(job)
+    try:
+        if job.cursor == 0:
+            job.total_rows = posts.count()
+            ExportJob.objects.filter(id=job.id).update(total_rows=job.total_rows)
+
+        handle = None
+        if job.format != 'parquet':
+            handle = open_checkpointed(export_file(job), job.bytes_written)
+        try:
+            while True:
+                rows = export_chunk(posts, job.cursor, chunk_size)
+                if not rows:
+                    break
+                # Output is made durable before the checkpoint that points past it
+                if handle is None:
+                    write_parquet_part(job, rows, job.parts)
+                    job.parts += 1
+                else:
+                    handle.write(ENCODERS[job.format](rows, with_header=job.bytes_written == 0))
+                    handle.flush()
+                    os.fsync(handle.fileno())
+                    job.bytes_written = handle.tell()
+                job.cursor = rows[-1]['id']
+                job.rows_written += len(rows)
+                save_checkpoint(job)
+
+            if handle is not None and job.bytes_written == 0:
+                # Empty exports still get a header
+                handle.write(ENCODERS[job.format]([], with_header=True))
+                job.bytes_written = handle.tell()
+        finally:
+            if handle is not None:
+                handle.close()
+
+        if job.format == 'parquet':
+            merge_parquet_parts(job, job.parts)
+            job.bytes_written = export_file(job).stat().st_size
+
+        job.status = 'success'
+        job.file_path = str(export_file(job).relative_to(EXPORT_ROOT))
+        job.error = ''
+    except Exception as e:
+        job.status = 'failed'
+        job.error = f'Export failed: {e}'
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=[
+        'status', 'error', 'file_path', 'finished_at',
+        'cursor', 'rows_written', 'total_rows', 'bytes_written', 'parts',
+    ])
+    return job
@@ -0,0 +1,171 @@
+import re
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Case, Count, DateTimeField, F, FloatField, IntegerField, Max, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, NullIf
+from .models import Hashtag, PostHashtag, UserHashtagStats
+
+HASHTAG_RE = re.compile(r'#(\w+)')
+# Tags per UPDATE; each one adds a few CASE branches (and bound parameters) to the statement
+HASHTAG_BATCH_SIZE = 200
+TOP_HASHTAGS = 10
+
+
+def caption_tags(caption):
+    return set(HASHTAG_RE.findall(caption or ''))
+
+
+def hashtag_ids(tags):
+    tags = sorted(tags)
+    Hashtag.objects.bulk_create([Hashtag(tag=tag) for tag in tags], ignore_conflicts=True, batch_size=500)
+    return dict(Hashtag.objects.filter(tag__in=tags).values_list('tag', 'id'))
+
+
+def set_post_hashtags(post_tags):
+    # post_tags maps post pk -> its full set of tags; existing links for those posts are replaced
+    if not post_tags:
+        return
+    ids = hashtag_ids(set().union(*post_tags.values()))
+    PostHashtag.objects.filter(post_id__in=list(post_tags)).delete()
+    PostHashtag.objects.bulk_create([
+        PostHashtag(post_id=post_pk, hashtag_id=ids[tag])
+        for post_pk, tags in post_tags.items()
+        for tag in sorted(tags)
+    ], ignore_conflicts=True, batch_size=500)
+
+
+def per_tag(field, values, output_field):
+    # CASE hashtag_id WHEN ... THEN value: one UPDATE applies a different delta to every row
+    return Case(
+        *[When(**{field: key}, then=Value(value)) for key, value in values.items()],
+        default=Value(0, output_field=output_field),
+        output_field=output_field,
+    )
+
+
+def add_hashtag_totals(changes):
+    # changes is a list of (hashtag id, uses change, engagement change) for the global totals
+    for start in range(0, len(changes), HASHTAG_BATCH_SIZE):
+        batch = changes[start:start + HASHTAG_BATCH_SIZE]
+        uses = {hashtag_id: count for hashtag_id, count, _ in batch}
+        engagement = {hashtag_id: total for hashtag_id, _, total in batch}
+        new_total = F('total_uses') + per_tag('id', uses, IntegerField())
+        Hashtag.objects.filter(id__in=list(uses)).update(
+            total_uses=new_total,
+            avg_engagement=Coalesce(
+                (F('avg_engagement') * F('total_uses') + per_tag('id', engagement, FloatField())) / NullIf(new_total, 0),
+                Value(0.0),
+            ),
+        )
+
+
+def apply_hashtag_deltas(user_id, deltas):
+    # deltas maps tag -> [uses change, engagement change, latest posted_at or None].
+    # Every change is an F() increment in SQL, so concurrent writers cannot lose updates.
+    deltas = {tag: change for tag, change in deltas.items() if change[0] or change[1]}
+    if not deltas:
+        return
+
+    ids = hashtag_ids(deltas)
+    changes = [(ids[tag], change) for tag, change in sorted(deltas.items())]
+    with transaction.atomic():
+        for start in range(0, len(changes), HASHTAG_BATCH_SIZE):
+            batch = changes[start:start + HASHTAG_BATCH_SIZE]
+            batch_ids = [hashtag_id for hashtag_id, _ in batch]
+            uses = {hashtag_id: change[0] for hashtag_id, change in batch}
+            engagement = {hashtag_id: change[1] for hashtag_id, change in batch}
+            used_at = {hashtag_id: change[2] for hashtag_id, change in batch if change[2] is not None}
+
+            # Upsert: make sure every row exists, then increment all of them in one statement
+            UserHashtagStats.objects.bulk_create([
+                UserHashtagStats(user_id=user_id, hashtag_id=hashtag_id) for hashtag_id in batch_ids
+            ], ignore_conflicts=True)
+            stats = UserHashtagStats.objects.filter(user_id=user_id, hashtag_id__in=batch_ids)
+            new_uses = F('uses') + per_tag('hashtag_id', uses, IntegerField())
+            new_sum = F('engagement_sum') + per_tag('hashtag_id', engagement, FloatField())
+            update = {
+                'uses': new_uses,
+                'engagement_sum': new_sum,
+                # Right-hand sides see the old row, so the average is built from the same deltas
+                'avg_engagement': Coalesce(new_sum / NullIf(new_uses, 0), Value(0.0)),
+            }
+            if used_at:
+                latest = Case(
+                    *[When(hashtag_id=hashtag_id, then=Value(value)) for hashtag_id, value in used_at.items()],
+                    default=F('last_used_at'),
+                    output_field=DateTimeField(),
+                )
+                update['last_used_at'] = Greatest(Coalesce(F('last_used_at'), latest), latest)
+            stats.update(**update)
+            stats.filter(uses__lte=0).delete()
+
+        add_hashtag_totals([(hashtag_id, change[0], change[1]) for hashtag_id, change in changes])
+
+
+class HashtagTracker:
+    # Accumulates per-tag changes while posts are written, then applies them in one pass
+
+    def __init__(self):
+        self.deltas = defaultdict(lambda: [0, 0.0, None])
+
+    def remove(self, tags, engagement_rate):
+        for tag in tags:
+            change = self.deltas[tag]
+            change[0] -= 1
+            change[1] -= engagement_rate or 0
+
+    def add(self, tags, engagement_rate, posted_at=None):
+        for tag in tags:
+            change = self.deltas[tag]
+            change[0] += 1
+            change[1] += engagement_rate or 0
+            if posted_at is not None and (change[2] is None or posted_at > change[2]):
+                change[2] = posted_at
+
+    def apply(self, user_id):
+        apply_hashtag_deltas(user_id, self.deltas)
+        self.deltas.clear()
+
+
+def forget_account_hashtags(account):
+    # Takes an account's posts out of the stats; the SocialAccount pre_delete handler calls it
+    rows = PostHashtag.objects.filter(post__account=account).values('hashtag__tag').annotate(
+        uses=Count('id'),
+        engagement_sum=Sum('post__engagement_rate'),
+    ).order_by()
+    apply_hashtag_deltas(account.user_id, {
+        row['hashtag__tag']: [-row['uses'], -(row['engagement_sum'] or 0), None] for row in rows
+    })
+
+
+def recompute_hashtag_stats(users):
+    # Full rebuild for the given users with one grouped query; incremental updates go
+    # through apply_hashtag_deltas
+    rows = PostHashtag.objects.filter(post__account__user__in=users).values(
+        'post__account__user_id', 'hashtag_id'
+    ).annotate(
+        uses=Count('id'),
+        engagement_sum=Sum('post__engagement_rate'),
+        last_used_at=Max('post__posted_at'),
+    ).order_by()
+
+    stats = [
+        UserHashtagStats(
+            user_id=row['post__account__user_id'],
+            hashtag_id=row['hashtag_id'],
+            uses=row['uses'],
+            engagement_sum=row['engagement_sum'] or 0,
+            avg_engagement=(row['engagement_sum'] or 0) / row['uses'],
+            last_used_at=row['last_used_at'],
+        )
+        for row in rows
+    ]
+    with transaction.atomic():
+        UserHashtagStats.objects.filter(user__in=users).delete()
+        UserHashtagStats.objects.bulk_create(stats, batch_size=500)
+    return len(stats)
+
+
+def top_user_hashtags(user, limit=TOP_HASHTAGS):
+    # One read ordered by the (user, -avg_engagement) index
+    return UserHashtagStats.objects.filter(user=user).select_related('hashtag').order_by('-avg_engagement', 'hashtag')[:limit]
@@ -0,0 +1,59 @@
+from collections import Counter
+from itertools import groupby
+from .models import BestTimeToPost
+
+DAY_LABELS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+HOURS_PER_WEEK = 7 * 24
+
+
+def counts_median(counts):
+    # counts maps an engagement value (as a string key) -> how many posts had it
+    total = sum(counts.values())
+    if not total:
+        return 0
+    lower_rank, upper_rank = (total - 1) // 2, total // 2
+    lower = upper = None
+    seen = 0
+    for value, count in sorted((float(value), count) for value, count in counts.items() if count > 0):
+        seen += count
+        if lower is None and seen > lower_rank:
+            lower = value
+        if seen > upper_rank:
+            upper = value
+            break
+    return (lower + upper) / 2
+
+
+def posting_heatmap(user):
+    # Built from the per-account hour-of-week slots the writer keeps current, so a page
+    # view reads at most 168 rows per account rather than every post. Each slot carries
+    # its engagement distribution, so a cell's median is exact across several accounts;
+    # rows arrive cell by cell, so only one cell's distribution is held at a time.
+    rows = BestTimeToPost.objects.filter(account__user=user).order_by('day_of_week', 'hour').values_list(
+        'day_of_week', 'hour', 'post_count', 'engagement_sum', 'engagement_counts'
+    )
+
+    counts = [0] * HOURS_PER_WEEK
+    means = [0] * HOURS_PER_WEEK
+    medians = [0] * HOURS_PER_WEEK
+    for (day, hour), slots in groupby(rows.iterator(), key=lambda row: row[:2]):
+        cell = day * 24 + hour
+        engagement_sum = 0.0
+        distribution = Counter()
+        for _, _, post_count, slot_sum, slot_counts in slots:
+            counts[cell] += post_count
+            engagement_sum += slot_sum
+            distribution.update(slot_counts)
+        if counts[cell]:
+            means[cell] = round(engagement_sum / counts[cell], 2)
+            medians[cell] = round(counts_median(distribution), 2)
+
+    return [
+        {
+            'day': DAY_LABELS[day],
+            'hours': means[day * 24:day * 24 + 24],
+            'medians': medians[day * 24:day * 24 + 24],
+            'counts': counts[day * 24:day * 24 + 24],
+        }
+        for day in range(7)
+    ]
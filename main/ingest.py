@@ -0,0 +1,119 @@
+from django.db import transaction
+from django.utils import timezone
+from .models import Post
+from .rollups import refresh_daily_stats, posted_dates
+from .besttimes import BestTimeTracker
+from .versions import bump_data_version
+from .viral import score_posts
+from .snapshots import record_snapshots
+from .hashtags import HashtagTracker, caption_tags, set_post_hashtags
+
+POST_CHUNK_SIZE = 500
+
+
+class PostBatchWriter:
+    # Collects normalized post records and upserts them per chunk.
+    # Django 3.2 has no bulk_create(update_conflicts=...), so each chunk does one
+    # SELECT of existing keys followed by one bulk_create and one bulk_update.
+
+    def __init__(self, account, chunk_size=POST_CHUNK_SIZE, snapshots=True):
+        self.account = account
+        self.chunk_size = chunk_size
+        self.snapshots = snapshots
+        self.pending = {}
+        self.inserted = 0
+        self.updated = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # A failed batch is dropped; callers that want partial writes flush explicitly
+        if exc_type is None:
+            self.flush()
+
+    def add(self, post_id, **fields):
+        # Later records for the same post_id win within a chunk
+        self.pending[post_id] = fields
+        if len(self.pending) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return 0, 0
+
+        records = self.pending
+        self.pending = {}
+        now = timezone.now()
+
+        with transaction.atomic():
+            existing = {
+                post.post_id: post
+                for post in Post.objects.filter(
+                    account=self.account,
+                    post_id__in=list(records)
+                ).only('id', 'post_id', 'posted_at', 'engagement_rate', 'caption')
+            }
+
+            touched = [post.posted_at for post in existing.values()]
+            best_times = BestTimeTracker(self.account.audience_tzinfo)
+            hashtags = HashtagTracker()
+            # post_id -> tags, for new posts and posts whose caption changed its tags
+            relinks = {}
+            to_create = []
+            to_update = []
+            update_fields = set()
+            for post_id, fields in records.items():
+                post = existing.get(post_id)
+                old_tags = set()
+                if post is None:
+                    post = Post(account=self.account, post_id=post_id, **fields)
+                    to_create.append(post)
+                else:
+                    old_tags = caption_tags(post.caption)
+                    best_times.remove(post.posted_at, post.engagement_rate)
+                    hashtags.remove(old_tags, post.engagement_rate)
+                    for name, value in fields.items():
+                        setattr(post, name, value)
+                    post.updated_at = now
+                    update_fields.update(fields)
+                    to_update.append(post)
+                best_times.add(post.posted_at, post.engagement_rate)
+                tags = caption_tags(post.caption)
+                hashtags.add(tags, post.engagement_rate, post.posted_at)
+                if tags != old_tags:
+                    relinks[post_id] = tags
+                if fields.get('posted_at'):
+                    touched.append(fields['posted_at'])
+
+            Post.objects.bulk_create(to_create, batch_size=self.chunk_size)
+            if to_update:
+                Post.objects.bulk_update(
+                    to_update,
+                    sorted(update_fields | {'updated_at'}),
+                    batch_size=self.chunk_size
+                )
+
+            refresh_daily_stats(self.account, posted_dates(touched))
+            best_times.apply(self.account)
+            flushed = Post.objects.filter(account=self.account, post_id__in=list(records))
+            if relinks:
+                post_pks = dict(flushed.filter(post_id__in=list(relinks)).values_list('post_id', 'id'))
+                set_post_hashtags({post_pks[post_id]: tags for post_id, tags in relinks.items()})
+            hashtags.apply(self.account.user_id)
+            score_posts(flushed)
+            if self.snapshots:
+                record_snapshots(flushed, now)
+            bump_data_version(self.account.user_id)
+
+        self.inserted += len(to_create)
+        self.updated += len(to_update)
+        return len(to_create), len(to_update)
+
+    def post_ids(self, post_ids):
+        return dict(
+            Post.objects.filter(
+                account=self.account,
+                post_id__in=list(post_ids)
+            ).values_list('post_id', 'id')
+        )
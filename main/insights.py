@@ -0,0 +1,76 @@
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import AIInsight, UserDataVersion
+from .utils import generate_ai_insights
+from .versions import data_version
+
+# A burst of syncs should not regenerate insights after every batch
+INSIGHT_DEBOUNCE = timedelta(seconds=getattr(settings, 'INSIGHT_DEBOUNCE_SECONDS', 60))
+
+
+def insights_stale(row, now=None):
+    if row.insights_version >= row.version:
+        return False
+    if row.insights_generated_at is None:
+        return True
+    return (now or timezone.now()) - row.insights_generated_at >= INSIGHT_DEBOUNCE
+
+
+def sync_insights(user, insights):
+    # Diff against what the user already has instead of delete-and-recreate.
+    # Read insights stay as history; stale unread ones are dropped.
+    key = lambda insight: (insight.insight_type, insight.title, insight.description)
+    existing = {key(insight): insight for insight in AIInsight.objects.filter(user=user)}
+    wanted = {key(insight): insight for insight in insights}
+
+    to_create = [insight for k, insight in wanted.items() if k not in existing]
+    stale = [insight.id for k, insight in existing.items() if k not in wanted and not insight.is_read]
+
+    if stale:
+        AIInsight.objects.filter(id__in=stale).delete()
+    AIInsight.objects.bulk_create(to_create)
+    return len(to_create), len(stale)
+
+
+def refresh_insights(user, force=False):
+    # Returns (created, removed), or None when the data has not changed
+    row = data_version(user)
+    now = timezone.now()
+    if not force and not insights_stale(row, now):
+        return None
+
+    version = row.version
+    insights = generate_ai_insights(user)
+    with transaction.atomic():
+        result = sync_insights(user, insights)
+        # Record the version read above; changes made meanwhile trigger the next run
+        UserDataVersion.objects.filter(id=row.id).update(
+            insights_version=version,
+            insights_generated_at=now
+        )
+    return result
+
+
+def users_needing_insights(force=False):
+    # Users with posts whose insights are behind their data version
+    users = User.objects.filter(socialaccount__isnull=False).distinct()
+    if not force:
+        users = users.filter(
+            Q(data_version__isnull=True) | Q(data_version__insights_version__lt=F('data_version__version'))
+        )
+    return list(users.values_list('id', flat=True))
+
+
+def refresh_insights_for(user_id, force=False):
+    # Process-pool entry point: takes an id so only an int crosses the process boundary
+    user = User.objects.get(id=user_id)
+    try:
+        return user_id, refresh_insights(user, force=force), None
+    except Exception as e:
+        return user_id, None, str(e)
+    finally:
+        connections.close_all()
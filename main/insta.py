@@ -1,13 +1,72 @@
-import instaloader
+from datetime import timedelta
+from django.conf import settings
 from django.utils import timezone
 from .models import SocialAccount, Post
+from .ingest import PostBatchWriter
+from .scheduler import RetryableFetchError
 
-def sync_public_instagram_account(username, user):
+# Recent posts still gain likes, older ones barely move
+REFRESH_WINDOW = timedelta(days=getattr(settings, 'INSTAGRAM_REFRESH_WINDOW_DAYS', 7))
+RECENT_POST_LIMIT = 50
+CHECKPOINT_EVERY = 12
+INSTAGRAM_PAGE_SIZE = 12
+
+
+def _checkpoint(posts):
+    try:
+        return posts.freeze()._asdict()
+    except Exception as e:
+        print(f"Could not checkpoint iterator: {e}")
+        return None
+
+
+def instagram_post_type(post):
+    # Determine post type based on your model choices
+    if post.is_video:
+        # Check if it's a reel or regular video
+        if hasattr(post, 'is_reel') and post.is_reel:
+            return "reel"
+        return "video"
+    if post.mediacount > 1:
+        return "carousel"
+    return "photo"  # Changed from "static" to "photo"
+
+
+def normalize_instagram_post(post, followers):
+    posted_at = timezone.make_aware(post.date_utc, timezone.utc)
+    return post.shortcode, {
+        "caption": post.caption or "",
+        "likes": post.likes,
+        "comments": post.comments,
+        "views": post.video_view_count or 0,
+        "shares": 0,
+        "reach": post.likes + post.comments,
+        "post_type": instagram_post_type(post),
+        "url": f"https://www.instagram.com/p/{post.shortcode}/",
+        "thumbnail_url": post.url,  # Save thumbnail URL
+        "posted_at": posted_at,
+        "engagement_rate": round(
+            ((post.likes + post.comments) / max(followers, 1)) * 100,
+            2
+        ),
+    }
+
+
+def reached_known_posts(post, posted_at, last_post_at, last_post_shortcode, refresh_cutoff):
+    # Pinned posts show up first regardless of age, so they never end an incremental run
+    if not last_post_at or getattr(post, 'is_pinned', False):
+        return False
+    known = post.shortcode == last_post_shortcode or posted_at <= last_post_at
+    return known and posted_at < refresh_cutoff
+
+
+def sync_public_instagram_account(username, user, progress=None, mode="incremental", refresh_window=None):
     from instaloader import Instaloader, Profile
+    from instaloader.nodeiterator import FrozenNodeIterator
     from django.utils import timezone
 
     L = Instaloader()
-    
+
     try:
         profile = Profile.from_username(L.context, username)
     except Exception as e:
@@ -27,53 +86,121 @@ def sync_public_instagram_account(username, user):
         }
     )
 
-    # Fetch posts (limit to recent 50 for performance)
+    posts = profile.get_posts()
+    high_water = account.last_post_at
+
+    if mode == "backfill":
+        # No cap, but resume from where an interrupted backfill stopped
+        limit = None
+        if account.backfill_checkpoint:
+            try:
+                posts.thaw(FrozenNodeIterator(**account.backfill_checkpoint))
+            except Exception as e:
+                print(f"Discarding backfill checkpoint for @{username}: {e}")
+    else:
+        # Only a first sync is capped (older history is the backfill's job); later runs
+        # walk back to the known posts so nothing between the two syncs is skipped
+        limit = RECENT_POST_LIMIT if high_water is None else None
+    refresh_cutoff = timezone.now() - (refresh_window or REFRESH_WINDOW)
+    newest = None
+
     post_count = 0
-    for post in profile.get_posts():
-        if post_count >= 50:  # Limit to avoid long sync times
-            break
-            
-        try:
-            # Determine post type based on your model choices
-            if post.is_video:
-                # Check if it's a reel or regular video
-                if hasattr(post, 'is_reel') and post.is_reel:
-                    post_type = "reel"
-                else:
-                    post_type = "video"
-            elif post.mediacount > 1:
-                post_type = "carousel"
-            else:
-                post_type = "photo"  # Changed from "static" to "photo"
-            
-            # Get thumbnail URL
-            thumbnail_url = post.url
-            
-            Post.objects.update_or_create(
-                account=account,
-                post_id=post.shortcode,
-                defaults={
-                    "caption": post.caption or "",
-                    "likes": post.likes,
-                    "comments": post.comments,
-                    "views": post.video_view_count or 0,
-                    "shares": 0,
-                    "reach": post.likes + post.comments,
-                    "post_type": post_type,
-                    "url": f"https://www.instagram.com/p/{post.shortcode}/",
-                    "thumbnail_url": thumbnail_url,  # Save thumbnail URL
-                    "posted_at": post.date_utc,
-                    "engagement_rate": round(
-                        ((post.likes + post.comments) / max(profile.followers, 1)) * 100,
-                        2
-                    ),
-                }
-            )
-            post_count += 1
-            
-        except Exception as e:
-            print(f"Error processing post {post.shortcode}: {e}")
-            continue
-
-    print(f"✅ Synced {post_count} posts for @{username}")
-    return account
\ No newline at end of file
+    writer = PostBatchWriter(account)
+    completed = False
+    # Whether the run bridged the gap back to the previous high-water mark
+    caught_up = high_water is None
+    try:
+        for post in posts:
+            if limit is not None and post_count >= limit:  # Limit to avoid long sync times
+                break
+
+            pinned = getattr(post, 'is_pinned', False)
+
+            try:
+                post_id, fields = normalize_instagram_post(post, profile.followers)
+                posted_at = fields["posted_at"]
+
+                if mode == "incremental" and reached_known_posts(
+                    post, posted_at, high_water, account.last_post_shortcode, refresh_cutoff
+                ):
+                    caught_up = True
+                    break
+
+                writer.add(post_id, **fields)
+                post_count += 1
+                if progress:
+                    progress(post_count)
+
+                if not pinned and (newest is None or posted_at > newest[0]):
+                    newest = (posted_at, post.shortcode)
+
+            except Exception as e:
+                print(f"Error processing post {post.shortcode}: {e}")
+                continue
+
+            if mode == "backfill" and post_count % CHECKPOINT_EVERY == 0:
+                # Flush first so the checkpoint never runs ahead of stored posts
+                writer.flush()
+                account.backfill_checkpoint = _checkpoint(posts)
+                account.save(update_fields=["backfill_checkpoint"])
+        else:
+            # The timeline ran out, so everything newer than the mark was seen
+            caught_up = True
+        completed = True
+    finally:
+        # Keep whatever was fetched before an interruption
+        writer.flush()
+        # Moving the mark past a gap would make the next run stop before reaching it
+        if newest and (caught_up or mode == "backfill") and (high_water is None or newest[0] > high_water):
+            account.last_post_at, account.last_post_shortcode = newest
+        if mode == "backfill":
+            account.backfill_checkpoint = None if completed else _checkpoint(posts)
+        account.save(update_fields=["last_post_at", "last_post_shortcode", "backfill_checkpoint"])
+
+    print(f"✅ Synced {post_count} posts for @{username} ({writer.inserted} new, {writer.updated} updated)")
+    return account
+
+
+def fetch_instagram_account(username, last_post_at=None, last_post_shortcode="", limiter=None, refresh_window=None, limit=RECENT_POST_LIMIT):
+    # Network only: returns normalized records so the caller decides how to write them
+    from instaloader import Instaloader, Profile
+    from instaloader.exceptions import ConnectionException, QueryReturnedNotFoundException
+
+    L = Instaloader(max_connection_attempts=1)
+    refresh_cutoff = timezone.now() - (refresh_window or REFRESH_WINDOW)
+
+    try:
+        if limiter:
+            limiter.acquire()
+        profile = Profile.from_username(L.context, username)
+
+        records = []
+        newest = None
+        for index, post in enumerate(profile.get_posts()):
+            # Only a first fetch is capped; later ones run until they reach known posts
+            if last_post_at is None and len(records) >= limit:
+                break
+            # Every page of posts is another request
+            if limiter and index % INSTAGRAM_PAGE_SIZE == 0:
+                limiter.acquire()
+
+            post_id, fields = normalize_instagram_post(post, profile.followers)
+            posted_at = fields["posted_at"]
+            if reached_known_posts(post, posted_at, last_post_at, last_post_shortcode, refresh_cutoff):
+                break
+
+            records.append((post_id, fields))
+            if not getattr(post, 'is_pinned', False) and (newest is None or posted_at > newest[0]):
+                newest = (posted_at, post_id)
+    except QueryReturnedNotFoundException:
+        raise
+    except ConnectionException as e:
+        raise RetryableFetchError(str(e)) from e
+
+    return {
+        "followers_count": profile.followers,
+        "following_count": profile.followees,
+        "posts_count": profile.mediacount,
+        "posts": records,
+        "newest": newest,
+    }
@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import Counter, deque
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+REQUEST_LOG_SIZE = getattr(settings, 'SQL_INSTRUMENTATION_BUFFER_SIZE', 500)
+SLOW_QUERY_COUNT = 5
+# A statement run this many times in one request (with any parameters) is flagged as N+1
+REPEAT_THRESHOLD = getattr(settings, 'SQL_INSTRUMENTATION_REPEAT_THRESHOLD', 3)
+SQL_PREVIEW_LENGTH = 300
+
+
+class RequestLog:
+    # Fixed-size ring buffer of recent request profiles, shared by every thread of the process
+
+    def __init__(self, size=REQUEST_LOG_SIZE):
+        self.entries = deque(maxlen=size)
+        self.lock = threading.Lock()
+        self.recorded = 0
+
+    def add(self, entry):
+        with self.lock:
+            self.entries.append(entry)
+            self.recorded += 1
+
+    def recent(self, limit=None):
+        with self.lock:
+            entries = list(self.entries)
+        entries.reverse()
+        return entries[:limit] if limit else entries
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+request_log = RequestLog()
+
+
+class QueryRecorder:
+    # Installed as an execute_wrapper on every connection for the length of one request
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, None if many else params, time.perf_counter() - started))
+
+    def install(self):
+        for connection in connections.all():
+            connection.execute_wrappers.append(self)
+
+    def uninstall(self):
+        for connection in connections.all():
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+
+    def db_seconds(self):
+        return sum(duration for _, _, duration in self.queries)
+
+    def summary(self):
+        statements = Counter(sql for sql, _, _ in self.queries)
+        exact = Counter((sql, repr(params)) for sql, params, _ in self.queries)
+        slowest = sorted(self.queries, key=lambda query: query[2], reverse=True)[:SLOW_QUERY_COUNT]
+        return {
+            'queries': len(self.queries),
+            'db_ms': round(self.db_seconds() * 1000, 2),
+            'slowest': [
+                {'ms': round(duration * 1000, 2), 'sql': sql[:SQL_PREVIEW_LENGTH]}
+                for sql, _, duration in slowest
+            ],
+            # Same statement, different parameters: the usual shape of an N+1 loop
+            'repeated': [
+                {'count': count, 'sql': sql[:SQL_PREVIEW_LENGTH]}
+                for sql, count in statements.most_common() if count >= REPEAT_THRESHOLD
+            ],
+            # Same statement and parameters: a result that could have been reused
+            'duplicates': [
+                {'count': count, 'sql': sql[:SQL_PREVIEW_LENGTH]}
+                for (sql, _), count in exact.most_common() if count > 1
+            ],
+        }
+
+
+def server_timing(total_seconds, recorder):
+    return 'db;dur={:.2f};desc="{} queries", total;dur={:.2f}'.format(
+        recorder.db_seconds() * 1000, len(recorder.queries), total_seconds * 1000
+    )
+
+
+class SQLInstrumentationMiddleware:
+    # Opt-in with SQL_INSTRUMENTATION = True. When it is off, Django drops the middleware
+    # from the chain at startup, so disabled requests pay nothing.
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SQL_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started_at = timezone.now()
+        started = time.perf_counter()
+        recorder.install()
+        try:
+            response = self.get_response(request)
+        except Exception:
+            recorder.uninstall()
+            raise
+
+        # The header goes out before a streamed body, so it can only cover the view itself
+        response['Server-Timing'] = server_timing(time.perf_counter() - started, recorder)
+
+        def finish():
+            recorder.uninstall()
+            request_log.add({
+                'method': request.method,
+                'path': request.path,
+                'view': getattr(request.resolver_match, 'view_name', None),
+                'status': response.status_code,
+                'started_at': started_at,
+                'total_ms': round((time.perf_counter() - started) * 1000, 2),
+                **recorder.summary(),
+            })
+
+        if response.streaming:
+            # Streamed bodies run their queries while being sent; record once they finish
+            response.streaming_content = recorded_stream(response.streaming_content, finish)
+        else:
+            finish()
+        return response
+
+
+def recorded_stream(content, finish):
+    try:
+        yield from content
+    finally:
+        finish()
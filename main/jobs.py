@@ -0,0 +1,87 @@
+from django.utils import timezone
+from .models import SyncJob, Post
+
+
+def enqueue_sync(account, mode='incremental'):
+    # One active job per account is enough; repeated page loads reuse it
+    job = SyncJob.objects.filter(
+        account=account,
+        status__in=['pending', 'running']
+    ).first()
+    if job:
+        return job
+
+    return SyncJob.objects.create(user=account.user, account=account, mode=mode)
+
+
+def latest_job(account):
+    return SyncJob.objects.filter(account=account).order_by('-created_at').first()
+
+
+def claim_next_job():
+    # Jobs whose account was deleted while they waited are never run
+    pending = SyncJob.objects.filter(status='pending', account__isnull=False).order_by('created_at')
+    for job_id in pending.values_list('id', flat=True)[:10]:
+        # The conditional update makes the claim safe across worker processes
+        claimed = SyncJob.objects.filter(id=job_id, status='pending').update(
+            status='running',
+            started_at=timezone.now()
+        )
+        if claimed:
+            return SyncJob.objects.select_related('account', 'user').get(id=job_id)
+    return None
+
+
+def requeue_stale_jobs(older_than):
+    cutoff = timezone.now() - older_than
+    return SyncJob.objects.filter(
+        status='running',
+        started_at__lt=cutoff
+    ).update(status='pending', started_at=None, progress=0)
+
+
+def run_sync_job(job, sync=None):
+    if sync is None:
+        from .insta import sync_public_instagram_account as sync
+
+    def report(count):
+        SyncJob.objects.filter(id=job.id).update(progress=count)
+
+    username = job.account.username
+    try:
+        account = sync(username=username, user=job.user, progress=report, mode=job.mode)
+        if account is None:
+            job.status = 'failed'
+            job.error = f'Could not find Instagram account @{username}. Make sure the account is public.'
+        else:
+            job.status = 'success'
+            job.progress = Post.objects.filter(account=account).count()
+    except Exception as e:
+        job.status = 'failed'
+        error_msg = str(e)
+        if "login" in error_msg.lower() or "private" in error_msg.lower():
+            job.error = f'Account @{username} is private or requires login. Please use a public Instagram account.'
+        else:
+            job.error = f'Error syncing @{username}: {error_msg}'
+
+    job.finished_at = timezone.now()
+    update_fields = ['status', 'error', 'finished_at']
+    if job.status == 'success':
+        update_fields.append('progress')
+    job.save(update_fields=update_fields)
+
+    if job.status == 'failed' and remove_unsynced_account(job.account):
+        job.account = None
+
+    return job
+
+
+def remove_unsynced_account(account):
+    # An account whose first sync failed was never really connected; don't leave it
+    # behind empty. The failed job keeps its error, with the account cleared.
+    if SyncJob.objects.filter(account=account, status='success').exists():
+        return False
+    if Post.objects.filter(account=account).exists():
+        return False
+    account.delete()
+    return True
@@ -0,0 +1,207 @@
+import base64
+from datetime import timedelta
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from .models import SocialAccount, Post, PostAnalytics, Hashtag, PostHashtag
+from .hashtags import add_hashtag_totals, recompute_hashtag_stats
+from .benchmarks import CAPTION_WORDS, POST_TYPES
+from .besttimes import recompute_best_times
+from .rollups import refresh_daily_stats
+from .search import search_index_paused
+from .viral import viral_scores
+
+PLATFORMS = ['instagram', 'twitter', 'facebook', 'tiktok', 'youtube']
+POST_TYPE_WEIGHTS = [0.35, 0.25, 0.2, 0.1, 0.07, 0.03]
+# Relative posting volume per UTC hour: quiet overnight, peaks at lunch and in the evening
+HOUR_WEIGHTS = [
+    0.6, 0.4, 0.25, 0.2, 0.2, 0.3, 0.6, 1.0, 1.3, 1.4, 1.5, 1.8,
+    2.2, 2.0, 1.6, 1.5, 1.6, 1.9, 2.4, 2.8, 2.9, 2.5, 1.8, 1.1,
+]
+HASHTAG_ZIPF_EXPONENT = 1.1
+MEAN_HASHTAGS_PER_POST = 2.0
+SEED_CHUNK_SIZE = 50000
+BULK_BATCH_SIZE = 5000
+INT32_MAX = np.iinfo(np.int32).max
+
+
+def normalized(weights):
+    weights = np.asarray(weights, dtype=np.float64)
+    return weights / weights.sum()
+
+
+def hashtag_vocabulary(count):
+    words = CAPTION_WORDS
+    return [
+        words[i % len(words)] if i < len(words) else f"{words[i % len(words)]}{i // len(words)}"
+        for i in range(count)
+    ]
+
+
+def post_metrics(rng, followers):
+    # Heavy-tailed likes: lognormal around ~3% of followers, plus rare Pareto-sized breakouts
+    count = len(followers)
+    likes = followers * rng.lognormal(np.log(0.03), 0.9, count)
+    viral = rng.random(count) < 0.01
+    likes[viral] *= 1 + rng.pareto(1.2, viral.sum()) * 5
+    likes = np.minimum(likes, INT32_MAX).astype(np.int64)
+    comments = (likes * rng.lognormal(np.log(0.03), 0.5, count)).astype(np.int64)
+    shares = (likes * rng.lognormal(np.log(0.01), 0.7, count)).astype(np.int64)
+    views = np.minimum(likes * rng.lognormal(np.log(8), 0.4, count), INT32_MAX).astype(np.int64)
+    reach = (views * 0.8).astype(np.int64)
+    engagement_rate = (likes + comments + shares) / followers * 100
+    return likes, comments, shares, views, reach, engagement_rate
+
+
+def posting_times(rng, count, end, days):
+    # Uniform over the days before `end` (a midnight), skewed over hours of the day
+    day = rng.integers(1, days + 1, count)
+    hour = rng.choice(24, size=count, p=normalized(HOUR_WEIGHTS))
+    second = rng.integers(0, 3600, count)
+    offsets = day * 86400 - hour * 3600 - second
+    return [end - timedelta(seconds=offset) for offset in offsets.tolist()]
+
+
+def post_hashtags(rng, count, vocabulary_size):
+    # Returns (post index, tag index) pairs, unique per post, with Zipf tag frequencies
+    per_post = np.minimum(rng.poisson(MEAN_HASHTAGS_PER_POST, count), 8)
+    ranks = np.arange(1, vocabulary_size + 1, dtype=np.float64)
+    tags = rng.choice(vocabulary_size, size=per_post.sum(), p=normalized(ranks ** -HASHTAG_ZIPF_EXPONENT))
+    posts = np.repeat(np.arange(count), per_post)
+    pairs = np.unique(posts * vocabulary_size + tags)
+    return pairs // vocabulary_size, pairs % vocabulary_size
+
+
+def seeded_post_id(prefix, seed, post_pk, platform):
+    if platform == 'instagram':
+        # Shortcode-shaped (11 url-safe base64 characters) so the Instagram stats count it
+        return base64.urlsafe_b64encode(post_pk.to_bytes(8, 'big')).rstrip(b'=').decode()
+    return f"{prefix}{seed}_{post_pk}"
+
+
+def create_users(prefix, user_count, accounts_per_user, password, rng):
+    if User.objects.filter(username__startswith=prefix).exists():
+        raise ValueError(f"Users named {prefix}* already exist; pick another prefix")
+
+    hashed = make_password(password)
+    User.objects.bulk_create([
+        User(username=f"{prefix}{i}", password=hashed) for i in range(user_count)
+    ], batch_size=BULK_BATCH_SIZE)
+    users = list(User.objects.filter(username__startswith=prefix).order_by('id').values_list('id', flat=True))
+
+    followers = np.maximum(rng.lognormal(np.log(5000), 1.5, user_count * accounts_per_user), 50).astype(np.int64)
+    SocialAccount.objects.bulk_create([
+        SocialAccount(
+            user_id=users[i // accounts_per_user],
+            platform=PLATFORMS[i % accounts_per_user % len(PLATFORMS)],
+            username=f"{prefix}{i // accounts_per_user}_{i % accounts_per_user}",
+            followers_count=int(followers[i]),
+            last_synced=timezone.now(),
+        )
+        for i in range(user_count * accounts_per_user)
+    ], batch_size=BULK_BATCH_SIZE)
+    return list(
+        SocialAccount.objects.filter(user_id__in=users).order_by('id').values_list('id', 'user_id', 'followers_count', 'platform')
+    )
+
+
+def seed_load_data(user_count, accounts_per_user, posts_per_account, seed=42, days=365,
+                   hashtag_count=5000, prefix='load', password='loadtest', end=None,
+                   chunk_size=SEED_CHUNK_SIZE, log=print):
+    # Deterministic for a given seed and end time. Posts get explicit ids so analytics and
+    # hashtag links can be written without reading anything back.
+    rng = np.random.default_rng(seed)
+    end = end or timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    accounts = create_users(prefix, user_count, accounts_per_user, password, rng)
+    log(f"Created {user_count} users and {len(accounts)} accounts")
+
+    vocabulary = hashtag_vocabulary(hashtag_count)
+    Hashtag.objects.bulk_create([Hashtag(tag=tag) for tag in vocabulary], ignore_conflicts=True, batch_size=BULK_BATCH_SIZE)
+    tag_ids = dict(Hashtag.objects.filter(tag__in=vocabulary).values_list('tag', 'id'))
+    tag_ids = np.array([tag_ids[tag] for tag in vocabulary], dtype=np.int64)
+    tag_uses = np.zeros(hashtag_count, dtype=np.int64)
+    tag_engagement = np.zeros(hashtag_count)
+
+    # Posts are spread round-robin over accounts so every chunk touches all of them
+    account_ids = np.array([account_id for account_id, _, _, _ in accounts], dtype=np.int64)
+    user_ids = np.array([user_id for _, user_id, _, _ in accounts], dtype=np.int64)
+    followers = np.array([count for _, _, count, _ in accounts], dtype=np.float64)
+    platforms = {account_id: platform for account_id, _, _, platform in accounts}
+    total = len(accounts) * posts_per_account
+
+    next_id = (Post.objects.aggregate(top=Max('id'))['top'] or 0) + 1
+    # Captions are indexed once at the end rather than row by row through the triggers
+    with search_index_paused():
+        for start in range(0, total, chunk_size):
+            count = min(chunk_size, total - start)
+            owner = np.arange(start, start + count) % len(accounts)
+            likes, comments, shares, views, reach, engagement_rate = post_metrics(rng, followers[owner])
+            posted_at = posting_times(rng, count, end, days)
+            post_types = rng.choice(len(POST_TYPES), size=count, p=normalized(POST_TYPE_WEIGHTS))
+            words = rng.integers(0, len(CAPTION_WORDS), (count, 6))
+            tag_posts, tag_indexes = post_hashtags(rng, count, hashtag_count)
+            ids = np.arange(next_id, next_id + count)
+            next_id += count
+
+            captions = [' '.join(CAPTION_WORDS[word] for word in row) for row in words.tolist()]
+            for post, tag in zip(tag_posts.tolist(), tag_indexes.tolist()):
+                captions[post] += f" #{vocabulary[tag]}"
+            np.add.at(tag_uses, tag_indexes, 1)
+            np.add.at(tag_engagement, tag_indexes, engagement_rate[tag_posts])
+
+            ages = np.array([(end - value).total_seconds() for value in posted_at])
+            scores = viral_scores(likes, engagement_rate, shares, comments, ages)
+            sentiment = rng.uniform(-0.2, 1.0, count)
+
+            ids = ids.tolist()
+            owner_accounts = account_ids[owner].tolist()
+            owner_users = user_ids[owner].tolist()
+            columns = zip(
+                ids, owner_accounts, post_types.tolist(), captions, likes.tolist(), comments.tolist(),
+                shares.tolist(), views.tolist(), reach.tolist(), engagement_rate.tolist(), posted_at,
+            )
+            with transaction.atomic():
+                Post.objects.bulk_create([
+                    Post(
+                        id=post_pk,
+                        account_id=account_id,
+                        post_id=seeded_post_id(prefix, seed, post_pk, platforms[account_id]),
+                        post_type=POST_TYPES[post_type],
+                        caption=caption,
+                        url=f"https://example.com/p/{post_pk}",
+                        likes=post_likes,
+                        comments=post_comments,
+                        shares=post_shares,
+                        views=post_views,
+                        reach=post_reach,
+                        engagement_rate=rate,
+                        posted_at=when,
+                    )
+                    for (post_pk, account_id, post_type, caption, post_likes, post_comments,
+                         post_shares, post_views, post_reach, rate, when) in columns
+                ], batch_size=BULK_BATCH_SIZE)
+                PostAnalytics.objects.bulk_create([
+                    PostAnalytics(post_id=post_pk, user_id=user_id, viral_score=score, sentiment_score=mood)
+                    for post_pk, user_id, score, mood in zip(ids, owner_users, scores.tolist(), sentiment.tolist())
+                ], batch_size=BULK_BATCH_SIZE)
+                PostHashtag.objects.bulk_create([
+                    PostHashtag(post_id=ids[post], hashtag_id=tag_id)
+                    for post, tag_id in zip(tag_posts.tolist(), tag_ids[tag_indexes].tolist())
+                ], batch_size=BULK_BATCH_SIZE)
+            log(f"  {start + count}/{total} posts")
+
+    used = np.flatnonzero(tag_uses)
+    add_hashtag_totals(list(zip(tag_ids[used].tolist(), tag_uses[used].tolist(), tag_engagement[used].tolist())))
+
+    log("Rebuilding rollups, best times and hashtag stats")
+    seeded = SocialAccount.objects.filter(id__in=account_ids.tolist())
+    for account in seeded:
+        refresh_daily_stats(account)
+    recompute_best_times(seeded)
+    recompute_hashtag_stats(sorted(set(user_ids.tolist())))
+
+    return len(accounts), total
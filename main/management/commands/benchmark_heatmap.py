@@ -0,0 +1,48 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import Avg
+from main.models import Post, SocialAccount
+from main.benchmarks import median_ms
+from main.besttimes import recompute_best_times
+from main.heatmap import posting_heatmap
+from main.loaddata import seed_load_data
+from main.viewbench import benchmark_test_database
+
+
+def legacy_heatmap(user):
+    # The original implementation: one aggregate query per (weekday, hour) cell
+    posts = Post.objects.filter(account__user=user)
+    result = []
+    for day_num in range(7):
+        hours = []
+        for hour in range(24):
+            avg_eng = posts.filter(
+                posted_at__week_day=day_num + 2 if day_num < 6 else 1,
+                posted_at__hour=hour
+            ).aggregate(avg=Avg('engagement_rate'))['avg'] or 0
+            hours.append(round(avg_eng, 2))
+        result.append(hours)
+    return result
+
+
+class Command(BaseCommand):
+    help = "Compare the per-cell query heatmap with the slot rollup heatmap (and its batch recompute) at several post counts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+        parser.add_argument('--accounts', type=int, default=4, help="Accounts owned by the benchmark user")
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'posts':>10} {'legacy ms':>12} {'rollup ms':>12} {'recompute ms':>14}")
+        for size in options['sizes']:
+            with benchmark_test_database():
+                seed_load_data(1, options['accounts'], max(1, size // options['accounts']), prefix='bench', log=lambda message: None)
+                user = User.objects.get()
+                accounts = list(SocialAccount.objects.filter(user=user))
+
+                legacy = median_ms(lambda: legacy_heatmap(user), options['repeat'])
+                rollup = median_ms(lambda: posting_heatmap(user), options['repeat'])
+                recompute = median_ms(lambda: recompute_best_times(accounts), options['repeat'])
+
+            self.stdout.write(f"{size:>10,} {legacy:>12.1f} {rollup:>12.1f} {recompute:>14.1f}")
@@ -0,0 +1,94 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+from main.models import SocialAccount, Post, AIInsight, QueryLog
+from main.benchmarks import ALIAS, benchmark_database, seed_posts, median_ms
+
+
+class Command(BaseCommand):
+    help = "Seed a throwaway SQLite database and compare query plans and timings without and with the composite indexes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--accounts', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per query")
+        parser.add_argument('--path', help="Database file to use (default: a temp file)")
+        parser.add_argument('--keep', action='store_true', help="Keep the database file afterwards")
+
+    def handle(self, *args, **options):
+        with benchmark_database(options['path'], options['keep'], log=self.stdout.write):
+            # Seed without the new indexes, then add them back for the second run
+            self.set_indexes(create=False)
+            started = time.perf_counter()
+            users, account_ids = seed_posts(options['posts'], options['accounts'])
+            self.seed_insights(users)
+            self.stdout.write(f"Seeded {options['posts']:,} posts in {time.perf_counter() - started:.1f}s")
+
+            account = SocialAccount.objects.using(ALIAS).get(id=account_ids[0])
+            before = self.measure(account, account.user, options['repeat'])
+
+            started = time.perf_counter()
+            self.set_indexes(create=True)
+            self.stdout.write(f"Built indexes in {time.perf_counter() - started:.1f}s")
+
+            after = self.measure(account, account.user, options['repeat'])
+            self.report(before, after)
+
+    def set_indexes(self, create):
+        with connections[ALIAS].schema_editor() as editor:
+            for model in [Post, AIInsight, QueryLog]:
+                for index in model._meta.indexes:
+                    if create:
+                        editor.add_index(model, index)
+                    else:
+                        editor.remove_index(model, index)
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def seed_insights(self, users):
+        with transaction.atomic(using=ALIAS):
+            for user in users:
+                AIInsight.objects.using(ALIAS).bulk_create([
+                    AIInsight(user=user, insight_type='trend', title="Insight", description="", priority=i % 5, is_read=i % 3 == 0)
+                    for i in range(50)
+                ])
+                QueryLog.objects.using(ALIAS).bulk_create([
+                    QueryLog(user=user, query="best post", response="", execution_time=0.01)
+                    for i in range(200)
+                ])
+
+    def queries(self, account, user):
+        posts = Post.objects.using(ALIAS).filter(account=account)
+        since = timezone.now() - timedelta(days=30)
+        return [
+            ("post grid page", posts.order_by('-posted_at', 'id')[:24]),
+            ("top posts", posts.order_by('-engagement_rate')[:5]),
+            ("recent posts", posts.filter(posted_at__gte=since).values('likes', 'comments')),
+            ("post type breakdown", posts.values('post_type').annotate(n=Count('id')).order_by()),
+            ("reels by engagement", posts.filter(post_type='reel').order_by('-engagement_rate')[:10]),
+            ("unread insights", AIInsight.objects.using(ALIAS).filter(user=user, is_read=False)),
+            ("recent queries", QueryLog.objects.using(ALIAS).filter(user=user).order_by('-created_at')[:10]),
+        ]
+
+    def measure(self, account, user, repeat):
+        results = {}
+        for name, queryset in self.queries(account, user):
+            results[name] = {
+                'plan': queryset.explain(),
+                'ms': median_ms(lambda: list(queryset.all()), repeat),
+            }
+        return results
+
+    def report(self, before, after):
+        for name in before:
+            self.stdout.write("")
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(f"  before: {before[name]['ms']:9.2f} ms")
+            for line in before[name]['plan'].splitlines():
+                self.stdout.write(f"    {line}")
+            self.stdout.write(f"  after:  {after[name]['ms']:9.2f} ms")
+            for line in after[name]['plan'].splitlines():
+                self.stdout.write(f"    {line}")
@@ -0,0 +1,75 @@
+import json
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from main.loaddata import seed_load_data
+from main.viewbench import (
+    DATASET_SIZES, benchmark_test_database, benchmark_views, budget_violations, git_revision, load_budgets,
+)
+
+
+class Command(BaseCommand):
+    help = "Seed test databases of several sizes, time the main views and fail on query, latency or memory budgets"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', choices=list(DATASET_SIZES), default=list(DATASET_SIZES))
+        parser.add_argument('--repeat', type=int, default=3, help="Timed requests per view")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--budgets', help="JSON file of budget overrides, e.g. {\"dashboard\": {\"queries\": 8}}")
+        parser.add_argument('--output', default='view_benchmarks.json', help="Where to write the JSON results")
+
+    def handle(self, *args, **options):
+        budgets = load_budgets(options['budgets'])
+        report = {
+            'revision': git_revision(),
+            'created_at': timezone.now().isoformat(),
+            'repeat': options['repeat'],
+            'budgets': budgets,
+            'sizes': {},
+            'violations': [],
+        }
+
+        setup_test_environment()
+        try:
+            for size in options['sizes']:
+                users, accounts_per_user, posts_per_account = DATASET_SIZES[size]
+                with benchmark_test_database():
+                    started = time.perf_counter()
+                    _, total = seed_load_data(
+                        users, accounts_per_user, posts_per_account,
+                        seed=options['seed'], prefix='bench', log=lambda message: None,
+                    )
+                    self.stdout.write(f"{size}: seeded {total:,} posts in {time.perf_counter() - started:.1f}s")
+
+                    results = benchmark_views(User.objects.get(username='bench0'), repeat=options['repeat'])
+
+                violations = budget_violations(size, results, budgets)
+                report['sizes'][size] = {
+                    'posts': total,
+                    'user_posts': accounts_per_user * posts_per_account,
+                    'views': results,
+                }
+                report['violations'].extend(violations)
+                self.write_table(results)
+        finally:
+            teardown_test_environment()
+
+        with open(options['output'], 'w') as handle:
+            json.dump(report, handle, indent=2)
+        self.stdout.write(f"Wrote {options['output']}")
+
+        if report['violations']:
+            for violation in report['violations']:
+                self.stderr.write(violation)
+            raise CommandError(f"{len(report['violations'])} budget violations")
+        self.stdout.write(self.style.SUCCESS("All views within budget"))
+
+    def write_table(self, results):
+        self.stdout.write(f"  {'view':<20} {'queries':>8} {'ms':>9} {'first ms':>9} {'peak KB':>9} {'bytes':>10}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"  {name:<20} {result['queries']:>8} {result['ms']:>9.1f} {result['ms_first']:>9.1f} "
+                f"{result['peak_kb']:>9.1f} {result['bytes']:>10,}"
+            )
@@ -0,0 +1,14 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from main.snapshots import compact_snapshots, SNAPSHOT_RETENTION
+
+
+class Command(BaseCommand):
+    help = "Fold raw post metric snapshots older than N days into downsampled per-post series"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=SNAPSHOT_RETENTION.days, help="Keep raw snapshots for this many days")
+
+    def handle(self, *args, **options):
+        compacted, series = compact_snapshots(timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f"Compacted {compacted} snapshots into {series} post series"))
@@ -0,0 +1,14 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from main.querylog import compact_query_logs
+
+
+class Command(BaseCommand):
+    help = "Roll QueryLog rows older than N days into per-day, per-intent aggregates"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help="Keep raw query logs for this many days")
+
+    def handle(self, *args, **options):
+        compacted, aggregates = compact_query_logs(timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f"Compacted {compacted} query logs into {aggregates} daily rows"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from main.models import SocialAccount
+from main.jobs import enqueue_sync
+
+
+class Command(BaseCommand):
+    help = "Queue Instagram sync jobs for the given accounts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('account_ids', nargs='+', type=int)
+        parser.add_argument('--backfill', action='store_true', help="Fetch the full post history, resuming from the last checkpoint")
+
+    def handle(self, *args, **options):
+        mode = 'backfill' if options['backfill'] else 'incremental'
+        accounts = SocialAccount.objects.filter(id__in=options['account_ids'], platform='instagram')
+        if not accounts:
+            raise CommandError("No matching Instagram accounts")
+
+        for account in accounts:
+            job = enqueue_sync(account, mode=mode)
+            self.stdout.write(f"Queued {job.mode} job {job.id} for {account}")
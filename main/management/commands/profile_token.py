@@ -0,0 +1,15 @@
+from urllib.parse import urlencode
+from django.core.management.base import BaseCommand
+from main.profiling import PROFILE_PARAM, PROFILE_TOKEN_MAX_AGE, profile_token
+
+
+class Command(BaseCommand):
+    help = "Print a signed query string that profiles requests to one path, without a staff session"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Request path, e.g. /viral-predictor/")
+
+    def handle(self, *args, **options):
+        query = urlencode({PROFILE_PARAM: profile_token(options['path'])})
+        self.stdout.write(f"{options['path']}?{query}")
+        self.stderr.write(f"Valid for {PROFILE_TOKEN_MAX_AGE // 60} minutes")
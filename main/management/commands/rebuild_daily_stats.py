@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from main.models import SocialAccount
+from main.rollups import refresh_daily_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the AccountDailyStats rollup from raw posts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--account', type=int, action='append', help="Only rebuild these account ids")
+
+    def handle(self, *args, **options):
+        accounts = SocialAccount.objects.all()
+        if options['account']:
+            accounts = accounts.filter(id__in=options['account'])
+
+        total_days = 0
+        for account in accounts.iterator():
+            days = refresh_daily_stats(account)
+            total_days += days
+            self.stdout.write(f"{account}: {days} days")
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total_days} daily rows"))
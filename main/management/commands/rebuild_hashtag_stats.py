@@ -0,0 +1,18 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from main.hashtags import recompute_hashtag_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild per-user hashtag stats from the post hashtag links"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', help="Only rebuild these user ids")
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['user']:
+            users = users.filter(id__in=options['user'])
+
+        rows = recompute_hashtag_stats(users)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} hashtag stats rows"))
@@ -0,0 +1,16 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from main.search import fts_available, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild and optimize the full-text caption index from main_post"
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError("The caption search index needs SQLite with FTS5; run migrate first")
+
+        started = time.perf_counter()
+        rebuild_search_index(connection)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt caption index in {time.perf_counter() - started:.1f}s"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from main.models import SocialAccount
+from main.besttimes import recompute_best_times
+
+
+class Command(BaseCommand):
+    help = "Rebuild BestTimeToPost for every account from one grouped query over posts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--account', type=int, action='append', help="Only rebuild these account ids")
+
+    def handle(self, *args, **options):
+        accounts = None
+        if options['account']:
+            accounts = SocialAccount.objects.filter(id__in=options['account'])
+
+        slots = recompute_best_times(accounts)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {slots} posting slots"))
@@ -0,0 +1,39 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from main.insights import users_needing_insights, refresh_insights_for
+
+
+class Command(BaseCommand):
+    help = "Regenerate AI insights for every user whose posts changed, on a process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Worker processes")
+        parser.add_argument('--force', action='store_true', help="Regenerate even when nothing changed")
+        parser.add_argument('--user', type=int, action='append', help="Only these user ids")
+
+    def handle(self, *args, **options):
+        user_ids = options['user'] or users_needing_insights(force=options['force'])
+        if not user_ids:
+            self.stdout.write("No users need new insights")
+            return
+
+        self.stdout.write(f"Refreshing insights for {len(user_ids)} users with {options['workers']} workers")
+        # Children must open their own database connections
+        connections.close_all()
+
+        refreshed = failed = 0
+        work = partial(refresh_insights_for, force=options['force'])
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            for user_id, result, error in pool.map(work, user_ids, chunksize=16):
+                if error:
+                    failed += 1
+                    self.stdout.write(f"❌ user {user_id}: {error}")
+                elif result:
+                    refreshed += 1
+                    created, removed = result
+                    self.stdout.write(f"✅ user {user_id}: {created} new, {removed} removed")
+
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {refreshed} users, {failed} failed"))
@@ -0,0 +1,36 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from main.exports import claim_next_export, requeue_stale_exports, run_export_job
+
+
+class Command(BaseCommand):
+    help = "Process queued export jobs; interrupted jobs resume from their last checkpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds to sleep when the queue is empty")
+        parser.add_argument('--stale-after', type=int, default=30, help="Requeue running jobs older than this many minutes")
+        parser.add_argument('--retry-failed', action='store_true', help="Also resume failed jobs")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is drained")
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_exports(timedelta(minutes=options['stale_after']), include_failed=options['retry_failed'])
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} export jobs")
+
+        try:
+            while True:
+                job = claim_next_export()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                self.stdout.write(f"Started export {job.id} ({job.format}) for {job.user}")
+                job = run_export_job(job)
+                self.stdout.write(f"Export {job.id} finished: {job.status} ({job.rows_written} rows)")
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping; the running export resumes from its checkpoint next time")
+
+        self.stdout.write(self.style.SUCCESS("Export worker stopped"))
@@ -0,0 +1,56 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection
+from main.jobs import claim_next_job, requeue_stale_jobs, run_sync_job
+
+
+def _run(job):
+    try:
+        return run_sync_job(job)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = "Process queued Instagram sync jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2, help="Maximum jobs running at once")
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds to sleep when the queue is empty")
+        parser.add_argument('--stale-after', type=int, default=30, help="Requeue running jobs older than this many minutes")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is drained")
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+
+        requeued = requeue_stale_jobs(timedelta(minutes=options['stale_after']))
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale jobs")
+
+        running = set()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            try:
+                while True:
+                    while len(running) < concurrency:
+                        job = claim_next_job()
+                        if job is None:
+                            break
+                        self.stdout.write(f"Started job {job.id} for {job.account}")
+                        running.add(pool.submit(_run, job))
+
+                    if not running:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+                        continue
+
+                    done, running = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job = future.result()
+                        self.stdout.write(f"Job {job.id} finished: {job.status}")
+            except KeyboardInterrupt:
+                self.stdout.write("Waiting for running jobs to finish...")
+
+        self.stdout.write(self.style.SUCCESS("Sync worker stopped"))
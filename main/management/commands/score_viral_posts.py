@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from main.models import Post
+from main.viral import score_posts
+
+
+class Command(BaseCommand):
+    help = "Re-score PostAnalytics.viral_score for all posts; run periodically so the recent-post bonus expires"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', help="Only score posts of these user ids")
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        if options['user']:
+            posts = posts.filter(account__user_id__in=options['user'])
+
+        scored = score_posts(posts)
+        self.stdout.write(self.style.SUCCESS(f"Scored {scored} posts"))
@@ -0,0 +1,43 @@
+import time
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from main.loaddata import seed_load_data
+
+
+class Command(BaseCommand):
+    help = "Generate a deterministic synthetic dataset (users x accounts x posts) for load testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--accounts', type=int, default=2, help="Accounts per user")
+        parser.add_argument('--posts', type=int, default=500, help="Posts per account")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--days', type=int, default=365, help="Spread posts over this many days")
+        parser.add_argument('--hashtags', type=int, default=5000, help="Hashtag vocabulary size")
+        parser.add_argument('--prefix', default='load', help="Username prefix for generated users")
+        parser.add_argument('--password', default='loadtest', help="Password shared by generated users")
+        parser.add_argument('--end', help="Last day of posting (YYYY-MM-DD); defaults to today, which "
+                                          "together with --seed makes runs reproducible")
+
+    def handle(self, *args, **options):
+        end = None
+        if options['end']:
+            try:
+                end = timezone.make_aware(datetime.strptime(options['end'], '%Y-%m-%d'))
+            except ValueError:
+                raise CommandError("--end must be a YYYY-MM-DD date")
+
+        started = time.perf_counter()
+        try:
+            accounts, posts = seed_load_data(
+                options['users'], options['accounts'], options['posts'],
+                seed=options['seed'], days=options['days'], hashtag_count=options['hashtags'],
+                prefix=options['prefix'], password=options['password'], end=end,
+                log=self.stdout.write,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {posts} posts across {accounts} accounts in {time.perf_counter() - started:.1f}s"
+        ))
@@ -0,0 +1,40 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from main.scheduler import TokenBucket, stale_accounts, sync_accounts
+
+
+class Command(BaseCommand):
+    help = "Refresh the stalest Instagram accounts on a rate-limited thread pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100, help="Maximum accounts to sync this run")
+        parser.add_argument('--stale-after', type=int, default=60, help="Only sync accounts not synced for this many minutes")
+        parser.add_argument('--workers', type=int, default=4, help="Concurrent fetch threads")
+        parser.add_argument('--rate', type=float, default=0.5, help="Requests per second shared by all workers")
+        parser.add_argument('--burst', type=int, default=5, help="Token bucket capacity")
+        parser.add_argument('--budget', type=int, default=600, help="Stop starting new fetches after this many seconds")
+        parser.add_argument('--retries', type=int, default=3, help="Retries per account on rate limiting or network errors")
+
+    def handle(self, *args, **options):
+        if options['rate'] <= 0:
+            raise CommandError("--rate must be positive")
+
+        accounts = stale_accounts(timedelta(minutes=options['stale_after']), limit=options['limit'])
+        if not accounts:
+            self.stdout.write("No stale accounts")
+            return
+
+        self.stdout.write(f"Syncing {len(accounts)} accounts with {options['workers']} workers")
+        summary = sync_accounts(
+            accounts,
+            workers=options['workers'],
+            limiter=TokenBucket(options['rate'], options['burst']),
+            budget=options['budget'],
+            retries=options['retries'],
+            log=self.stdout.write,
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Synced {summary['synced']}, failed {summary['failed']}, skipped {summary['skipped']} "
+            f"({summary['inserted']} new posts, {summary['updated']} updated)"
+        ))
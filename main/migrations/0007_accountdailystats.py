@@ -0,0 +1,76 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:00
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+# Frozen copy of main.rollups.INSTAGRAM_SHORTCODE_RE: only real shortcodes count on Instagram
+INSTAGRAM_SHORTCODE_RE = r'^[A-Za-z0-9_-]{10,12}$'
+
+
+def build_daily_stats(apps, schema_editor):
+    Post = apps.get_model('main', 'Post')
+    AccountDailyStats = apps.get_model('main', 'AccountDailyStats')
+    fields = ['post_count', 'likes', 'comments', 'shares', 'views', 'engagement_sum']
+    db_alias = schema_editor.connection.alias
+
+    # The same posts main.rollups.counted_posts counts
+    counted = Post.objects.using(db_alias).filter(
+        ~Q(account__platform='instagram') | Q(post_id__isnull=False, post_id__regex=INSTAGRAM_SHORTCODE_RE)
+    )
+    rows = counted.annotate(
+        day=TruncDate('posted_at')
+    ).values('account_id', 'day', 'post_type').annotate(
+        post_count=Count('id'),
+        likes=Sum('likes'),
+        comments=Sum('comments'),
+        shares=Sum('shares'),
+        views=Sum('views'),
+        engagement_sum=Sum('engagement_rate'),
+    ).order_by()
+
+    days = {}
+    for row in rows:
+        key = (row['account_id'], row['day'])
+        stats = days.get(key)
+        if stats is None:
+            stats = AccountDailyStats(account_id=row['account_id'], date=row['day'], post_type_breakdown={})
+            days[key] = stats
+        type_stats = {field: row[field] or 0 for field in fields}
+        stats.post_type_breakdown[row['post_type']] = type_stats
+        for field in fields:
+            setattr(stats, field, getattr(stats, field) + type_stats[field])
+
+    AccountDailyStats.objects.using(db_alias).bulk_create(days.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_auto_20251224_0051'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('post_count', models.IntegerField(default=0)),
+                ('likes', models.IntegerField(default=0)),
+                ('comments', models.IntegerField(default=0)),
+                ('shares', models.IntegerField(default=0)),
+                ('views', models.IntegerField(default=0)),
+                ('engagement_sum', models.FloatField(default=0.0)),
+                ('post_type_breakdown', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.socialaccount')),
+            ],
+            options={
+                'ordering': ['date'],
+                'unique_together': {('account', 'date')},
+            },
+        ),
+        migrations.RunPython(build_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_syncjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='socialaccount',
+            name='backfill_checkpoint',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='socialaccount',
+            name='last_post_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='socialaccount',
+            name='last_post_shortcode',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='syncjob',
+            name='mode',
+            field=models.CharField(choices=[('incremental', 'Incremental'), ('backfill', 'Full Backfill')], default='incremental', max_length=20),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_auto_20261018_1803'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='aiinsight',
+            index=models.Index(fields=['user', 'is_read'], name='insight_user_read_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['account', '-posted_at'], name='post_account_posted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['account', '-engagement_rate'], name='post_account_engagement_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['account', 'post_type'], name='post_account_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='querylog',
+            index=models.Index(fields=['user', '-created_at'], name='querylog_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:11
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay
+
+
+def build_best_times(apps, schema_editor):
+    Post = apps.get_model('main', 'Post')
+    BestTimeToPost = apps.get_model('main', 'BestTimeToPost')
+    db_alias = schema_editor.connection.alias
+
+    rows = Post.objects.using(db_alias).annotate(
+        weekday=ExtractIsoWeekDay('posted_at'),
+        slot_hour=ExtractHour('posted_at'),
+    ).values('account_id', 'weekday', 'slot_hour').annotate(
+        post_count=Count('id'),
+        engagement_sum=Sum('engagement_rate'),
+    ).order_by()
+
+    BestTimeToPost.objects.using(db_alias).all().delete()
+    BestTimeToPost.objects.using(db_alias).bulk_create([
+        BestTimeToPost(
+            account_id=row['account_id'],
+            day_of_week=row['weekday'] - 1,
+            hour=row['slot_hour'],
+            post_count=row['post_count'],
+            engagement_sum=row['engagement_sum'] or 0,
+            avg_engagement=(row['engagement_sum'] or 0) / row['post_count'],
+        )
+        for row in rows
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_auto_20261018_1809'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='besttimetopost',
+            name='engagement_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='besttimetopost',
+            index=models.Index(fields=['account', '-avg_engagement'], name='besttime_account_avg_idx'),
+        ),
+        migrations.RunPython(build_best_times, migrations.RunPython.noop),
+    ]
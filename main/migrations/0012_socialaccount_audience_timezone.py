@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_auto_20261018_1811'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='socialaccount',
+            name='audience_timezone',
+            field=models.CharField(default='UTC', max_length=64),
+        ),
+    ]
@@ -0,0 +1,64 @@
+from django.db import migrations, OperationalError
+
+# Frozen copy of the FTS5 schema as of this migration; main.search may change later
+SEARCH_TABLE = 'main_post_fts'
+
+CREATE_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(caption, owner)",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON main_post BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, caption, owner)
+        SELECT new.id, new.caption, 'u' || user_id FROM main_socialaccount WHERE id = new.account_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON main_post BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au AFTER UPDATE OF caption ON main_post
+    WHEN new.caption IS NOT old.caption BEGIN
+        UPDATE {SEARCH_TABLE} SET caption = new.caption WHERE rowid = new.id;
+    END""",
+]
+
+REBUILD_SQL = [
+    f"DELETE FROM {SEARCH_TABLE}",
+    f"""INSERT INTO {SEARCH_TABLE}(rowid, caption, owner)
+        SELECT main_post.id, main_post.caption, 'u' || main_socialaccount.user_id
+        FROM main_post JOIN main_socialaccount ON main_socialaccount.id = main_post.account_id""",
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')",
+]
+
+DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_au",
+    f"DROP TABLE IF EXISTS {SEARCH_TABLE}",
+]
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(CREATE_SQL[0])
+    except OperationalError:
+        # SQLite built without FTS5; search falls back to icontains
+        return
+    for sql in CREATE_SQL[1:] + REBUILD_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_auto_20261018_1831'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
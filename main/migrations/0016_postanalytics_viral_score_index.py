@@ -0,0 +1,86 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:49
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+
+# Frozen copy of the scoring rules as of this migration; main.viral may change later
+LIKES_TIERS = [(1000, 30), (500, 20), (100, 10)]
+ENGAGEMENT_TIERS = [(8, 25), (5, 15), (3, 10)]
+SHARES_TIERS = [(100, 20), (50, 15), (20, 10)]
+COMMENTS_TIERS = [(100, 15), (50, 10), (20, 5)]
+RECENT_SECONDS = 86400
+RECENT_POINTS = 10
+MAX_SCORE = 100
+
+
+def tier_points(value, tiers):
+    for threshold, points in tiers:
+        if value > threshold:
+            return points
+    return 0
+
+
+def viral_score(likes, engagement_rate, shares, comments, age_seconds):
+    score = (
+        tier_points(likes, LIKES_TIERS)
+        + tier_points(engagement_rate, ENGAGEMENT_TIERS)
+        + tier_points(shares, SHARES_TIERS)
+        + tier_points(comments, COMMENTS_TIERS)
+        + (RECENT_POINTS if age_seconds < RECENT_SECONDS else 0)
+    )
+    return float(min(score, MAX_SCORE))
+
+
+def score_existing_posts(apps, schema_editor):
+    # Replace the placeholder random scores with real ones
+    Post = apps.get_model('main', 'Post')
+    PostAnalytics = apps.get_model('main', 'PostAnalytics')
+    db_alias = schema_editor.connection.alias
+
+    rows = list(Post.objects.using(db_alias).values_list(
+        'id', 'account__user_id', 'likes', 'engagement_rate', 'shares', 'comments', 'posted_at'
+    ))
+    if not rows:
+        return
+    now = timezone.now()
+    scores = {
+        post_id: viral_score(likes or 0, engagement_rate or 0, shares or 0, comments or 0, (now - posted_at).total_seconds())
+        for post_id, _, likes, engagement_rate, shares, comments, posted_at in rows
+    }
+    owners = {post_id: user_id for post_id, user_id, *_ in rows}
+
+    analytics = list(PostAnalytics.objects.using(db_alias).only('id', 'post_id'))
+    for row in analytics:
+        row.viral_score = scores[row.post_id]
+        row.user_id = owners[row.post_id]
+    PostAnalytics.objects.using(db_alias).bulk_update(analytics, ['viral_score', 'user'], batch_size=500)
+
+    scored = {row.post_id for row in analytics}
+    PostAnalytics.objects.using(db_alias).bulk_create([
+        PostAnalytics(post_id=post_id, user_id=owners[post_id], viral_score=score)
+        for post_id, score in scores.items() if post_id not in scored
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('main', '0015_post_caption_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postanalytics',
+            name='user',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='postanalytics',
+            index=models.Index(fields=['user', '-viral_score', '-id'], name='analytics_user_viral_idx'),
+        ),
+        migrations.RunPython(score_existing_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,113 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:53
+
+import struct
+from django.db import migrations, models
+import django.db.models.deletion
+
+HOUR_COLUMNS = [0, 1, 3, 6, 12, 24, 48, 72]
+# Frozen copy of the series format as of this migration: little-endian int32
+# (seconds, likes, comments, views) rows
+SAMPLE_ROW = struct.Struct('<4i')
+INT32_MIN, INT32_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+def pack_samples(samples):
+    return b''.join(
+        SAMPLE_ROW.pack(*(min(max(int(value), INT32_MIN), INT32_MAX) for value in sample))
+        for sample in samples
+    )
+
+
+def hour_columns_to_series(apps, schema_editor):
+    # Carry the old fixed hour_N like counts over as each post's packed series
+    PostAnalytics = apps.get_model('main', 'PostAnalytics')
+    PostMetricSeries = apps.get_model('main', 'PostMetricSeries')
+    db_alias = schema_editor.connection.alias
+
+    fields = [f'hour_{hours}' for hours in HOUR_COLUMNS]
+    rows = PostAnalytics.objects.using(db_alias).exclude(**{field: 0 for field in fields}).order_by('post_id', '-id')
+    series = {}
+    for row in rows.values('post_id', 'post__posted_at', *fields):
+        if row['post_id'] in series:
+            continue
+        samples = [(hours * 3600, row[f'hour_{hours}'], 0, 0) for hours in HOUR_COLUMNS]
+        series[row['post_id']] = PostMetricSeries(
+            post_id=row['post_id'],
+            origin=row['post__posted_at'],
+            samples=pack_samples(samples),
+            sample_count=len(samples),
+        )
+    PostMetricSeries.objects.using(db_alias).bulk_create(series.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0016_postanalytics_viral_score_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostMetricSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('likes', models.IntegerField(default=0)),
+                ('comments', models.IntegerField(default=0)),
+                ('views', models.IntegerField(default=0)),
+                ('post', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='main.post')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PostMetricSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origin', models.DateTimeField()),
+                ('samples', models.BinaryField(default=b'')),
+                ('sample_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='metric_series', to='main.post')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='postmetricsnapshot',
+            index=models.Index(fields=['post', 'taken_at'], name='snapshot_post_taken_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postmetricsnapshot',
+            index=models.Index(fields=['taken_at'], name='snapshot_taken_idx'),
+        ),
+        migrations.RunPython(hour_columns_to_series, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='postanalytics',
+            name='hour_0',
+        ),
+        migrations.RemoveField(
+            model_name='postanalytics',
+            name='hour_1',
+        ),
+        migrations.RemoveField(
+            model_name='postanalytics',
+            name='hour_3',
+        ),
+        migrations.RemoveField(
+            model_name='postanalytics',
+            name='hour_6',
+        ),
+        migrations.RemoveField(
+            model_name='postanalytics',
+            name='hour_12',
+        ),
+        migrations.RemoveField(
+            model_name='postanalytics',
+            name='hour_24',
+        ),
+        migrations.RemoveField(
+            model_name='postanalytics',
+            name='hour_48',
+        ),
+        migrations.RemoveField(
+            model_name='postanalytics',
+            name='hour_72',
+        ),
+    ]
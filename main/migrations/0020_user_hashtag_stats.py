@@ -0,0 +1,76 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:28
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+import django.db.models.deletion
+
+
+def build_hashtag_stats(apps, schema_editor):
+    # Per-user stats and the global totals, each from one grouped query over the links
+    Hashtag = apps.get_model('main', 'Hashtag')
+    PostHashtag = apps.get_model('main', 'PostHashtag')
+    UserHashtagStats = apps.get_model('main', 'UserHashtagStats')
+    db_alias = schema_editor.connection.alias
+    links = PostHashtag.objects.using(db_alias)
+
+    UserHashtagStats.objects.using(db_alias).bulk_create([
+        UserHashtagStats(
+            user_id=row['post__account__user_id'],
+            hashtag_id=row['hashtag_id'],
+            uses=row['uses'],
+            engagement_sum=row['engagement_sum'] or 0,
+            avg_engagement=(row['engagement_sum'] or 0) / row['uses'],
+            last_used_at=row['last_used_at'],
+        )
+        for row in links.values('post__account__user_id', 'hashtag_id').annotate(
+            uses=Count('id'),
+            engagement_sum=Sum('post__engagement_rate'),
+            last_used_at=Max('post__posted_at'),
+        ).order_by()
+    ], batch_size=500)
+
+    totals = {
+        row['hashtag_id']: row
+        for row in links.values('hashtag_id').annotate(
+            uses=Count('id'), engagement_sum=Sum('post__engagement_rate')
+        ).order_by()
+    }
+    hashtags = list(Hashtag.objects.using(db_alias).only('id'))
+    for hashtag in hashtags:
+        row = totals.get(hashtag.id)
+        hashtag.total_uses = row['uses'] if row else 0
+        hashtag.avg_engagement = (row['engagement_sum'] or 0) / row['uses'] if row else 0.0
+    Hashtag.objects.using(db_alias).bulk_update(hashtags, ['total_uses', 'avg_engagement'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('main', '0019_requestprofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserHashtagStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uses', models.IntegerField(default=0)),
+                ('engagement_sum', models.FloatField(default=0)),
+                ('avg_engagement', models.FloatField(default=0)),
+                ('last_used_at', models.DateTimeField(blank=True, null=True)),
+                ('hashtag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.hashtag')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='userhashtagstats',
+            index=models.Index(fields=['user', '-avg_engagement', 'hashtag'], name='hashtagstats_user_avg_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='userhashtagstats',
+            unique_together={('user', 'hashtag')},
+        ),
+        migrations.RunPython(build_hashtag_stats, migrations.RunPython.noop),
+    ]
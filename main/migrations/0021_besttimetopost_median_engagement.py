@@ -0,0 +1,26 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:43
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def seed_medians(apps, schema_editor):
+    # The mean stands in until the next recompute_best_times fills in the real medians
+    BestTimeToPost = apps.get_model('main', 'BestTimeToPost')
+    BestTimeToPost.objects.using(schema_editor.connection.alias).update(median_engagement=F('avg_engagement'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0020_user_hashtag_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='besttimetopost',
+            name='median_engagement',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(seed_medians, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0021_besttimetopost_median_engagement'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestprofile',
+            name='overhead_ms',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='requestprofile',
+            name='streamed',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 3.2.25 on 2026-10-18 20:01
+
+from collections import defaultdict
+from django.db import migrations, models
+import pytz
+
+
+def audience_tz(name):
+    # Frozen copy of main.models.audience_tz
+    try:
+        return pytz.timezone(name or 'UTC')
+    except pytz.UnknownTimeZoneError:
+        return pytz.utc
+
+
+def build_engagement_counts(apps, schema_editor):
+    # One streamed read of the posts; rates are counted to two decimals, as the writer does
+    BestTimeToPost = apps.get_model('main', 'BestTimeToPost')
+    Post = apps.get_model('main', 'Post')
+    SocialAccount = apps.get_model('main', 'SocialAccount')
+    db_alias = schema_editor.connection.alias
+
+    zones = {
+        account_id: audience_tz(zone)
+        for account_id, zone in SocialAccount.objects.using(db_alias).values_list('id', 'audience_timezone')
+    }
+    counts = defaultdict(lambda: defaultdict(int))
+    posts = Post.objects.using(db_alias).values_list('account_id', 'posted_at', 'engagement_rate')
+    for account_id, posted_at, engagement_rate in posts.iterator(chunk_size=10000):
+        local = posted_at.astimezone(zones[account_id])
+        counts[(account_id, local.weekday(), local.hour)][f"{engagement_rate or 0:.2f}"] += 1
+
+    slots = list(BestTimeToPost.objects.using(db_alias).all())
+    for slot in slots:
+        slot.engagement_counts = dict(counts.get((slot.account_id, slot.day_of_week, slot.hour), {}))
+    BestTimeToPost.objects.using(db_alias).bulk_update(slots, ['engagement_counts'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0022_requestprofile_overhead_streamed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='besttimetopost',
+            name='engagement_counts',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.RunPython(build_engagement_counts, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='besttimetopost',
+            name='median_engagement',
+        ),
+    ]
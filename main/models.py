@@ -2,6 +2,14 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 import json
+import pytz
+
+
+def audience_tz(name):
+    try:
+        return pytz.timezone(name or 'UTC')
+    except pytz.UnknownTimeZoneError:
+        return pytz.utc
 
 class SocialAccount(models.Model):
     PLATFORM_CHOICES = [
@@ -26,6 +34,11 @@ class SocialAccount(models.Model):
     posts_count = models.IntegerField(default=0)
 
     last_synced = models.DateTimeField(null=True, blank=True)  
+    last_post_shortcode = models.CharField(max_length=200, blank=True)
+    last_post_at = models.DateTimeField(null=True, blank=True)
+    backfill_checkpoint = models.JSONField(null=True, blank=True)
+    # Posting-time analytics bucket by the audience's local clock
+    audience_timezone = models.CharField(max_length=64, default='UTC')
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -36,6 +49,10 @@ class SocialAccount(models.Model):
     def __str__(self):
         return f"{self.username} - {self.platform}"
 
+    @property
+    def audience_tzinfo(self):
+        return audience_tz(self.audience_timezone)
+
 
 
 class Post(models.Model):
@@ -67,6 +84,11 @@ class Post(models.Model):
     class Meta:
         unique_together = ['account', 'post_id']
         ordering = ['-posted_at']
+        indexes = [
+            models.Index(fields=['account', '-posted_at'], name='post_account_posted_idx'),
+            models.Index(fields=['account', '-engagement_rate'], name='post_account_engagement_idx'),
+            models.Index(fields=['account', 'post_type'], name='post_account_type_idx'),
+        ]
     
     def calculate_engagement_rate(self):
         if self.account.followers_count > 0:
@@ -78,18 +100,40 @@ class Post(models.Model):
 
 class PostAnalytics(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE)
-    hour_0 = models.IntegerField(default=0)
-    hour_1 = models.IntegerField(default=0)
-    hour_3 = models.IntegerField(default=0)
-    hour_6 = models.IntegerField(default=0)
-    hour_12 = models.IntegerField(default=0)
-    hour_24 = models.IntegerField(default=0)
-    hour_48 = models.IntegerField(default=0)
-    hour_72 = models.IntegerField(default=0)
+    # Copied from post.account so a user's top viral posts come straight off one index
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, db_index=False)
     sentiment_score = models.FloatField(default=0.0)
     viral_score = models.FloatField(default=0.0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-viral_score', '-id'], name='analytics_user_viral_idx'),
+        ]
+
+class PostMetricSnapshot(models.Model):
+    # Append-only raw samples, one per post per sync; compacted into PostMetricSeries
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, db_index=False)
+    taken_at = models.DateTimeField()
+    likes = models.IntegerField(default=0)
+    comments = models.IntegerField(default=0)
+    views = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'taken_at'], name='snapshot_post_taken_idx'),
+            models.Index(fields=['taken_at'], name='snapshot_taken_idx'),
+        ]
+
+class PostMetricSeries(models.Model):
+    # Downsampled history as packed little-endian int32 rows of
+    # (seconds since origin, likes, comments, views)
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, related_name='metric_series')
+    origin = models.DateTimeField()
+    samples = models.BinaryField(default=b'')
+    sample_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
 class Hashtag(models.Model):
     tag = models.CharField(max_length=100, unique=True)
     total_uses = models.IntegerField(default=0)
@@ -103,6 +147,21 @@ class PostHashtag(models.Model):
     class Meta:
         unique_together = ['post', 'hashtag']
 
+class UserHashtagStats(models.Model):
+    # Per-user running totals, adjusted with F() increments as posts are written
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE)
+    uses = models.IntegerField(default=0)
+    engagement_sum = models.FloatField(default=0)
+    avg_engagement = models.FloatField(default=0)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ['user', 'hashtag']
+        indexes = [
+            models.Index(fields=['user', '-avg_engagement', 'hashtag'], name='hashtagstats_user_avg_idx'),
+        ]
+
 class AIInsight(models.Model):
     INSIGHT_TYPE_CHOICES = [
         ('recommendation', 'Recommendation'),
@@ -121,6 +180,9 @@ class AIInsight(models.Model):
     
     class Meta:
         ordering = ['-priority', '-created_at']
+        indexes = [
+            models.Index(fields=['user', 'is_read'], name='insight_user_read_idx'),
+        ]
 
 class BestTimeToPost(models.Model):
     DAYS_OF_WEEK = [
@@ -138,9 +200,16 @@ class BestTimeToPost(models.Model):
     hour = models.IntegerField()
     avg_engagement = models.FloatField()
     post_count = models.IntegerField()
+    # Running total so new posts adjust the average without rescanning
+    engagement_sum = models.FloatField(default=0)
+    # Engagement rate (to two decimals) -> post count, so medians need no post reads
+    engagement_counts = models.JSONField(default=dict)
     
     class Meta:
         unique_together = ['account', 'day_of_week', 'hour']
+        indexes = [
+            models.Index(fields=['account', '-avg_engagement'], name='besttime_account_avg_idx'),
+        ]
 
 class CompetitorAnalysis(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -156,5 +225,161 @@ class QueryLog(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     query = models.TextField()
     response = models.TextField()
+    intent = models.CharField(max_length=50, blank=True)
     execution_time = models.FloatField()
-    created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='querylog_user_created_idx'),
+        ]
+
+class QueryLogDaily(models.Model):
+    # Compacted QueryLog history: one row per user, day and intent
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    date = models.DateField()
+    intent = models.CharField(max_length=50, blank=True)
+    count = models.IntegerField(default=0)
+    p50_execution_time = models.FloatField(default=0)
+    p95_execution_time = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ['user', 'date', 'intent']
+        ordering = ['date']
+
+class AccountDailyStats(models.Model):
+    account = models.ForeignKey(SocialAccount, on_delete=models.CASCADE)
+    date = models.DateField()
+    post_count = models.IntegerField(default=0)
+    likes = models.IntegerField(default=0)
+    comments = models.IntegerField(default=0)
+    shares = models.IntegerField(default=0)
+    views = models.IntegerField(default=0)
+    engagement_sum = models.FloatField(default=0.0)
+    post_type_breakdown = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['account', 'date']
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.account} - {self.date}"
+
+
+class SyncJob(models.Model):
+    MODE_CHOICES = [
+        ('incremental', 'Incremental'),
+        ('backfill', 'Full Backfill'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('success', 'Success'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Kept after a failed first sync removes its account, so the error can still be shown
+    account = models.ForeignKey(SocialAccount, on_delete=models.SET_NULL, null=True)
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES, default='incremental')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    progress = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Sync {self.account} ({self.status})"
+
+    @property
+    def is_active(self):
+        return self.status in ('pending', 'running')
+
+class ExportJob(models.Model):
+    FORMAT_CHOICES = [
+        ('ndjson', 'NDJSON'),
+        ('parquet', 'Parquet'),
+        ('csv', 'CSV'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('success', 'Success'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='ndjson')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # Delta exports cover posts updated in (since, until]; until is fixed when the job is created
+    since = models.DateTimeField(null=True, blank=True)
+    until = models.DateTimeField()
+    # Checkpoint: last exported post id and how much of the output is known to be complete
+    cursor = models.BigIntegerField(default=0)
+    rows_written = models.IntegerField(default=0)
+    total_rows = models.IntegerField(default=0)
+    bytes_written = models.BigIntegerField(default=0)
+    parts = models.IntegerField(default=0)
+    file_path = models.CharField(max_length=500, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Export {self.id} for {self.user} ({self.status})"
+
+    @property
+    def is_active(self):
+        return self.status in ('pending', 'running')
+
+class UserDataVersion(models.Model):
+    # Watermark bumped whenever a user's posts change; derived data records the
+    # version it was built from and is only rebuilt when the two differ
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='data_version')
+    version = models.IntegerField(default=0)
+    insights_version = models.IntegerField(default=0)
+    insights_generated_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user} v{self.version}"
+
+class RequestProfile(models.Model):
+    # A cProfile dump of one request, kept on disk under PROFILE_ROOT
+    TRIGGER_CHOICES = [
+        ('staff', 'Staff request'),
+        ('token', 'Signed token'),
+        ('slow', 'Slow request sample'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view_name = models.CharField(max_length=200, blank=True)
+    status_code = models.IntegerField(null=True)
+    trigger = models.CharField(max_length=10, choices=TRIGGER_CHOICES)
+    # Estimated without the profiler: its own cost is measured separately as overhead_ms
+    duration_ms = models.FloatField()
+    overhead_ms = models.FloatField(default=0)
+    function_calls = models.IntegerField(default=0)
+    # The body was sent after the view returned, so only the view itself was profiled
+    streamed = models.BooleanField(default=False)
+    file_path = models.CharField(max_length=500)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
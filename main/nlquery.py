@@ -0,0 +1,220 @@
+import hashlib
+import re
+from datetime import timedelta
+from django.core.cache import cache
+from django.db.models import Avg, Count, Sum
+from django.db.models.functions import ExtractHour
+from django.utils import timezone
+from .models import Post, Hashtag
+from .versions import current_data_version
+from .search import search_posts, search_terms
+from .hashtags import top_user_hashtags
+
+QUERY_CACHE_TTL = 900
+
+PLATFORM_RE = re.compile(r'\b(instagram|twitter|facebook|tiktok|youtube|linkedin)\b')
+POST_TYPE_RE = re.compile(r'\b(reel|carousel|static|story|video|photo)s?\b')
+PERIOD_RE = re.compile(r'\b(?:last|past)\s+(?:(\d+)\s+)?(day|week|month|year)s?\b')
+SEARCH_RE = re.compile(r'\b(?:posts?|captions?)\s+(?:about|mentioning|containing)\s+(.+)')
+PERIOD_DAYS = {'day': 1, 'week': 7, 'month': 30, 'year': 365}
+# Params that narrow filtered_posts
+FILTER_PARAMS = {'platform', 'post_type', 'days'}
+POST_TYPE_LABELS = {'reel': 'Reels', 'carousel': 'Carousels', 'static': 'Static posts'}
+
+# Checked in order; the first match wins, as with the old if-chain
+INTENTS = [
+    ('search', SEARCH_RE),
+    ('best_post', re.compile(r'(?=.*best)(?=.*post)', re.S)),
+    ('worst_post', re.compile(r'(?=.*worst)(?=.*post)', re.S)),
+    ('engagement_rate', re.compile(r'(?=.*engagement)(?=.*rate)', re.S)),
+    ('total_likes', re.compile(r'(?=.*total)(?=.*likes)', re.S)),
+    ('period_summary', PERIOD_RE),
+    ('post_type', POST_TYPE_RE),
+    ('hashtags', re.compile(r'hashtag')),
+    ('best_time', re.compile(r'(?=.*when)(?=.*post)', re.S)),
+    ('platform', PLATFORM_RE),
+]
+
+HELP_TEXT = "I analyzed your query but need more specific information. Try asking about: 'best post', 'engagement rate', 'total likes', 'last week performance', 'reel vs carousel', 'best hashtags', or 'when to post'."
+
+
+def extract_params(query):
+    params = {}
+    match = PLATFORM_RE.search(query)
+    if match:
+        params['platform'] = match.group(1)
+    match = POST_TYPE_RE.search(query)
+    if match:
+        params['post_type'] = match.group(1)
+    match = SEARCH_RE.search(query)
+    if match:
+        params['text'] = ' '.join(search_terms(match.group(1)))
+    match = PERIOD_RE.search(query)
+    if match:
+        amount = int(match.group(1) or 1)
+        unit = match.group(2)
+        params['days'] = amount * PERIOD_DAYS[unit]
+        params['period'] = f"last {amount} {unit}s" if amount > 1 else f"last {unit}"
+    return params
+
+
+def classify(query):
+    query = query.lower()
+    params = extract_params(query)
+    for intent, pattern in INTENTS:
+        if pattern.search(query):
+            return intent, params
+    return 'help', params
+
+
+def filtered_posts(user, params):
+    posts = Post.objects.filter(account__user=user)
+    if 'platform' in params:
+        posts = posts.filter(account__platform=params['platform'])
+    if 'post_type' in params:
+        posts = posts.filter(post_type=params['post_type'])
+    if 'days' in params:
+        posts = posts.filter(posted_at__gte=timezone.now() - timedelta(days=params['days']))
+    return posts
+
+
+def best_post(user, params):
+    post = filtered_posts(user, params).order_by('-engagement_rate').values(
+        'account__platform', 'engagement_rate', 'likes', 'comments', 'shares', 'posted_at'
+    ).first()
+    if post:
+        return f"Your best performing post was on {post['account__platform']} with {post['engagement_rate']:.2f}% engagement rate. It received {post['likes']} likes, {post['comments']} comments, and {post['shares']} shares. Posted on {post['posted_at'].strftime('%B %d, %Y')}."
+    return "No posts found."
+
+
+def worst_post(user, params):
+    post = filtered_posts(user, params).order_by('engagement_rate').values(
+        'account__platform', 'engagement_rate'
+    ).first()
+    if post:
+        return f"Your lowest performing post was on {post['account__platform']} with {post['engagement_rate']:.2f}% engagement rate. Consider analyzing what went wrong - was it the timing, content type, or hashtags?"
+    return "No posts found."
+
+
+def engagement_rate(user, params):
+    avg_engagement = filtered_posts(user, params).aggregate(avg=Avg('engagement_rate'))['avg']
+    if avg_engagement:
+        return f"Your average engagement rate across all posts is {avg_engagement:.2f}%. Industry average is typically 3-6%, so you're {'performing well!' if avg_engagement > 4 else 'below average. Consider improving your content strategy.'}"
+    return "No engagement data available."
+
+
+def total_likes(user, params):
+    total = filtered_posts(user, params).aggregate(total=Sum('likes'))['total'] or 0
+    return f"You have received a total of {total:,} likes across all your posts! Keep up the great work."
+
+
+def period_summary(user, params):
+    stats = filtered_posts(user, params).aggregate(
+        count=Count('id'),
+        likes=Sum('likes'),
+        comments=Sum('comments'),
+        shares=Sum('shares')
+    )
+    return f"In the {params['period']}, you posted {stats['count']} times with {stats['likes'] or 0} likes, {stats['comments'] or 0} comments, and {stats['shares'] or 0} shares."
+
+
+def post_type_summary(user, params):
+    post_type = params['post_type']
+    stats = filtered_posts(user, params).aggregate(avg=Avg('engagement_rate'), count=Count('id'))
+    if stats['avg']:
+        return f"Your {post_type} posts have an average engagement rate of {stats['avg']:.2f}% across {stats['count']} posts. {POST_TYPE_LABELS.get(post_type, f'{post_type.title()} posts')} are {'performing excellently!' if stats['avg'] > 5 else 'performing average.'}"
+    return f"No {post_type} posts found."
+
+
+def top_hashtags(user, params):
+    if not FILTER_PARAMS & set(params):
+        tags = [(stats.hashtag.tag, stats.avg_engagement) for stats in top_user_hashtags(user, limit=3)]
+    else:
+        tags = hashtag_averages(user, params)
+
+    if tags:
+        return "Your top performing hashtags are: " + ", ".join(
+            f"#{tag} ({avg_eng:.2f}% avg engagement)" for tag, avg_eng in tags
+        )
+    return "No hashtag data available."
+
+
+def hashtag_averages(user, params):
+    # Per-user stats have no platform, type or period breakdown, so filtered questions still join
+    return Hashtag.objects.filter(
+        posthashtag__post__in=filtered_posts(user, params)
+    ).annotate(
+        uses=Count('posthashtag'),
+        avg_eng=Avg('posthashtag__post__engagement_rate')
+    ).order_by('-avg_eng').values_list('tag', 'avg_eng')[:3]
+
+
+def best_time(user, params):
+    # Grouped in the database instead of loading every post
+    best = filtered_posts(user, params).annotate(
+        hour=ExtractHour('posted_at')
+    ).values('hour').annotate(
+        avg=Avg('engagement_rate')
+    ).order_by('-avg', 'hour').first()
+    if best:
+        return f"Based on your historical data, the best time to post is around {best['hour']:02d}:00 hours with an average engagement rate of {best['avg']:.2f}%."
+    return "No posts found."
+
+
+def caption_search(user, params):
+    posts = search_posts(user, params['text'], limit=3)
+    if posts:
+        return f"Your top posts about \"{params['text']}\": " + "; ".join(
+            f"{post.platform} on {post.posted_at.strftime('%B %d, %Y')} ({post.engagement_rate:.2f}% engagement): {post.caption[:80]}"
+            for post in posts
+        )
+    return f"No posts found about \"{params['text']}\"."
+
+
+def platform_summary(user, params):
+    platform = params['platform']
+    stats = filtered_posts(user, params).aggregate(
+        count=Count('id'),
+        avg_eng=Avg('engagement_rate'),
+        total_likes=Sum('likes')
+    )
+    if stats['count']:
+        return f"On {platform.capitalize()}, you have {stats['count']} posts with an average engagement rate of {stats['avg_eng']:.2f}% and {stats['total_likes']:,} total likes."
+    return f"No posts found on {platform.capitalize()}."
+
+
+HANDLERS = {
+    'search': caption_search,
+    'best_post': best_post,
+    'worst_post': worst_post,
+    'engagement_rate': engagement_rate,
+    'total_likes': total_likes,
+    'period_summary': period_summary,
+    'post_type': post_type_summary,
+    'hashtags': top_hashtags,
+    'best_time': best_time,
+    'platform': platform_summary,
+    'help': lambda user, params: HELP_TEXT,
+}
+
+
+def cache_key(user, intent, params, version):
+    # Hashed so free-text params stay within portable cache key rules
+    params_key = hashlib.md5(repr(sorted(params.items())).encode()).hexdigest()
+    return f"nlq:{user.id}:{intent}:{params_key}:{version}"
+
+
+def answer_query(user, query):
+    # Returns (response, intent, cache_hit)
+    intent, params = classify(query or '')
+    if intent == 'help':
+        return HELP_TEXT, intent, False
+
+    key = cache_key(user, intent, params, current_data_version(user))
+    response = cache.get(key)
+    if response is not None:
+        return response, intent, True
+
+    response = HANDLERS[intent](user, params)
+    cache.set(key, response, QUERY_CACHE_TTL)
+    return response, intent, False
@@ -0,0 +1,61 @@
+import base64
+import binascii
+from datetime import datetime
+from django.db.models import Q
+
+POST_PAGE_SIZE = 24
+
+POST_CARD_FIELDS = [
+    'id',
+    'post_id',
+    'post_type',
+    'caption',
+    'url',
+    'thumbnail_url',
+    'likes',
+    'comments',
+    'views',
+    'engagement_rate',
+    'posted_at',
+]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(posted_at, pk):
+    raw = f"{posted_at.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        posted_at, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(posted_at), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+
+
+def paginate_posts(posts, cursor=None, limit=POST_PAGE_SIZE):
+    # Keyset pagination on (posted_at, id) so deep pages cost the same as the first.
+    # Ties break on ascending id to match the (account, -posted_at) index, whose
+    # entries SQLite keeps in ascending rowid order.
+    posts = posts.order_by('-posted_at', 'id')
+
+    if cursor:
+        posted_at, pk = decode_cursor(cursor)
+        posts = posts.filter(
+            Q(posted_at__lt=posted_at) | Q(posted_at=posted_at, id__gt=pk)
+        )
+
+    cards = list(posts.values(*POST_CARD_FIELDS)[:limit + 1])
+
+    next_cursor = None
+    if len(cards) > limit:
+        cards = cards[:limit]
+        last = cards[-1]
+        next_cursor = encode_cursor(last['posted_at'], last['id'])
+
+    return cards, next_cursor
@@ -0,0 +1,159 @@
+import cProfile
+import functools
+import io
+import logging
+import pstats
+import random
+import time
+import uuid
+from pathlib import Path
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+from .models import RequestProfile
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ROOT = Path(getattr(settings, 'PROFILE_ROOT', settings.BASE_DIR / 'profiles'))
+# Oldest profiles (and their files) are removed beyond this many
+PROFILE_KEEP = getattr(settings, 'PROFILE_KEEP', 200)
+# Fraction of requests run under the profiler in case they turn out slow; 0 turns sampling off
+PROFILE_SAMPLE_RATE = getattr(settings, 'PROFILE_SAMPLE_RATE', 0.0)
+PROFILE_SLOW_MS = getattr(settings, 'PROFILE_SLOW_MS', 1000)
+PROFILE_PARAM = 'profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_TOKEN_MAX_AGE = 3600
+SUMMARY_LINES = 30
+CALIBRATION_CALLS = 20000
+
+signer = signing.TimestampSigner(salt='main.profiling')
+
+
+def profile_token(path):
+    # Lets a request to `path` be profiled without a staff session, for an hour
+    return signer.sign(path)
+
+
+def valid_token(token, path):
+    try:
+        return signer.unsign(token, max_age=PROFILE_TOKEN_MAX_AGE) == path
+    except signing.BadSignature:
+        return False
+
+
+def profile_trigger(request):
+    # Checked on every request, so nothing is looked up unless the parameter or header is there
+    value = request.GET.get(PROFILE_PARAM) or request.META.get(PROFILE_HEADER)
+    if value:
+        if valid_token(value, request.path):
+            return 'token'
+        if request.user.is_staff:
+            return 'staff'
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        return 'slow'
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def call_overhead_ms():
+    # What cProfile adds to each function call on this machine, measured once per process
+    def noop():
+        pass
+
+    def calls():
+        for _ in range(CALIBRATION_CALLS):
+            noop()
+
+    started = time.perf_counter()
+    calls()
+    plain = time.perf_counter() - started
+    started = time.perf_counter()
+    cProfile.Profile().runcall(calls)
+    profiled = time.perf_counter() - started
+    return max(0.0, (profiled - plain) * 1000 / CALIBRATION_CALLS)
+
+
+def profile_file(profile):
+    return PROFILE_ROOT / profile.file_path
+
+
+def prune_profiles(keep):
+    for profile in RequestProfile.objects.order_by('-created_at', '-id')[keep:]:
+        profile_file(profile).unlink(missing_ok=True)
+        profile.delete()
+
+
+def save_profile(profiler, request, response, duration_ms, overhead_ms, function_calls, trigger):
+    created_at = timezone.now()
+    view_name = getattr(request.resolver_match, 'view_name', '') or ''
+    relative = Path(created_at.strftime('%Y-%m-%d')) / '{}-{}-{}.prof'.format(
+        created_at.strftime('%H%M%S'), view_name.replace(':', '.') or 'unresolved', uuid.uuid4().hex[:8]
+    )
+    path = PROFILE_ROOT / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(path)
+
+    user = getattr(request, 'user', None)
+    profile = RequestProfile.objects.create(
+        user=user if user is not None and user.is_authenticated else None,
+        method=request.method,
+        path=request.path[:500],
+        view_name=view_name,
+        status_code=response.status_code,
+        trigger=trigger,
+        duration_ms=round(duration_ms, 2),
+        overhead_ms=round(overhead_ms, 2),
+        function_calls=function_calls,
+        streamed=response.streaming,
+        file_path=str(relative),
+    )
+    prune_profiles(PROFILE_KEEP)
+    return profile
+
+
+def profile_summary(profile, sort='cumulative', limit=SUMMARY_LINES):
+    path = profile_file(profile)
+    if not path.exists():
+        return ''
+    output = io.StringIO()
+    pstats.Stats(str(path), stream=output).strip_dirs().sort_stats(sort).print_stats(limit)
+    return output.getvalue()
+
+
+class ProfilingMiddleware:
+    # Profiles single requests with cProfile: on demand for staff (?profile=1 or an
+    # X-Profile header), for anyone holding a signed token for the path, and for a random
+    # sample of requests that is only kept when the request was slower than PROFILE_SLOW_MS.
+    # Durations have the profiler's estimated cost taken out, so sampling does not make
+    # requests look slow. A streamed body is sent after the view returns, so only the view
+    # itself is profiled; such profiles are marked as streamed.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        trigger = profile_trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        profiled_ms = (time.perf_counter() - started) * 1000
+        function_calls = pstats.Stats(profiler).total_calls
+        overhead_ms = min(profiled_ms, function_calls * call_overhead_ms())
+        duration_ms = profiled_ms - overhead_ms
+
+        if trigger == 'slow' and duration_ms < PROFILE_SLOW_MS:
+            return response
+        try:
+            profile = save_profile(profiler, request, response, duration_ms, overhead_ms, function_calls, trigger)
+            response['X-Profile-Id'] = str(profile.id)
+        except Exception:
+            # A profile that cannot be written never fails the request itself
+            logger.exception("Could not save profile for %s", request.path)
+        return response
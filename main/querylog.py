@@ -0,0 +1,186 @@
+import atexit
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from .models import QueryLog, QueryLogDaily
+
+logger = logging.getLogger(__name__)
+
+QUERY_LOG_MAX_PENDING = getattr(settings, 'QUERY_LOG_MAX_PENDING', 10000)
+QUERY_LOG_FLUSH_SIZE = getattr(settings, 'QUERY_LOG_FLUSH_SIZE', 200)
+QUERY_LOG_FLUSH_INTERVAL = getattr(settings, 'QUERY_LOG_FLUSH_INTERVAL', 2.0)
+
+
+class QueryLogBuffer:
+    # Requests append in memory; one background thread writes batches with bulk_create.
+    # When the writer falls behind and the buffer is full, new entries are dropped and counted.
+
+    def __init__(self, max_pending=QUERY_LOG_MAX_PENDING, flush_size=QUERY_LOG_FLUSH_SIZE,
+                 flush_interval=QUERY_LOG_FLUSH_INTERVAL, autostart=True):
+        self.max_pending = max_pending
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.autostart = autostart
+        self.pending = deque()
+        self.condition = threading.Condition()
+        self.write_lock = threading.Lock()
+        self.thread = None
+        self.closed = False
+        self.written = 0
+        self.dropped = 0
+        self.reported_drops = 0
+
+    def log(self, **fields):
+        fields.setdefault('created_at', timezone.now())
+        with self.condition:
+            if self.closed or len(self.pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self.pending.append(QueryLog(**fields))
+            if self.autostart and self.thread is None:
+                self.start()
+            if len(self.pending) >= self.flush_size:
+                self.condition.notify()
+        return True
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='query-log-writer', daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def run(self):
+        while True:
+            with self.condition:
+                deadline = time.monotonic() + self.flush_interval
+                while not self.closed and len(self.pending) < self.flush_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                closed = self.closed
+            close_old_connections()
+            self.flush()
+            if closed:
+                break
+
+    def take(self):
+        with self.condition:
+            batch = list(self.pending)
+            self.pending.clear()
+            return batch
+
+    def flush(self):
+        with self.write_lock:
+            batch = self.take()
+            if batch:
+                try:
+                    QueryLog.objects.bulk_create(batch, batch_size=self.flush_size)
+                    self.written += len(batch)
+                except Exception:
+                    self.dropped += len(batch)
+                    logger.exception("Could not write %d query logs", len(batch))
+
+            if self.dropped > self.reported_drops:
+                logger.warning("Dropped %d query logs (%d total)", self.dropped - self.reported_drops, self.dropped)
+                self.reported_drops = self.dropped
+            return len(batch)
+
+    def close(self, timeout=5):
+        # Drain at shutdown; anything logged afterwards is counted as dropped
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+            self.condition.notify()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        return {
+            'pending': len(self.pending),
+            'written': self.written,
+            'dropped': self.dropped,
+        }
+
+
+query_log = QueryLogBuffer()
+
+
+def log_query(**fields):
+    if getattr(settings, 'QUERY_LOG_BUFFERED', True):
+        return query_log.log(**fields)
+    QueryLog.objects.create(**fields)
+    return True
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile on an already sorted list
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def compact_query_logs(older_than, chunk_size=5000):
+    # Rolls raw QueryLog rows older than the cutoff into QueryLogDaily, one local day at a time.
+    # Re-compacting a day that already has an aggregate merges counts and keeps the larger
+    # percentiles, since exact percentiles cannot be recombined.
+    cutoff = timezone.now() - older_than
+    old = QueryLog.objects.filter(created_at__lt=cutoff)
+    first = old.order_by('created_at').values_list('created_at', flat=True).first()
+    if first is None:
+        return 0, 0
+
+    compacted = aggregates = 0
+    day = timezone.localdate(first)
+    while True:
+        start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        if start >= cutoff:
+            break
+        end = min(start + timedelta(days=1), cutoff)
+        rows = old.filter(created_at__gte=start, created_at__lt=end)
+
+        groups = defaultdict(list)
+        max_id = None
+        for log_id, user_id, intent, execution_time in rows.values_list('id', 'user_id', 'intent', 'execution_time').iterator(chunk_size=chunk_size):
+            groups[(user_id, intent)].append(execution_time)
+            max_id = log_id if max_id is None else max(max_id, log_id)
+
+        if groups:
+            with transaction.atomic():
+                existing = {
+                    (row.user_id, row.intent): row
+                    for row in QueryLogDaily.objects.filter(date=day, user_id__in={user_id for user_id, _ in groups})
+                }
+                to_create = []
+                to_update = []
+                for (user_id, intent), times in groups.items():
+                    times.sort()
+                    p50, p95 = percentile(times, 0.5), percentile(times, 0.95)
+                    row = existing.get((user_id, intent))
+                    if row is None:
+                        to_create.append(QueryLogDaily(
+                            user_id=user_id, date=day, intent=intent,
+                            count=len(times), p50_execution_time=p50, p95_execution_time=p95,
+                        ))
+                    else:
+                        row.count += len(times)
+                        row.p50_execution_time = max(row.p50_execution_time, p50)
+                        row.p95_execution_time = max(row.p95_execution_time, p95)
+                        to_update.append(row)
+
+                QueryLogDaily.objects.bulk_create(to_create)
+                QueryLogDaily.objects.bulk_update(to_update, ['count', 'p50_execution_time', 'p95_execution_time'])
+                # Buffered logs can land in this day after the read; only delete what was counted
+                deleted, _ = rows.filter(id__lte=max_id).delete()
+
+            compacted += deleted
+            aggregates += len(groups)
+        day += timedelta(days=1)
+
+    return compacted, aggregates
@@ -0,0 +1,76 @@
+from django.db import transaction
+from django.db.models import Sum, Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import Post, AccountDailyStats
+
+ROLLUP_FIELDS = ['post_count', 'likes', 'comments', 'shares', 'views', 'engagement_sum']
+# Real Instagram shortcodes; other ids on an Instagram account are not counted
+INSTAGRAM_SHORTCODE_RE = r'^[A-Za-z0-9_-]{10,12}$'
+
+
+def counted_posts(account):
+    # The posts every stat counts; the rollup and the post lists must agree on this
+    posts = Post.objects.filter(account=account)
+    if account.platform == "instagram":
+        posts = posts.filter(post_id__isnull=False, post_id__regex=INSTAGRAM_SHORTCODE_RE)
+    return posts
+
+
+def user_counted_posts(user):
+    # counted_posts across every account the user has
+    return Post.objects.filter(account__user=user).filter(
+        ~Q(account__platform="instagram") | Q(post_id__isnull=False, post_id__regex=INSTAGRAM_SHORTCODE_RE)
+    )
+
+
+def posted_dates(posted_ats):
+    dates = set()
+    for posted_at in posted_ats:
+        # Instaloader hands out naive UTC datetimes; Django stores those in the default zone
+        if timezone.is_naive(posted_at):
+            posted_at = timezone.make_aware(posted_at)
+        dates.add(timezone.localdate(posted_at))
+    return dates
+
+
+def refresh_daily_stats(account, dates=None):
+    # Recompute only the touched days; dates=None rebuilds the whole account
+    posts = counted_posts(account)
+    existing = AccountDailyStats.objects.filter(account=account)
+
+    if dates is not None:
+        dates = set(dates)
+        if not dates:
+            return 0
+        posts = posts.filter(posted_at__date__in=dates)
+        existing = existing.filter(date__in=dates)
+
+    rows = posts.annotate(
+        day=TruncDate('posted_at')
+    ).values('day', 'post_type').annotate(
+        post_count=Count('id'),
+        likes=Sum('likes'),
+        comments=Sum('comments'),
+        shares=Sum('shares'),
+        views=Sum('views'),
+        engagement_sum=Sum('engagement_rate'),
+    ).order_by()
+
+    days = {}
+    for row in rows:
+        stats = days.get(row['day'])
+        if stats is None:
+            stats = AccountDailyStats(account=account, date=row['day'], post_type_breakdown={})
+            days[row['day']] = stats
+
+        type_stats = {field: row[field] or 0 for field in ROLLUP_FIELDS}
+        stats.post_type_breakdown[row['post_type']] = type_stats
+        for field in ROLLUP_FIELDS:
+            setattr(stats, field, getattr(stats, field) + type_stats[field])
+
+    with transaction.atomic():
+        existing.delete()
+        AccountDailyStats.objects.bulk_create(days.values())
+
+    return len(days)
@@ -0,0 +1,155 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import SocialAccount
+from .ingest import PostBatchWriter
+from .connectors import get_connector
+
+
+class RetryableFetchError(Exception):
+    pass
+
+
+class BudgetExhausted(Exception):
+    pass
+
+
+class TokenBucket:
+    # Shared by every fetch thread so the whole run stays under one request rate
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        # A bucket that never refills would make acquire wait forever
+        if rate <= 0:
+            raise ValueError(f"Token bucket rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+def backoff_delay(attempt, base_delay, max_delay=300):
+    delay = min(max_delay, base_delay * (2 ** attempt))
+    return delay + random.uniform(0, base_delay)
+
+
+def fetch_with_backoff(fetch, account, limiter=None, retries=3, base_delay=1.0, deadline=None, sleep=time.sleep):
+    attempt = 0
+    while True:
+        if deadline is not None and time.monotonic() >= deadline:
+            raise BudgetExhausted()
+        try:
+            return fetch(
+                username=account.username,
+                last_post_at=account.last_post_at,
+                last_post_shortcode=account.last_post_shortcode,
+                limiter=limiter,
+            )
+        except RetryableFetchError:
+            if attempt >= retries:
+                raise
+            delay = backoff_delay(attempt, base_delay)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise BudgetExhausted()
+            sleep(delay)
+            attempt += 1
+
+
+def store_fetch_result(account, result):
+    account.followers_count = result["followers_count"]
+    account.following_count = result["following_count"]
+    account.posts_count = result["posts_count"]
+    account.last_synced = timezone.now()
+
+    with PostBatchWriter(account) as writer:
+        for batch in result["batches"]:
+            for post_id, fields in batch:
+                writer.add(post_id, **fields)
+            writer.flush()
+
+    newest = result.get("newest")
+    if newest and (account.last_post_at is None or newest[0] > account.last_post_at):
+        account.last_post_at, account.last_post_shortcode = newest
+
+    account.save(update_fields=[
+        "followers_count",
+        "following_count",
+        "posts_count",
+        "last_synced",
+        "last_post_at",
+        "last_post_shortcode",
+    ])
+    return writer.inserted, writer.updated
+
+
+def stale_accounts(stale_after, limit=None, platforms=("instagram",)):
+    cutoff = timezone.now() - stale_after
+    accounts = SocialAccount.objects.filter(
+        platform__in=platforms,
+        is_active=True
+    ).filter(
+        Q(last_synced__isnull=True) | Q(last_synced__lt=cutoff)
+    ).order_by(F('last_synced').asc(nulls_first=True), 'id')
+
+    if limit:
+        accounts = accounts[:limit]
+    return list(accounts)
+
+
+def sync_accounts(accounts, fetch=None, workers=4, limiter=None, budget=None, retries=3, base_delay=1.0, log=print):
+    deadline = time.monotonic() + budget if budget else None
+    summary = {"synced": 0, "failed": 0, "skipped": 0, "inserted": 0, "updated": 0}
+
+    # Worker threads only fetch; this thread is the single DB writer
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                fetch_with_backoff,
+                fetch or get_connector(account.platform).fetch,
+                account, limiter, retries, base_delay, deadline
+            ): account
+            for account in accounts
+        }
+
+        for future in as_completed(futures):
+            account = futures[future]
+            try:
+                result = future.result()
+            except BudgetExhausted:
+                summary["skipped"] += 1
+                continue
+            except Exception as e:
+                summary["failed"] += 1
+                log(f"❌ {account}: {e}")
+                continue
+
+            try:
+                inserted, updated = store_fetch_result(account, result)
+            except Exception as e:
+                summary["failed"] += 1
+                log(f"❌ {account}: could not store posts: {e}")
+                continue
+
+            summary["synced"] += 1
+            summary["inserted"] += inserted
+            summary["updated"] += updated
+            log(f"✅ {account}: {inserted} new, {updated} updated")
+
+    return summary
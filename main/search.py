@@ -0,0 +1,151 @@
+import math
+import re
+from contextlib import contextmanager
+from django.db import DEFAULT_DB_ALIAS, connection, connections, OperationalError
+from .models import Post
+
+SEARCH_TABLE = 'main_post_fts'
+SEARCH_LIMIT = 20
+# BM25 picks the candidates; engagement then reorders them
+CANDIDATE_POOL = 5
+ENGAGEMENT_WEIGHT = 1.0
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# FTS5 table over captions plus an owner token ("u<user_id>"), so a user's matches come
+# straight from intersecting posting lists instead of joining every match back to
+# main_post. Triggers keep it in sync, which covers bulk_create, bulk_update and
+# cascading deletes alike.
+CREATE_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(caption, owner)",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON main_post BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, caption, owner)
+        SELECT new.id, new.caption, 'u' || user_id FROM main_socialaccount WHERE id = new.account_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON main_post BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au AFTER UPDATE OF caption ON main_post
+    WHEN new.caption IS NOT old.caption BEGIN
+        UPDATE {SEARCH_TABLE} SET caption = new.caption WHERE rowid = new.id;
+    END""",
+]
+
+DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_au",
+    f"DROP TABLE IF EXISTS {SEARCH_TABLE}",
+]
+
+
+def search_terms(text):
+    # Quote every token so user input can never be read as FTS5 syntax
+    return [token.lower() for token in TOKEN_RE.findall(text or '')]
+
+
+_fts_tables = {}
+
+
+def fts_available(using=connection):
+    # Checked once per database alias rather than on every search
+    if using.alias not in _fts_tables:
+        _fts_tables[using.alias] = (
+            using.vendor == 'sqlite' and SEARCH_TABLE in using.introspection.table_names()
+        )
+    return _fts_tables[using.alias]
+
+
+def create_search_index(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(CREATE_SQL[0])
+    except OperationalError:
+        # SQLite built without FTS5; search falls back to icontains
+        return
+    for sql in CREATE_SQL[1:]:
+        schema_editor.execute(sql)
+    rebuild_search_index(schema_editor.connection)
+
+
+def drop_search_index(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+def rebuild_search_index(using=connection):
+    with using.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(f"""
+            INSERT INTO {SEARCH_TABLE}(rowid, caption, owner)
+            SELECT main_post.id, main_post.caption, 'u' || main_socialaccount.user_id
+            FROM main_post JOIN main_socialaccount ON main_socialaccount.id = main_post.account_id
+        """)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+
+
+@contextmanager
+def search_index_paused(using=connection):
+    # Bulk loads skip the per-row triggers and reindex everything once at the end.
+    # Plain statements rather than a schema editor, so this also works inside a transaction.
+    if not fts_available(using):
+        yield
+        return
+    with using.cursor() as cursor:
+        for sql in DROP_SQL[:-1]:
+            cursor.execute(sql)
+    try:
+        yield
+    finally:
+        with using.cursor() as cursor:
+            for sql in CREATE_SQL[1:]:
+                cursor.execute(sql)
+        rebuild_search_index(using)
+
+
+def rank_matches(posts, limit):
+    # bm25() is lower-is-better; flip it and add a log-scaled engagement bonus
+    for post in posts:
+        post.score = -post.rank + ENGAGEMENT_WEIGHT * math.log1p(max(post.engagement_rate or 0, 0))
+    return sorted(posts, key=lambda post: post.score, reverse=True)[:limit]
+
+
+def search_posts(user, text, limit=SEARCH_LIMIT, using=None):
+    terms = search_terms(text)
+    if not terms:
+        return []
+
+    if not fts_available(connections[using or DEFAULT_DB_ALIAS]):
+        # Portable fallback for databases without FTS5: every term must appear
+        posts = Post.objects.using(using).filter(account__user=user)
+        for term in terms:
+            posts = posts.filter(caption__icontains=term)
+        posts = list(posts.select_related('account').order_by('-engagement_rate')[:limit])
+        for post in posts:
+            post.platform = post.account.platform
+            post.score = post.engagement_rate
+        return posts
+
+    phrases = ' AND '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+    match = f'owner : "u{user.id}" AND caption : ({phrases})'
+    # Rank inside the FTS table first (owner carries no weight), then join only the winners
+    posts = Post.objects.raw(
+        f"""
+        SELECT main_post.*, main_socialaccount.platform AS platform, matches.rank AS rank
+        FROM (
+            SELECT rowid, bm25({SEARCH_TABLE}, 1.0, 0.0) AS rank
+            FROM {SEARCH_TABLE}
+            WHERE {SEARCH_TABLE} MATCH %s
+            ORDER BY rank
+            LIMIT %s
+        ) AS matches
+        JOIN main_post ON main_post.id = matches.rowid
+        JOIN main_socialaccount ON main_socialaccount.id = main_post.account_id
+        """,
+        [match, limit * CANDIDATE_POOL],
+        using=using
+    )
+    return rank_matches(list(posts), limit)
@@ -0,0 +1,11 @@
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+from .hashtags import forget_account_hashtags
+from .models import SocialAccount
+
+
+@receiver(pre_delete, sender=SocialAccount)
+def forget_deleted_account_hashtags(sender, instance, **kwargs):
+    # Also sent for accounts cascaded from a deleted user (the admin included). Runs inside
+    # the delete's transaction while the posts still exist, so the global totals stay right.
+    forget_account_hashtags(instance)
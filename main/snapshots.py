@@ -0,0 +1,165 @@
+from collections import defaultdict
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import Post, PostMetricSnapshot, PostMetricSeries
+
+# Raw snapshots stay as rows for this long, then get folded into PostMetricSeries
+SNAPSHOT_RETENTION = timedelta(days=getattr(settings, 'SNAPSHOT_RETENTION_DAYS', 3))
+# Posts older than this are no longer sampled, which caps the length of every series
+SNAPSHOT_MAX_POST_AGE = timedelta(days=getattr(settings, 'SNAPSHOT_MAX_POST_AGE_DAYS', 90))
+# (post age up to, one sample per): hourly detail while a post is young, sparser later.
+# With the defaults a series tops out at 72 + 108 + 60 samples, i.e. under 4 KB.
+DOWNSAMPLE_RULES = [
+    (timedelta(hours=72), timedelta(hours=1)),
+    (timedelta(days=30), timedelta(hours=6)),
+    (None, timedelta(days=1)),
+]
+VELOCITY_HOURS = 24
+SNAPSHOT_CHUNK_SIZE = 500
+
+SAMPLE_DTYPE = np.dtype('<i4')
+SAMPLE_COLUMNS = 4
+INT32 = np.iinfo(np.int32)
+
+
+def pack_samples(samples):
+    samples = np.clip(np.asarray(samples, dtype=np.int64).reshape(-1, SAMPLE_COLUMNS), INT32.min, INT32.max)
+    return samples.astype(SAMPLE_DTYPE).tobytes()
+
+
+def unpack_samples(blob):
+    return np.frombuffer(bytes(blob or b''), dtype=SAMPLE_DTYPE).reshape(-1, SAMPLE_COLUMNS).astype(np.int64)
+
+
+def downsample(samples):
+    # Metrics are cumulative, so the last sample in each bucket carries the bucket's value
+    if not len(samples):
+        return samples
+    samples = samples[np.argsort(samples[:, 0], kind='stable')]
+    limits = np.array([limit.total_seconds() for limit, _ in DOWNSAMPLE_RULES[:-1]])
+    steps = np.array([step.total_seconds() for _, step in DOWNSAMPLE_RULES], dtype=np.int64)
+
+    tiers = np.searchsorted(limits, samples[:, 0], side='right')
+    buckets = samples[:, 0] // steps[tiers]
+    last = np.ones(len(samples), dtype=bool)
+    last[:-1] = (tiers[1:] != tiers[:-1]) | (buckets[1:] != buckets[:-1])
+    return samples[last]
+
+
+def record_snapshots(posts, taken_at=None):
+    # One snapshot per post, written in bulk; called by every sync flush
+    taken_at = taken_at or timezone.now()
+    rows = posts.filter(
+        posted_at__gte=taken_at - SNAPSHOT_MAX_POST_AGE
+    ).order_by().values_list('id', 'likes', 'comments', 'views')
+    snapshots = [
+        PostMetricSnapshot(post_id=post_id, taken_at=taken_at, likes=likes, comments=comments, views=views)
+        for post_id, likes, comments, views in rows
+    ]
+    PostMetricSnapshot.objects.bulk_create(snapshots, batch_size=SNAPSHOT_CHUNK_SIZE)
+    return len(snapshots)
+
+
+def compact_snapshots(older_than=SNAPSHOT_RETENTION, chunk_size=SNAPSHOT_CHUNK_SIZE):
+    # Folds raw snapshots older than the cutoff into each post's packed series, a chunk of
+    # posts at a time. Returns (snapshots compacted, series written).
+    cutoff = timezone.now() - older_than
+    old = PostMetricSnapshot.objects.filter(taken_at__lt=cutoff)
+    compacted = written = 0
+    last_post_id = 0
+    while True:
+        post_ids = list(
+            old.filter(post_id__gt=last_post_id).order_by('post_id').values_list('post_id', flat=True).distinct()[:chunk_size]
+        )
+        if not post_ids:
+            return compacted, written
+
+        with transaction.atomic():
+            chunk = old.filter(post_id__in=post_ids)
+            grouped = defaultdict(list)
+            for post_id, taken_at, likes, comments, views in chunk.values_list(
+                'post_id', 'taken_at', 'likes', 'comments', 'views'
+            ):
+                grouped[post_id].append((taken_at, likes, comments, views))
+
+            posted = dict(Post.objects.filter(id__in=post_ids).values_list('id', 'posted_at'))
+            existing = {series.post_id: series for series in PostMetricSeries.objects.filter(post_id__in=post_ids)}
+            now = timezone.now()
+            to_create = []
+            to_update = []
+            for post_id, rows in grouped.items():
+                series = existing.get(post_id)
+                if series is None:
+                    series = PostMetricSeries(post_id=post_id, origin=posted[post_id])
+                    to_create.append(series)
+                else:
+                    to_update.append(series)
+                new = np.array([
+                    (int((taken_at - series.origin).total_seconds()), likes, comments, views)
+                    for taken_at, likes, comments, views in rows
+                ], dtype=np.int64)
+                samples = downsample(np.concatenate([unpack_samples(series.samples), new]))
+                series.samples = pack_samples(samples)
+                series.sample_count = len(samples)
+                series.updated_at = now
+
+            PostMetricSeries.objects.bulk_create(to_create)
+            PostMetricSeries.objects.bulk_update(to_update, ['samples', 'sample_count', 'updated_at'])
+            deleted, _ = chunk.delete()
+
+        compacted += deleted
+        written += len(grouped)
+        last_post_id = post_ids[-1]
+
+
+def metric_samples(post):
+    # Compacted history plus raw snapshots as float rows of (hours since posting, likes, comments, views)
+    parts = []
+    series = PostMetricSeries.objects.filter(post=post).first()
+    if series is not None:
+        packed = unpack_samples(series.samples).astype(np.float64)
+        # Offsets are relative to the origin recorded at first compaction
+        packed[:, 0] += (series.origin - post.posted_at).total_seconds()
+        parts.append(packed)
+
+    raw = post.postmetricsnapshot_set.order_by('taken_at').values_list('taken_at', 'likes', 'comments', 'views')
+    raw = [((taken_at - post.posted_at).total_seconds(), likes, comments, views) for taken_at, likes, comments, views in raw]
+    if raw:
+        parts.append(np.array(raw, dtype=np.float64))
+
+    if not parts:
+        return np.zeros((0, SAMPLE_COLUMNS))
+    samples = np.concatenate(parts)
+    samples[:, 0] /= 3600
+    return samples[np.argsort(samples[:, 0], kind='stable')]
+
+
+def post_velocity(post, hours=VELOCITY_HOURS):
+    # Growth over the first `hours` after posting, interpolated between samples.
+    # Counts are taken to start at zero when the post goes up.
+    samples = metric_samples(post)
+    count = len(samples)
+    if not count or samples[0, 0] > 0:
+        samples = np.vstack([np.zeros((1, SAMPLE_COLUMNS)), samples])
+
+    times = samples[:, 0]
+    observed = min(hours, times[-1])
+    result = {
+        'post_id': post.id,
+        'hours': hours,
+        'observed_hours': round(float(observed), 2),
+        'complete': bool(times[-1] >= hours),
+        'samples': count,
+        'curve': [
+            [round(float(value), 2) for value in row]
+            for row in samples[times <= hours]
+        ],
+    }
+    for column, name in enumerate(['likes', 'comments', 'views'], start=1):
+        gained = float(np.interp(observed, times, samples[:, column]))
+        result[name] = int(round(gained))
+        result[f'{name}_per_hour'] = round(gained / observed, 2) if observed > 0 else 0.0
+    return result
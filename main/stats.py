@@ -0,0 +1,242 @@
+from datetime import datetime, timedelta
+from django.utils import timezone
+from django.db.models import Sum, Avg, Count, DateTimeField
+from django.db.models.functions import Trunc, ExtractHour
+from .models import AccountDailyStats
+from .rollups import ROLLUP_FIELDS
+
+
+def select_rollup(row, post_types=None, exclude_types=()):
+    if post_types is None and not exclude_types:
+        return {field: row[field] for field in ROLLUP_FIELDS}
+
+    selected = dict.fromkeys(ROLLUP_FIELDS, 0)
+    for post_type, type_stats in row['post_type_breakdown'].items():
+        if post_type in exclude_types:
+            continue
+        if post_types is not None and post_type not in post_types:
+            continue
+        for field in ROLLUP_FIELDS:
+            selected[field] += type_stats.get(field, 0)
+    return selected
+
+
+def rollup_rows(daily_stats):
+    return list(daily_stats.values('date', 'post_type_breakdown', *ROLLUP_FIELDS))
+
+
+def get_dashboard_stats(account, days=7, exclude_types=('story',)):
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+
+    # Single read of the per-day rollup; cost depends on days, not posts
+    rows = rollup_rows(AccountDailyStats.objects.filter(account=account))
+
+    totals = dict.fromkeys(ROLLUP_FIELDS, 0)
+    by_day = {}
+    period_posts = 0
+    for row in rows:
+        selected = select_rollup(row, exclude_types=exclude_types)
+        for field in ROLLUP_FIELDS:
+            totals[field] += selected[field]
+        if row['date'] >= start:
+            period_posts += selected['post_count']
+            by_day[row['date']] = selected['likes'] + selected['comments']
+
+    daily_engagement = []
+    for i in range(days):
+        day = start + timedelta(days=i)
+        daily_engagement.append({
+            "date": day.strftime("%Y-%m-%d"),
+            "engagement": by_day.get(day, 0),
+        })
+
+    post_count = totals['post_count']
+    return {
+        "total_posts": post_count,
+        "total_likes": totals['likes'],
+        "total_comments": totals['comments'],
+        "total_views": totals['views'],
+        "avg_engagement_rate": totals['engagement_sum'] / post_count if post_count else 0,
+        "period_posts": period_posts,
+        "period_engagement": sum(by_day.values()),
+        "daily_engagement": daily_engagement,
+    }
+
+
+def summarize_rollups(rows, post_types=None):
+    totals = dict.fromkeys(ROLLUP_FIELDS, 0)
+    by_type = {}
+    for row in rows:
+        selected = select_rollup(row, post_types=post_types)
+        for field in ROLLUP_FIELDS:
+            totals[field] += selected[field]
+        for post_type, type_stats in row['post_type_breakdown'].items():
+            if post_types is not None and post_type not in post_types:
+                continue
+            type_totals = by_type.setdefault(post_type, dict.fromkeys(ROLLUP_FIELDS, 0))
+            for field in ROLLUP_FIELDS:
+                type_totals[field] += type_stats.get(field, 0)
+
+    post_type_comparison = []
+    for post_type, type_totals in by_type.items():
+        count = type_totals['post_count']
+        if not count:
+            continue
+        post_type_comparison.append({
+            'post_type': post_type,
+            'count': count,
+            'avg_likes': type_totals['likes'] / count,
+            'avg_comments': type_totals['comments'] / count,
+            'avg_shares': type_totals['shares'] / count,
+            'avg_engagement': type_totals['engagement_sum'] / count,
+        })
+    post_type_comparison.sort(key=lambda x: x['avg_engagement'], reverse=True)
+
+    count = totals['post_count']
+    return {
+        'total_posts': count,
+        'avg_engagement': totals['engagement_sum'] / count if count else 0,
+        'totals': totals,
+        'post_type_comparison': post_type_comparison,
+    }
+
+
+GRANULARITIES = ['hour', 'day', 'week', 'month']
+
+BUCKET_LABELS = {
+    'hour': '%Y-%m-%d %H:00',
+    'day': '%Y-%m-%d',
+    'week': '%Y-%m-%d',
+    'month': '%Y-%m',
+}
+
+
+MAX_BUCKETS = 400
+
+BUCKETS_PER_DAY = {
+    'hour': 24,
+    'day': 1,
+    'week': 1 / 7,
+    'month': 1 / 30,
+}
+
+
+def pick_granularity(days, requested=None):
+    # Honour an explicit choice unless it would explode the number of points
+    if requested in GRANULARITIES and days * BUCKETS_PER_DAY[requested] <= MAX_BUCKETS:
+        return requested
+    if days <= 2:
+        return 'hour'
+    if days <= 90:
+        return 'day'
+    if days <= 400:
+        return 'week'
+    return 'month'
+
+
+def _floor_bucket(dt, granularity):
+    if granularity == 'hour':
+        return dt.replace(minute=0, second=0, microsecond=0)
+    dt = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'week':
+        return dt - timedelta(days=dt.weekday())
+    if granularity == 'month':
+        return dt.replace(day=1)
+    return dt
+
+
+def _next_bucket(dt, granularity):
+    if granularity == 'hour':
+        return dt + timedelta(hours=1)
+    if granularity == 'week':
+        return dt + timedelta(days=7)
+    if granularity == 'month':
+        return (dt.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return dt + timedelta(days=1)
+
+
+def _local_naive(dt):
+    if timezone.is_aware(dt):
+        return timezone.make_naive(dt)
+    return dt
+
+
+def bucket_series(posts, start, end=None, granularity='day', fields=('likes', 'comments', 'shares')):
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity}")
+
+    end = end or timezone.now()
+
+    rows = posts.filter(
+        posted_at__gte=start,
+        posted_at__lte=end
+    ).annotate(
+        bucket=Trunc('posted_at', granularity, output_field=DateTimeField())
+    ).values('bucket').annotate(
+        **{field: Sum(field) for field in fields}
+    ).order_by()
+
+    by_bucket = {_local_naive(row['bucket']): row for row in rows}
+
+    # Walk the buckets in local wall-clock time so DST shifts never skip a slot
+    series = []
+    bucket = _floor_bucket(_local_naive(start), granularity)
+    last = _floor_bucket(_local_naive(end), granularity)
+    while bucket <= last:
+        row = by_bucket.get(bucket, {})
+        point = {'date': bucket.strftime(BUCKET_LABELS[granularity])}
+        for field in fields:
+            point[field] = row.get(field) or 0
+        series.append(point)
+        bucket = _next_bucket(bucket, granularity)
+
+    return series
+
+
+def hourly_breakdown(posts):
+    rows = posts.annotate(
+        hour=ExtractHour('posted_at')
+    ).values('hour').annotate(
+        avg_engagement=Avg('engagement_rate'),
+        count=Count('id')
+    ).order_by()
+
+    by_hour = {row['hour']: row for row in rows}
+
+    hourly = []
+    for hour in range(24):
+        row = by_hour.get(hour, {})
+        hourly.append({
+            'hour': hour,
+            'avg_engagement': row.get('avg_engagement') or 0,
+            'count': row.get('count', 0),
+        })
+
+    return hourly
+
+
+def rollup_series(rows, start, end=None, granularity='day', post_types=None, fields=('likes', 'comments', 'shares')):
+    if granularity not in ('day', 'week', 'month'):
+        raise ValueError(f"Rollups cannot be bucketed by {granularity}")
+
+    end = end or timezone.localdate()
+
+    by_bucket = {}
+    for row in rows:
+        bucket = _floor_bucket(datetime.combine(row['date'], datetime.min.time()), granularity)
+        selected = select_rollup(row, post_types=post_types)
+        totals = by_bucket.setdefault(bucket, dict.fromkeys(fields, 0))
+        for field in fields:
+            totals[field] += selected[field]
+
+    series = []
+    bucket = _floor_bucket(datetime.combine(start, datetime.min.time()), granularity)
+    last = _floor_bucket(datetime.combine(end, datetime.min.time()), granularity)
+    while bucket <= last:
+        point = {'date': bucket.strftime(BUCKET_LABELS[granularity])}
+        point.update(by_bucket.get(bucket, dict.fromkeys(fields, 0)))
+        series.append(point)
+        bucket = _next_bucket(bucket, granularity)
+
+    return series
@@ -1,3 +1,1615 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+import pytz
+from django.core.cache import cache
+from django.core.management import call_command, CommandError
+from django.db.models import Count, F, Sum
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from .models import RequestProfile, UserHashtagStats, Hashtag, SocialAccount, Post, PostAnalytics, PostMetricSnapshot, PostMetricSeries, ExportJob, PostHashtag, AccountDailyStats, SyncJob, BestTimeToPost, AIInsight, UserDataVersion, QueryLog, QueryLogDaily
+from .ingest import PostBatchWriter
+from .utils import generate_ai_insights, generate_sample_posts
+from .jobs import enqueue_sync, claim_next_job, run_sync_job
+from .insta import sync_public_instagram_account
+from .scheduler import TokenBucket, RetryableFetchError, stale_accounts, sync_accounts
+from .connectors import get_connector, available_platforms, UnsupportedPlatform
+from .rollups import refresh_daily_stats, posted_dates
+from .stats import get_dashboard_stats, bucket_series, hourly_breakdown, pick_granularity
+from .pagination import paginate_posts, POST_PAGE_SIZE
+from .besttimes import recompute_best_times, posting_slot
+from .heatmap import posting_heatmap
+from .insights import refresh_insights, users_needing_insights, refresh_insights_for
+from .nlquery import classify, answer_query
+from .versions import current_data_version
+from .querylog import QueryLogBuffer, compact_query_logs
+from .search import search_posts, fts_available
+from .viral import viral_scores, score_user_posts
+from .loaddata import seed_load_data
+from .hashtags import HashtagTracker, recompute_hashtag_stats, top_user_hashtags
+from .snapshots import compact_snapshots, post_velocity, unpack_samples
+from .profiling import profile_token
+from .instrumentation import QueryRecorder, request_log
+from .viewbench import benchmark_views, budget_violations, load_budgets
+from .views import content_posts
+from . import exports, profiling, querylog
+
+
+def make_posts(account, count, start=0):
+    now = timezone.now()
+    Post.objects.bulk_create([
+        Post(
+            account=account,
+            post_id=f"{account.platform}_{account.id}_{i}",
+            post_type='photo',
+            caption="Test post #test",
+            url=f"https://{account.platform}.com/p/{i}",
+            likes=10 * (i % 7 + 1),
+            comments=i % 5,
+            shares=1,
+            views=100,
+            engagement_rate=1.0 + i % 3,
+            posted_at=now - timedelta(days=i % 20, hours=i % 24),
+        )
+        for i in range(start, start + count)
+    ])
+    refresh_daily_stats(account)
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='secret')
+        self.account = SocialAccount.objects.create(
+            user=self.user, platform='twitter', username='alice', followers_count=1000
+        )
+
+    def test_stats_match_naive_aggregates(self):
+        make_posts(self.account, 40)
+        posts = Post.objects.filter(account=self.account)
+
+        with self.assertNumQueries(1):
+            stats = get_dashboard_stats(self.account, days=7)
+
+        self.assertEqual(stats['total_posts'], 40)
+        self.assertEqual(stats['total_likes'], sum(p.likes for p in posts))
+        self.assertEqual(len(stats['daily_engagement']), 7)
+
+        today = timezone.localdate()
+        for entry in stats['daily_engagement']:
+            day_posts = [p for p in posts if timezone.localtime(p.posted_at).date().strftime('%Y-%m-%d') == entry['date']]
+            self.assertEqual(entry['engagement'], sum(p.likes + p.comments for p in day_posts))
+        self.assertEqual(stats['daily_engagement'][-1]['date'], today.strftime('%Y-%m-%d'))
+
+    def test_empty_account(self):
+        stats = get_dashboard_stats(self.account)
+        self.assertEqual(stats['total_posts'], 0)
+        self.assertEqual(stats['avg_engagement_rate'], 0)
+        self.assertTrue(all(d['engagement'] == 0 for d in stats['daily_engagement']))
+
+    def test_instagram_kpis_count_the_same_posts_as_the_feed(self):
+        account = SocialAccount.objects.create(user=self.user, platform='instagram', username='alice_ig')
+        now = timezone.now()
+        with PostBatchWriter(account) as writer:
+            writer.add('CxYz123AbC_', post_type='photo', url='https://instagram.com', likes=10, posted_at=now)
+            writer.add('Bq-9zz1XyQ', post_type='reel', url='https://instagram.com', likes=20, posted_at=now)
+            # Generated sample posts do not look like shortcodes
+            writer.add('instagram_alice_ig_0_1700000000', post_type='photo', url='https://instagram.com', likes=500, posted_at=now)
+
+        stats = get_dashboard_stats(account)
+        self.assertEqual(stats['total_posts'], content_posts(account).count())
+        self.assertEqual(stats['total_posts'], 2)
+        self.assertEqual(stats['total_likes'], 30)
+
+    def test_dashboard_query_count_is_constant(self):
+        self.client.force_login(self.user)
+        url = reverse('dashboard')
+
+        make_posts(self.account, 5)
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+
+        make_posts(self.account, 200, start=5)
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(url)
+
+        self.assertEqual(len(small), len(large))
+
+
+class TimeBucketTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='bob', password='secret')
+        self.account = SocialAccount.objects.create(
+            user=self.user, platform='twitter', username='bob', followers_count=1000
+        )
+        make_posts(self.account, 60)
+        self.posts = Post.objects.filter(account=self.account)
+
+    def test_series_is_zero_filled_and_sums_match(self):
+        start = timezone.now() - timedelta(days=30)
+        with self.assertNumQueries(1):
+            series = bucket_series(self.posts, start=start, granularity='day')
+
+        self.assertEqual(len(series), 31)
+        in_range = self.posts.filter(posted_at__gte=start)
+        self.assertEqual(sum(p['likes'] for p in series), sum(p.likes for p in in_range))
+        self.assertTrue(any(p['likes'] == 0 for p in series))
+
+    def test_coarse_granularity_reduces_points(self):
+        start = timezone.now() - timedelta(days=365)
+        weekly = bucket_series(self.posts, start=start, granularity='week')
+        monthly = bucket_series(self.posts, start=start, granularity='month')
+
+        self.assertLessEqual(len(weekly), 54)
+        self.assertLessEqual(len(monthly), 13)
+        self.assertEqual(sum(p['likes'] for p in monthly), sum(p['likes'] for p in weekly))
+
+    def test_pick_granularity_caps_points(self):
+        self.assertEqual(pick_granularity(7, 'hour'), 'hour')
+        self.assertEqual(pick_granularity(365, 'hour'), 'week')
+        self.assertEqual(pick_granularity(30, 'bogus'), 'day')
+
+    def test_hourly_breakdown(self):
+        with self.assertNumQueries(1):
+            hourly = hourly_breakdown(self.posts)
+        self.assertEqual(len(hourly), 24)
+        self.assertEqual(sum(h['count'] for h in hourly), 60)
+
+    def test_analytics_query_count_independent_of_range(self):
+        self.client.force_login(self.user)
+        url = reverse('analytics')
+
+        with CaptureQueriesContext(connection) as short:
+            self.client.get(url, {'date_range': '7'})
+        with CaptureQueriesContext(connection) as long:
+            self.client.get(url, {'date_range': '365'})
+
+        self.assertEqual(len(short), len(long))
+
+
+class DailyRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='carol', password='secret')
+        self.account = SocialAccount.objects.create(
+            user=self.user, platform='twitter', username='carol', followers_count=1000
+        )
+
+    def test_analytics_lists_the_posts_the_totals_count(self):
+        instagram = SocialAccount.objects.create(user=self.user, platform='instagram', username='carol')
+        make_posts(self.account, 20)
+        make_posts(instagram, 10)  # Not shortcodes, so no stat counts them
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('analytics'), {'date_range': '7'})
+
+        posts = list(response.context['posts'])
+        hourly = json.loads(response.context['hourly_performance'])
+        self.assertTrue(posts)
+        self.assertTrue(all(post.account_id == self.account.id for post in posts))
+        self.assertEqual(len(posts), response.context['total_posts'])
+        self.assertEqual(sum(h['count'] for h in hourly), response.context['total_posts'])
+
+    def test_rollup_matches_raw_posts(self):
+        make_posts(self.account, 80)
+        posts = Post.objects.filter(account=self.account)
+
+        rows = AccountDailyStats.objects.filter(account=self.account)
+        self.assertEqual(sum(r.post_count for r in rows), 80)
+        self.assertEqual(sum(r.likes for r in rows), sum(p.likes for p in posts))
+        for row in rows:
+            self.assertEqual(sum(t['post_count'] for t in row.post_type_breakdown.values()), row.post_count)
+
+    def test_incremental_refresh_only_touches_given_days(self):
+        make_posts(self.account, 10)
+        post = Post.objects.filter(account=self.account).first()
+        post.likes += 1000
+        post.save()
+
+        refresh_daily_stats(self.account, posted_dates([post.posted_at]))
+
+        row = AccountDailyStats.objects.get(account=self.account, date=timezone.localdate(post.posted_at))
+        day_posts = Post.objects.filter(account=self.account, posted_at__date=row.date)
+        self.assertEqual(row.likes, sum(p.likes for p in day_posts))
+
+    def test_posted_dates_accepts_naive_datetimes(self):
+        naive = timezone.make_naive(timezone.now())
+        self.assertEqual(posted_dates([naive]), {timezone.localdate()})
+
+    def test_rebuild_command(self):
+        make_posts(self.account, 20)
+        AccountDailyStats.objects.all().delete()
+
+        call_command('rebuild_daily_stats', stdout=StringIO())
+
+        self.assertEqual(sum(r.post_count for r in AccountDailyStats.objects.all()), 20)
+
+
+class PostFeedTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='dave', password='secret')
+        self.account = SocialAccount.objects.create(
+            user=self.user, platform='twitter', username='dave', followers_count=1000
+        )
+        make_posts(self.account, 60)
+        self.client.force_login(self.user)
+
+    def test_keyset_pages_cover_every_post_once(self):
+        posts = Post.objects.filter(account=self.account)
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = paginate_posts(posts, cursor=cursor, limit=25)
+            seen.extend(card['id'] for card in page)
+            if not cursor:
+                break
+
+        expected = list(posts.order_by('-posted_at', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_dashboard_renders_one_page(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(len(response.context['posts']), POST_PAGE_SIZE)
+        self.assertIsNotNone(response.context['next_cursor'])
+
+    def test_feed_endpoint_returns_next_page(self):
+        first = self.client.get(reverse('dashboard'))
+        response = self.client.get(reverse('post_feed'), {
+            'account_id': self.account.id,
+            'cursor': first.context['next_cursor'],
+        })
+        data = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(data['posts']), POST_PAGE_SIZE)
+        self.assertIn('post-card', data['html'])
+        first_ids = {card['id'] for card in first.context['posts']}
+        self.assertFalse(first_ids & {card['id'] for card in data['posts']})
+
+    def test_feed_rejects_bad_cursor(self):
+        response = self.client.get(reverse('post_feed'), {
+            'account_id': self.account.id,
+            'cursor': 'not-a-cursor',
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_feed_rejects_bad_account_id(self):
+        response = self.client.get(reverse('post_feed'), {'account_id': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+class SyncJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='erin', password='secret')
+        self.client.force_login(self.user)
+
+    def test_add_account_enqueues_instead_of_syncing(self):
+        response = self.client.post(reverse('add_account'), {'platform': 'instagram', 'username': 'erin'})
+
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        job = SyncJob.objects.get()
+        self.assertEqual(job.status, 'pending')
+        self.assertEqual(job.account.username, 'erin')
+
+    def test_enqueue_reuses_active_job(self):
+        account = SocialAccount.objects.create(user=self.user, platform='instagram', username='erin')
+        self.assertEqual(enqueue_sync(account), enqueue_sync(account))
+
+    def test_worker_runs_job_and_reports_progress(self):
+        account = SocialAccount.objects.create(user=self.user, platform='instagram', username='erin')
+        job = enqueue_sync(account)
+
+        def fake_sync(username, user, progress, mode):
+            make_posts(account, 3)
+            for i in range(1, 4):
+                progress(i)
+            return account
+
+        claimed = claim_next_job()
+        self.assertEqual(claimed.id, job.id)
+        self.assertIsNone(claim_next_job())
+
+        run_sync_job(claimed, sync=fake_sync)
+
+        data = self.client.get(reverse('sync_status', args=[job.id])).json()
+        self.assertEqual(data['status'], 'success')
+        self.assertEqual(data['progress'], 3)
+
+    def test_failed_job_records_error(self):
+        account = SocialAccount.objects.create(user=self.user, platform='instagram', username='ghost')
+        enqueue_sync(account)
+
+        job = run_sync_job(claim_next_job(), sync=lambda **kwargs: None)
+
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('@ghost', job.error)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failed_first_sync_removes_the_account(self):
+        account = SocialAccount.objects.create(user=self.user, platform='instagram', username='ghost')
+        job = enqueue_sync(account)
+
+        run_sync_job(claim_next_job(), sync=lambda **kwargs: None)
+
+        self.assertFalse(SocialAccount.objects.filter(id=account.id).exists())
+        data = self.client.get(reverse('sync_status', args=[job.id])).json()
+        self.assertEqual(data['status'], 'failed')
+        self.assertIn('@ghost', data['error'])
+
+    def test_failed_resync_keeps_the_account(self):
+        account = SocialAccount.objects.create(user=self.user, platform='instagram', username='erin')
+        run_sync_job(enqueue_sync(account), sync=lambda **kwargs: account)
+
+        job = run_sync_job(enqueue_sync(account), sync=lambda **kwargs: None)
+
+        self.assertEqual(job.status, 'failed')
+        self.assertTrue(SocialAccount.objects.filter(id=account.id).exists())
+
+    def test_worker_command_exits_when_queue_is_empty(self):
+        out = StringIO()
+        call_command('run_sync_worker', '--once', stdout=out)
+        self.assertIn('Sync worker stopped', out.getvalue())
+
+
+class FakeInstaPost:
+    def __init__(self, shortcode, date_utc, likes=10, is_pinned=False):
+        self.shortcode = shortcode
+        self.date_utc = date_utc
+        self.likes = likes
+        self.comments = 1
+        self.caption = f"Post {shortcode} #fake"
+        self.is_video = False
+        self.mediacount = 1
+        self.video_view_count = None
+        self.url = f"https://cdn.example.com/{shortcode}.jpg"
+        self.is_pinned = is_pinned
+
+
+class FakePostIterator:
+    def __init__(self, posts, fail_after=None):
+        self.posts = posts
+        self.fail_after = fail_after
+        self.index = 0
+        self.thawed = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.fail_after is not None and self.index >= self.fail_after:
+            raise ConnectionError("429 Too Many Requests")
+        if self.index >= len(self.posts):
+            raise StopIteration
+        post = self.posts[self.index]
+        self.index += 1
+        return post
+
+    def freeze(self):
+        return FakeFrozen(self.index)
+
+    def thaw(self, frozen):
+        self.thawed = frozen
+        self.index = frozen.total_index
+
+
+class FakeFrozen:
+    def __init__(self, total_index):
+        self.total_index = total_index
+
+    def _asdict(self):
+        return {'total_index': self.total_index}
+
+
+class IncrementalSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='frank', password='secret')
+        now = timezone.make_naive(timezone.now(), timezone.utc)
+        # Newest first, like Profile.get_posts()
+        self.timeline = [
+            FakeInstaPost(f"code{i:07d}", now - timedelta(days=2 * i))
+            for i in range(80)
+        ]
+
+    def sync(self, iterator, **kwargs):
+        profile = mock.Mock(followers=1000, followees=10, mediacount=len(self.timeline))
+        profile.get_posts.return_value = iterator
+        with mock.patch('instaloader.Instaloader'), \
+                mock.patch('instaloader.Profile.from_username', return_value=profile), \
+                mock.patch('instaloader.nodeiterator.FrozenNodeIterator', FakeFrozen):
+            return sync_public_instagram_account('frank', self.user, **kwargs)
+
+    def test_first_sync_is_capped_and_records_high_water(self):
+        account = self.sync(FakePostIterator(self.timeline))
+
+        self.assertEqual(Post.objects.filter(account=account).count(), 50)
+        self.assertEqual(account.last_post_shortcode, 'code0000000')
+
+    def test_incremental_sync_stops_at_known_posts_outside_window(self):
+        self.sync(FakePostIterator(self.timeline))
+        now = timezone.make_naive(timezone.now(), timezone.utc)
+        self.timeline.insert(0, FakeInstaPost('newpost0001', now))
+
+        iterator = FakePostIterator(self.timeline)
+        account = self.sync(iterator)
+
+        # The new post plus the known posts inside the 7-day refresh window
+        self.assertEqual(iterator.index, 6)
+        self.assertEqual(account.last_post_shortcode, 'newpost0001')
+        self.assertEqual(Post.objects.filter(account=account).count(), 51)
+
+    def test_incremental_sync_is_not_capped(self):
+        self.sync(FakePostIterator(self.timeline))
+        now = timezone.make_naive(timezone.now(), timezone.utc)
+        new_posts = [FakeInstaPost(f"new{i:07d}", now + timedelta(minutes=60 - i)) for i in range(60)]
+
+        account = self.sync(FakePostIterator(new_posts + self.timeline))
+
+        self.assertEqual(Post.objects.filter(account=account, post_id__startswith='new').count(), 60)
+        self.assertEqual(account.last_post_shortcode, 'new0000000')
+
+    def test_interrupted_incremental_sync_keeps_high_water(self):
+        self.sync(FakePostIterator(self.timeline))
+        now = timezone.make_naive(timezone.now(), timezone.utc)
+        new_posts = [FakeInstaPost(f"new{i:07d}", now + timedelta(minutes=20 - i)) for i in range(20)]
+
+        with self.assertRaises(ConnectionError):
+            self.sync(FakePostIterator(new_posts + self.timeline, fail_after=10))
+
+        account = SocialAccount.objects.get(username='frank')
+        # The fetched posts are kept, but the mark stays put so the next run covers the gap
+        self.assertEqual(Post.objects.filter(account=account, post_id__startswith='new').count(), 10)
+        self.assertEqual(account.last_post_shortcode, 'code0000000')
+
+    def test_pinned_old_post_does_not_end_incremental_sync(self):
+        self.sync(FakePostIterator(self.timeline))
+        pinned = FakeInstaPost('code0000070', self.timeline[70].date_utc, is_pinned=True)
+
+        iterator = FakePostIterator([pinned] + self.timeline)
+        self.sync(iterator)
+
+        self.assertGreater(iterator.index, 1)
+
+    def test_backfill_resumes_from_checkpoint(self):
+        with self.assertRaises(ConnectionError):
+            self.sync(FakePostIterator(self.timeline, fail_after=30), mode='backfill')
+
+        account = SocialAccount.objects.get(username='frank')
+        self.assertEqual(account.backfill_checkpoint, {'total_index': 30})
+
+        iterator = FakePostIterator(self.timeline)
+        account = self.sync(iterator, mode='backfill')
+
+        self.assertEqual(iterator.thawed.total_index, 30)
+        self.assertEqual(Post.objects.filter(account=account).count(), 80)
+        self.assertIsNone(account.backfill_checkpoint)
+
+
+class PostBatchWriterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='gina', password='secret')
+        self.account = SocialAccount.objects.create(
+            user=self.user, platform='twitter', username='gina', followers_count=1000
+        )
+
+    def record(self, i, likes=10):
+        return dict(
+            post_type='photo',
+            caption=f"Post {i}",
+            url=f"https://twitter.com/p/{i}",
+            likes=likes,
+            posted_at=timezone.now() - timedelta(days=i % 10),
+        )
+
+    def test_upsert_reports_inserted_and_updated(self):
+        with PostBatchWriter(self.account, chunk_size=50) as writer:
+            for i in range(120):
+                writer.add(f"post_{i}", **self.record(i))
+        self.assertEqual((writer.inserted, writer.updated), (120, 0))
+
+        with PostBatchWriter(self.account, chunk_size=50) as writer:
+            for i in range(100, 150):
+                writer.add(f"post_{i}", **self.record(i, likes=99))
+        self.assertEqual((writer.inserted, writer.updated), (30, 20))
+
+        self.assertEqual(Post.objects.filter(account=self.account).count(), 150)
+        self.assertEqual(Post.objects.get(account=self.account, post_id='post_110').likes, 99)
+        self.assertEqual(sum(r.likes for r in AccountDailyStats.objects.filter(account=self.account)), 120 * 10 + 30 * 99 + 20 * 89)
+
+    def test_error_in_the_with_block_drops_the_pending_chunk(self):
+        with self.assertRaises(ValueError):
+            with PostBatchWriter(self.account, chunk_size=50) as writer:
+                for i in range(60):
+                    writer.add(f"post_{i}", **self.record(i))
+                raise ValueError("bad record")
+
+        # The full chunk was written on the way, the ten pending records were not
+        self.assertEqual(Post.objects.filter(account=self.account).count(), 50)
+
+    def test_flush_issues_a_handful_of_queries_per_chunk(self):
+        writer = PostBatchWriter(self.account, chunk_size=1000)
+        for i in range(400):
+            writer.add(f"post_{i}", **self.record(i))
+        with CaptureQueriesContext(connection) as queries:
+            writer.flush()
+
+        # SQLite caps bound parameters, so per-post bulk_creates still split into a few batches;
+        # everything else (rollups, best-time slots, viral scores, data version) is a fixed overhead
+        batched = 0
+        for table in ['main_post', 'main_postanalytics', 'main_postmetricsnapshot']:
+            inserts = [q for q in queries if q['sql'].startswith(f'INSERT INTO "{table}"')]
+            self.assertLess(len(inserts), 10)
+            batched += len(inserts)
+        self.assertLess(len(queries) - batched, 22)
+
+    def test_sample_generator_uses_bulk_writes(self):
+        generate_sample_posts(self.account, count=30)
+
+        self.assertEqual(Post.objects.filter(account=self.account).count(), 30)
+        self.assertEqual(PostAnalytics.objects.filter(post__account=self.account).count(), 30)
+        tagged = Post.objects.filter(account=self.account, caption__contains='#').count()
+        self.assertEqual(PostHashtag.objects.values('post').distinct().count(), tagged)
+        for post in Post.objects.filter(account=self.account).select_related('account'):
+            self.assertAlmostEqual(post.engagement_rate, post.calculate_engagement_rate())
+
+
+class MultiAccountSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='hank', password='secret')
+        now = timezone.now()
+        self.accounts = [
+            SocialAccount.objects.create(
+                user=self.user, platform='instagram', username=f'acct{i}',
+                last_synced=now - timedelta(hours=i) if i else None
+            )
+            for i in range(5)
+        ]
+
+    def fake_fetch(self, username, last_post_at, last_post_shortcode, limiter):
+        if limiter:
+            limiter.acquire()
+        posted_at = timezone.now() - timedelta(days=1)
+        return {
+            "followers_count": 100,
+            "following_count": 10,
+            "posts_count": 3,
+            "batches": [[
+                (f"{username}_{i}", dict(post_type='photo', url=f"https://instagram.com/p/{i}", likes=i, posted_at=posted_at))
+                for i in range(3)
+            ]],
+            "newest": (posted_at, f"{username}_0"),
+        }
+
+    def test_stale_accounts_never_synced_first(self):
+        SocialAccount.objects.create(user=self.user, platform='instagram', username='fresh', last_synced=timezone.now())
+        accounts = stale_accounts(timedelta(minutes=30))
+
+        self.assertEqual([a.username for a in accounts], ['acct0', 'acct4', 'acct3', 'acct2', 'acct1'])
+
+    def test_sync_accounts_writes_every_fetch(self):
+        summary = sync_accounts(self.accounts, fetch=self.fake_fetch, workers=3, log=lambda msg: None)
+
+        self.assertEqual(summary['synced'], 5)
+        self.assertEqual(summary['inserted'], 15)
+        account = SocialAccount.objects.get(username='acct0')
+        self.assertEqual(account.followers_count, 100)
+        self.assertEqual(account.last_post_shortcode, 'acct0_0')
+        self.assertIsNotNone(account.last_synced)
+
+    def test_retryable_errors_back_off_then_fail(self):
+        calls = []
+
+        def flaky(**kwargs):
+            calls.append(kwargs['username'])
+            raise RetryableFetchError("429 Too Many Requests")
+
+        with mock.patch('main.scheduler.backoff_delay', return_value=0):
+            summary = sync_accounts(self.accounts[:1], fetch=flaky, retries=2, log=lambda msg: None)
+
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(summary['failed'], 1)
+
+    def test_exhausted_budget_skips_remaining_accounts(self):
+        summary = sync_accounts(self.accounts, fetch=self.fake_fetch, budget=-1, log=lambda msg: None)
+
+        self.assertEqual(summary['skipped'], 5)
+        self.assertEqual(Post.objects.count(), 0)
+
+    def test_token_bucket_waits_when_empty(self):
+        clock = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            clock[0] += seconds
+
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: clock[0], sleep=sleep)
+        for _ in range(4):
+            bucket.acquire()
+
+        self.assertAlmostEqual(sum(sleeps), 1.0)
+
+    def test_token_bucket_rejects_zero_rate(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0)
+        with self.assertRaises(CommandError):
+            call_command('sync_accounts', '--rate', '0', stdout=StringIO())
+
+
+class ConnectorRegistryTests(TestCase):
+    def test_web_modules_do_not_import_instaloader(self):
+        code = (
+            "import django, sys; django.setup(); "
+            "import social_analytics.urls, main.jobs, main.scheduler, main.connectors; "
+            "print('instaloader' in sys.modules)"
+        )
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'social_analytics.settings'}
+        output = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.strip(), 'False')
+
+    def test_sample_connector_returns_normalized_batches(self):
+        result = get_connector('twitter').fetch('ivy')
+
+        records = [record for batch in result['batches'] for record in batch]
+        self.assertEqual(len(records), 15)
+        post_id, fields = records[0]
+        self.assertTrue(post_id.startswith('twitter_ivy_'))
+        self.assertIn('posted_at', fields)
+
+    def test_unknown_platform(self):
+        with self.assertRaises(UnsupportedPlatform):
+            get_connector('myspace')
+
+    @override_settings(SOCIAL_CONNECTORS={'linkedin': 'main.connectors.sample.SampleConnector'})
+    def test_settings_can_register_platforms(self):
+        self.assertIn('linkedin', available_platforms())
+        self.assertEqual(get_connector('linkedin').platform, 'linkedin')
+
+    def test_add_account_uses_connector(self):
+        user = User.objects.create_user(username='ivy', password='secret')
+        self.client.force_login(user)
+
+        self.client.post(reverse('add_account'), {'platform': 'tiktok', 'username': 'ivy'})
+
+        account = SocialAccount.objects.get(user=user)
+        self.assertEqual(Post.objects.filter(account=account).count(), 15)
+        self.assertGreater(account.followers_count, 0)
+
+
+class BestTimeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='jo', password='secret')
+        self.account = SocialAccount.objects.create(
+            user=self.user, platform='twitter', username='jo', followers_count=1000
+        )
+
+    def slots(self):
+        return {
+            (slot.day_of_week, slot.hour): (slot.post_count, round(slot.avg_engagement, 6), slot.engagement_counts)
+            for slot in BestTimeToPost.objects.filter(account=self.account)
+        }
+
+    def test_writer_keeps_slots_in_step_with_full_recompute(self):
+        now = timezone.now()
+        with PostBatchWriter(self.account, chunk_size=25) as writer:
+            for i in range(60):
+                writer.add(f"post_{i}", posted_at=now - timedelta(hours=i * 5), engagement_rate=i % 7, likes=i)
+        with PostBatchWriter(self.account) as writer:
+            # Moves ten posts to new slots and changes their engagement
+            for i in range(10):
+                writer.add(f"post_{i}", posted_at=now - timedelta(hours=i * 3 + 1), engagement_rate=20)
+
+        incremental = self.slots()
+        recompute_best_times()
+        self.assertEqual(incremental, self.slots())
+        self.assertEqual(sum(count for count, _, _ in incremental.values()), 60)
+
+    def test_recompute_uses_one_grouped_query(self):
+        make_posts(self.account, 50)
+        with CaptureQueriesContext(connection) as queries:
+            recompute_best_times()
+        # One grouped read of posts for the single audience timezone
+        self.assertEqual(len([q for q in queries if 'FROM "main_post"' in q['sql']]), 1)
+
+        post = Post.objects.filter(account=self.account).first()
+        slot = BestTimeToPost.objects.get(account=self.account, day_of_week=posting_slot(post.posted_at)[0], hour=posting_slot(post.posted_at)[1])
+        self.assertGreater(slot.post_count, 0)
+
+    def test_view_reads_only_the_slots(self):
+        make_posts(self.account, 50)
+        recompute_best_times()
+        self.client.force_login(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('best_time'))
+        # The best times list, then the heatmap cell by cell; never the posts
+        best_time_queries = [q for q in queries if 'main_besttimetopost' in q['sql']]
+        self.assertEqual(len(best_time_queries), 2)
+        self.assertFalse(any('"main_post"' in q['sql'] for q in queries))
+        self.assertEqual(len(response.context['best_times'][0]['times']), 5)
+
+    def test_accounts_without_slots_are_listed(self):
+        make_posts(self.account, 20)
+        recompute_best_times()
+        empty = SocialAccount.objects.create(user=self.user, platform='instagram', username='jo_new')
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('best_time'))
+        best_times = {item['account'].id: item['times'] for item in response.context['best_times']}
+        self.assertEqual(set(best_times), {self.account.id, empty.id})
+        self.assertEqual(best_times[empty.id], [])
+        self.assertContains(response, 'Not enough posts yet')
+
+
+class PostingHeatmapTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='kai', password='secret')
+        self.account = SocialAccount.objects.create(
+            user=self.user, platform='twitter', username='kai', audience_timezone='America/New_York'
+        )
+
+    def add_post(self, i, posted_at, engagement_rate):
+        Post.objects.create(
+            account=self.account, post_id=f"p{i}", post_type='photo', url='https://twitter.com',
+            posted_at=posted_at, engagement_rate=engagement_rate
+        )
+
+    def test_cells_use_the_audience_timezone(self):
+        # Monday 2026-01-05 14:30 UTC is 09:30 in New York (EST)
+        monday = datetime(2026, 1, 5, 14, 30, tzinfo=pytz.utc)
+        for i, rate in enumerate([1.0, 2.0, 9.0]):
+            self.add_post(i, monday, rate)
+        # Summer time: 13:30 UTC is also 09:30 in New York (EDT)
+        self.add_post(3, datetime(2026, 7, 6, 13, 30, tzinfo=pytz.utc), 4.0)
+        recompute_best_times()
+
+        with CaptureQueriesContext(connection) as queries:
+            heatmap = posting_heatmap(self.user)
+        # Only the slot rollup is read, never the posts
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('main_post"', queries[0]['sql'])
+
+        monday_row = heatmap[0]
+        self.assertEqual(monday_row['day'], 'Monday')
+        self.assertEqual(monday_row['counts'][9], 4)
+        self.assertEqual(monday_row['hours'][9], 4.0)
+        self.assertEqual(monday_row['medians'][9], 3.0)
+        self.assertEqual(sum(sum(day['counts']) for day in heatmap), 4)
+
+    def test_matches_best_time_slots(self):
+        make_posts(self.account, 60)
+        recompute_best_times()
+
+        heatmap = posting_heatmap(self.user)
+        for slot in BestTimeToPost.objects.filter(account=self.account):
+            self.assertEqual(heatmap[slot.day_of_week]['counts'][slot.hour], slot.post_count)
+            self.assertAlmostEqual(heatmap[slot.day_of_week]['hours'][slot.hour], slot.avg_engagement, places=2)
+
+    def test_writer_keeps_heatmap_current_between_recomputes(self):
+        monday = datetime(2026, 1, 5, 14, 30, tzinfo=pytz.utc)
+        with PostBatchWriter(self.account) as writer:
+            writer.add('a', post_type='photo', url='https://twitter.com', posted_at=monday, engagement_rate=2.0)
+        self.assertEqual(posting_heatmap(self.user)[0]['medians'][9], 2.0)
+
+        with PostBatchWriter(self.account) as writer:
+            writer.add('b', post_type='photo', url='https://twitter.com', posted_at=monday, engagement_rate=6.0)
+            writer.add('c', post_type='photo', url='https://twitter.com', posted_at=monday, engagement_rate=1.0)
+        monday_row = posting_heatmap(self.user)[0]
+        self.assertEqual(monday_row['counts'][9], 3)
+        self.assertEqual(monday_row['hours'][9], 3.0)
+        self.assertEqual(monday_row['medians'][9], 2.0)
+
+        # Moving a post out of the slot takes its rate out of the distribution
+        with PostBatchWriter(self.account) as writer:
+            writer.add('c', post_type='photo', url='https://twitter.com', posted_at=monday + timedelta(hours=1), engagement_rate=1.0)
+        self.assertEqual(posting_heatmap(self.user)[0]['medians'][9], 4.0)
+
+    def test_medians_are_exact_across_accounts(self):
+        other = SocialAccount.objects.create(
+            user=self.user, platform='instagram', username='kai_ig', audience_timezone='America/New_York'
+        )
+        monday = datetime(2026, 1, 5, 14, 30, tzinfo=pytz.utc)
+        with PostBatchWriter(self.account) as writer:
+            for i, rate in enumerate([1.0, 1.0, 1.0]):
+                writer.add(f"a{i}", post_type='photo', url='https://twitter.com', posted_at=monday, engagement_rate=rate)
+        with PostBatchWriter(other) as writer:
+            writer.add('b0', post_type='photo', url='https://instagram.com', posted_at=monday, engagement_rate=9.0)
+            writer.add('b1', post_type='photo', url='https://instagram.com', posted_at=monday, engagement_rate=9.5)
+
+        # Median of 1, 1, 1, 9, 9.5, not a blend of the two account medians
+        self.assertEqual(posting_heatmap(self.user)[0]['medians'][9], 1.0)
+
+
+class InsightRefreshTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='lee', password='secret')
+        self.account = SocialAccount.objects.create(
+            user=self.user, platform='twitter', username='lee', followers_count=1000
+        )
+        generate_sample_posts(self.account, count=20)
+
+    def test_viewing_twice_does_not_rewrite_insights(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('insights'))
+        ids = set(AIInsight.objects.filter(user=self.user).values_list('id', flat=True))
+        self.assertTrue(ids)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('insights'))
+        writes = [q for q in queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE')) and 'main_aiinsight' in q['sql']]
+        self.assertEqual(writes, [])
+        self.assertEqual(set(AIInsight.objects.filter(user=self.user).values_list('id', flat=True)), ids)
+
+    def test_new_posts_bump_the_version_and_keep_unchanged_insights(self):
+        self.assertIsNotNone(refresh_insights(self.user))
+        before = {(i.insight_type, i.title): i.id for i in AIInsight.objects.filter(user=self.user)}
+        self.assertIsNone(refresh_insights(self.user))
+
+        version = UserDataVersion.objects.get(user=self.user).version
+        with PostBatchWriter(self.account) as writer:
+            writer.add('extra', post_type='photo', url='https://twitter.com', posted_at=timezone.now(), caption='#fresh')
+        self.assertEqual(UserDataVersion.objects.get(user=self.user).version, version + 1)
+
+        # Debounced: the change is noticed but not acted on until the interval passes
+        self.assertIsNone(refresh_insights(self.user))
+        UserDataVersion.objects.filter(user=self.user).update(insights_generated_at=timezone.now() - timedelta(hours=1))
+        self.assertIsNotNone(refresh_insights(self.user))
+
+        after = {(i.insight_type, i.title): i.id for i in AIInsight.objects.filter(user=self.user)}
+        for key in set(before) & set(after):
+            self.assertEqual(before[key], after[key])
+
+    def test_top_hashtag_comes_from_the_stored_links(self):
+        with PostBatchWriter(self.account) as writer:
+            for i in range(3):
+                writer.add(f"top{i}", post_type='photo', url='https://twitter.com', posted_at=timezone.now(),
+                           caption=f"Best one #winner #extra{i}", engagement_rate=5000 + i)
+        with CaptureQueriesContext(connection) as queries:
+            insights = generate_ai_insights(self.user)
+        trend = [insight for insight in insights if insight.insight_type == 'trend']
+        self.assertEqual(trend[0].title, '#winner Is Your Top Hashtag')
+        self.assertEqual(len([q for q in queries if 'main_posthashtag' in q['sql']]), 1)
+
+    def test_read_insights_are_kept(self):
+        refresh_insights(self.user)
+        AIInsight.objects.filter(user=self.user).update(is_read=True)
+        count = AIInsight.objects.filter(user=self.user).count()
+
+        refresh_insights(self.user, force=True)
+        self.assertEqual(AIInsight.objects.filter(user=self.user).count(), count)
+
+    def test_batch_selection(self):
+        self.assertEqual(users_needing_insights(), [self.user.id])
+        user_id, result, error = refresh_insights_for(self.user.id)
+        self.assertIsNone(error)
+        self.assertEqual(users_needing_insights(), [])
+
+
+class QueryRouterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='max', password='secret')
+        self.account = SocialAccount.objects.create(
+            user=self.user, platform='instagram', username='max', followers_count=1000
+        )
+        make_posts(self.account, 30)
+
+    def test_classify_extracts_params(self):
+        self.assertEqual(classify("What was my best post?"), ('best_post', {}))
+        self.assertEqual(
+            classify("How did my reels do on Instagram in the last 3 months?"),
+            ('period_summary', {'platform': 'instagram', 'post_type': 'reel', 'days': 90, 'period': 'last 3 months'})
+        )
+        self.assertEqual(classify("When should I post?")[0], 'best_time')
+        self.assertEqual(classify("Tell me about twitter")[0], 'platform')
+        self.assertEqual(classify("hello")[0], 'help')
+
+    def test_each_intent_is_one_query(self):
+        questions = [
+            "best post", "worst post", "engagement rate", "total likes", "last week",
+            "photo posts", "top hashtags", "when to post", "instagram stats",
+        ]
+        current_data_version(self.user)
+        for question in questions:
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response, intent, cache_hit = answer_query(self.user, question)
+            self.assertFalse(cache_hit)
+            # The data version read plus the answer itself
+            self.assertEqual(len(queries), 2, question)
+
+    def test_repeated_question_hits_cache_until_data_changes(self):
+        first = answer_query(self.user, "total likes")
+        self.assertFalse(first[2])
+
+        with CaptureQueriesContext(connection) as queries:
+            second = answer_query(self.user, "What are my TOTAL likes?")
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(second, (first[0], 'total_likes', True))
+
+        with PostBatchWriter(self.account) as writer:
+            writer.add('new', post_type='photo', url='https://instagram.com', likes=1000, posted_at=timezone.now())
+        third = answer_query(self.user, "total likes")
+        self.assertFalse(third[2])
+        self.assertNotEqual(third[0], first[0])
+
+    def test_version_bumped_by_another_process_is_seen(self):
+        first = answer_query(self.user, "total likes")
+        # A worker process bumps the row directly; this process's cache never hears of it
+        UserDataVersion.objects.filter(user=self.user).update(version=F('version') + 1)
+        self.assertFalse(answer_query(self.user, "total likes")[2])
+        self.assertTrue(answer_query(self.user, "total likes")[2])
+        self.assertEqual(first[1], 'total_likes')
+
+    @override_settings(QUERY_LOG_BUFFERED=False)
+    def test_view_reports_cache_hits(self):
+        self.client.force_login(self.user)
+        first = self.client.post(reverse('ai_query'), {'query': 'best post'}).json()
+        second = self.client.post(reverse('ai_query'), {'query': 'best post'}).json()
+        self.assertEqual((first['cache_hit'], second['cache_hit']), (False, True))
+        self.assertEqual(second['intent'], 'best_post')
+        self.assertIn('execution_time', second)
+
+
+class QueryLogBufferTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='nia', password='secret')
+
+    def entry(self, i=0):
+        return dict(user=self.user, query=f"q{i}", response="r", intent='total_likes', execution_time=0.01)
+
+    def test_flush_writes_one_batch_and_counts_drops(self):
+        buffer = QueryLogBuffer(max_pending=50, flush_size=100, autostart=False)
+        results = [buffer.log(**self.entry(i)) for i in range(60)]
+        self.assertEqual(results.count(False), 10)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(buffer.flush(), 50)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(QueryLog.objects.filter(user=self.user).count(), 50)
+        self.assertEqual(buffer.stats(), {'pending': 0, 'written': 50, 'dropped': 10})
+
+    def test_background_thread_flushes_on_size_and_drains_on_close(self):
+        buffer = QueryLogBuffer(flush_size=5, flush_interval=60)
+        written = []
+        with mock.patch.object(QueryLog.objects, 'bulk_create', side_effect=lambda batch, **kw: written.append(len(batch))):
+            for i in range(5):
+                buffer.log(**self.entry(i))
+            for _ in range(100):
+                if written:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(written, [5])
+
+            buffer.log(**self.entry())
+            buffer.close()
+            self.assertEqual(sum(written), 6)
+            self.assertFalse(buffer.log(**self.entry()))
+
+    def test_compaction_rolls_old_rows_into_daily_percentiles(self):
+        old = timezone.now() - timedelta(days=40)
+        QueryLog.objects.bulk_create([
+            QueryLog(user=self.user, query="q", response="r", intent='best_post', execution_time=i / 100, created_at=old)
+            for i in range(1, 101)
+        ] + [
+            QueryLog(user=self.user, query="q", response="r", intent='best_post', execution_time=1, created_at=timezone.now())
+        ])
+
+        compacted, aggregates = compact_query_logs(timedelta(days=30))
+
+        self.assertEqual((compacted, aggregates), (100, 1))
+        daily = QueryLogDaily.objects.get(user=self.user)
+        self.assertEqual((daily.date, daily.intent, daily.count), (timezone.localdate(old), 'best_post', 100))
+        self.assertAlmostEqual(daily.p50_execution_time, 0.5)
+        self.assertAlmostEqual(daily.p95_execution_time, 0.95)
+        self.assertEqual(QueryLog.objects.filter(user=self.user).count(), 1)
+
+    def test_compaction_keeps_rows_written_after_the_read(self):
+        old = timezone.now() - timedelta(days=40)
+        QueryLog.objects.bulk_create([
+            QueryLog(user=self.user, query="q", response="r", intent='best_post', execution_time=1, created_at=old)
+            for _ in range(10)
+        ])
+        real_percentile = querylog.percentile
+
+        def late_flush(times, fraction):
+            # A buffered flush lands in the same day between the read and the delete
+            if not QueryLog.objects.filter(query="late").exists():
+                QueryLog.objects.create(user=self.user, query="late", response="r", intent='best_post', execution_time=1, created_at=old)
+            return real_percentile(times, fraction)
+
+        with mock.patch.object(querylog, 'percentile', side_effect=late_flush):
+            compacted, _ = compact_query_logs(timedelta(days=30))
+
+        self.assertEqual(compacted, 10)
+        self.assertEqual(QueryLogDaily.objects.get(user=self.user).count, 10)
+        self.assertEqual(list(QueryLog.objects.values_list('query', flat=True)), ["late"])
+
+
+class CaptionSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='ora', password='secret')
+        self.account = SocialAccount.objects.create(
+            user=self.user, platform='instagram', username='ora', followers_count=1000
+        )
+        other = User.objects.create_user(username='pat', password='secret')
+        self.other_account = SocialAccount.objects.create(user=other, platform='instagram', username='pat')
+
+    def add(self, account, post_id, caption, engagement_rate=1.0):
+        with PostBatchWriter(account) as writer:
+            writer.add(post_id, post_type='photo', url='https://instagram.com', caption=caption,
+                       engagement_rate=engagement_rate, posted_at=timezone.now())
+
+    def test_index_follows_writes_and_ranks_by_relevance_and_engagement(self):
+        self.assertTrue(fts_available())
+        self.add(self.account, 'a', "Product launch coming soon! #launch", 2.0)
+        self.add(self.account, 'b', "Our product launch was a hit, the product launch of the year", 1.0)
+        self.add(self.account, 'c', "Sunday vibes", 9.0)
+        self.add(self.other_account, 'd', "Product launch for someone else", 9.0)
+
+        results = search_posts(self.user, "product launch")
+        self.assertEqual({post.post_id for post in results}, {'a', 'b'})
+
+        # Updated captions are re-indexed through the triggers
+        self.add(self.account, 'c', "Sunday product launch recap", 9.0)
+        results = search_posts(self.user, "product launch")
+        self.assertEqual(results[0].post_id, 'c')
+
+        Post.objects.filter(post_id='c').delete()
+        self.assertNotIn('c', [post.post_id for post in search_posts(self.user, "product launch")])
+
+    def test_search_input_is_not_fts_syntax(self):
+        self.add(self.account, 'a', "Tips and tricks")
+        self.assertEqual(search_posts(self.user, 'tips" OR NEAR(*'), [])
+        self.assertEqual(len(search_posts(self.user, 'TIPS')), 1)
+
+    def test_endpoint_and_ai_query_intent(self):
+        self.add(self.account, 'a', "Behind the scenes of our latest project")
+        self.client.force_login(self.user)
+
+        data = self.client.get(reverse('search_posts'), {'q': 'latest project'}).json()
+        self.assertEqual([post['post_id'] for post in data['posts']], ['a'])
+        self.assertEqual(data['posts'][0]['platform'], 'instagram')
+        # Zero or negative limits still return a result rather than an unbounded one
+        self.add(self.account, 'b', "Another latest project update")
+        for limit in (0, -5):
+            data = self.client.get(reverse('search_posts'), {'q': 'latest project', 'limit': limit}).json()
+            self.assertEqual(len(data['posts']), 1)
+
+        response, intent, _ = answer_query(self.user, "Show me posts about the latest project")
+        self.assertEqual(intent, 'search')
+        self.assertIn('Behind the scenes', response)
+
+
+class ViralScoreTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='quin', password='secret')
+        self.account = SocialAccount.objects.create(
+            user=self.user, platform='tiktok', username='quin', followers_count=1000
+        )
+
+    def test_vectorized_thresholds(self):
+        import numpy as np
+        scores = viral_scores(
+            np.array([1001, 501, 101, 100, 5000]),
+            np.array([8.5, 5.5, 3.5, 3.0, 20.0]),
+            np.array([101, 51, 21, 20, 500]),
+            np.array([101, 51, 21, 20, 500]),
+            np.array([100, 2 * 86400, 2 * 86400, 86400, 0]),
+        )
+        self.assertEqual(scores.tolist(), [100, 60, 35, 0, 100])
+
+    def test_writer_scores_posts_and_view_ranks_all_of_them(self):
+        now = timezone.now()
+        with PostBatchWriter(self.account, chunk_size=20) as writer:
+            for i in range(60):
+                # The oldest posts are the strongest, outside the old "latest 50" window
+                strong = i >= 55
+                writer.add(f"post_{i}", posted_at=now - timedelta(days=i + 2), likes=2000 if strong else 50,
+                           engagement_rate=9 if strong else 1, shares=0, comments=0)
+        self.assertEqual(PostAnalytics.objects.filter(post__account=self.account).count(), 60)
+        self.assertEqual(PostAnalytics.objects.filter(viral_score=55).count(), 5)
+
+        # Re-scoring updates rows in place instead of adding new ones
+        Post.objects.filter(post_id='post_0').update(likes=600)
+        score_user_posts(self.user)
+        self.assertEqual(PostAnalytics.objects.filter(post__account=self.account).count(), 60)
+        self.assertEqual(PostAnalytics.objects.get(post__post_id='post_0').viral_score, 20)
+
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('viral_predictor'))
+        self.assertEqual(len([q for q in queries if 'main_postanalytics' in q['sql']]), 1)
+        predictions = response.context['predictions']
+        self.assertEqual(len(predictions), 20)
+        self.assertEqual({p['post'].post_id for p in predictions[:5]}, {f"post_{i}" for i in range(55, 60)})
+        self.assertEqual(predictions[5]['post'].post_id, 'post_0')
+
+
+class MetricSnapshotTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='rey', password='secret')
+        self.account = SocialAccount.objects.create(
+            user=self.user, platform='instagram', username='rey', followers_count=1000
+        )
+
+    def test_each_sync_flush_records_one_snapshot_per_recent_post(self):
+        now = timezone.now()
+        for likes in (10, 25):
+            with PostBatchWriter(self.account) as writer:
+                writer.add('new', likes=likes, views=likes * 3, posted_at=now - timedelta(hours=2))
+                writer.add('old', likes=likes, posted_at=now - timedelta(days=200))
+        with PostBatchWriter(self.account, snapshots=False) as writer:
+            writer.add('new', likes=40, posted_at=now - timedelta(hours=2))
+
+        snapshots = PostMetricSnapshot.objects.order_by('taken_at')
+        self.assertEqual([(s.post.post_id, s.likes, s.views) for s in snapshots], [('new', 10, 30), ('new', 25, 75)])
+
+    def test_compaction_downsamples_without_changing_velocity(self):
+        post = Post.objects.create(account=self.account, post_id='p', url='https://instagram.com',
+                                   posted_at=timezone.now() - timedelta(days=10))
+        PostMetricSnapshot.objects.bulk_create([
+            PostMetricSnapshot(post=post, taken_at=post.posted_at + timedelta(hours=hour),
+                               likes=hour * 10, comments=hour, views=hour * 100)
+            for hour in range(1, 240)
+        ])
+        before = post_velocity(post, 24)
+        self.assertEqual((before['likes'], before['comments'], before['views']), (240, 24, 2400))
+        self.assertTrue(before['complete'])
+
+        with CaptureQueriesContext(connection) as queries:
+            compacted, written = compact_snapshots(timedelta(days=1))
+        self.assertLess(len(queries), 15)
+        self.assertEqual(written, 1)
+
+        series = PostMetricSeries.objects.get(post=post)
+        samples = unpack_samples(series.samples)
+        # Hourly for the first three days, then one sample per six hours
+        self.assertEqual(series.sample_count, len(samples))
+        self.assertEqual(len(samples), 71 + 25)
+        self.assertEqual(compacted + PostMetricSnapshot.objects.filter(post=post).count(), 239)
+        after = post_velocity(post, 24)
+        self.assertEqual(after['samples'], 96 + 23)
+        self.assertEqual(dict(after, samples=None), dict(before, samples=None))
+
+        # Compacting again only merges what has aged out since
+        self.assertEqual(compact_snapshots(timedelta(days=1)), (0, 0))
+
+    def test_velocity_endpoint(self):
+        post = Post.objects.create(account=self.account, post_id='p', url='https://instagram.com',
+                                   posted_at=timezone.now() - timedelta(hours=6))
+        PostMetricSnapshot.objects.create(post=post, taken_at=post.posted_at + timedelta(hours=4), likes=80)
+        other = User.objects.create_user(username='sam', password='secret')
+        self.client.force_login(self.user)
+
+        data = self.client.get(reverse('post_velocity', args=[post.id]), {'hours': 12}).json()
+        self.assertFalse(data['complete'])
+        self.assertEqual((data['observed_hours'], data['likes'], data['likes_per_hour']), (4.0, 80, 20.0))
+        self.assertEqual(data['curve'], [[0.0, 0.0, 0.0, 0.0], [4.0, 80.0, 0.0, 0.0]])
+
+        self.assertEqual(self.client.get(reverse('post_velocity', args=[post.id]), {'hours': 'x'}).status_code, 400)
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse('post_velocity', args=[post.id])).status_code, 404)
+
+
+class ExportReportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='sol', password='secret')
+        self.instagram = SocialAccount.objects.create(user=self.user, platform='instagram', username='sol')
+        self.twitter = SocialAccount.objects.create(user=self.user, platform='twitter', username='sol')
+        make_posts(self.instagram, 30)
+        make_posts(self.twitter, 20)
+        self.client.force_login(self.user)
+
+    def export(self, **params):
+        response = self.client.get(reverse('export_report'), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_streams_every_post_in_a_constant_number_of_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            lines = self.export().decode().splitlines()
+        self.assertLessEqual(len(queries), 3)
+        self.assertEqual(lines[0], 'Post ID,Platform,Type,Likes,Comments,Shares,Engagement Rate,Posted At')
+        self.assertEqual(len(lines), 51)
+        self.assertEqual({line.split(',')[1] for line in lines[1:]}, {'instagram', 'twitter'})
+
+    def test_filters_match_the_analytics_page(self):
+        lines = self.export(platform='twitter', date_range='5').decode().splitlines()[1:]
+        expected = Post.objects.filter(account=self.twitter, posted_at__gte=timezone.now() - timedelta(days=5))
+        self.assertEqual(sorted(line.split(',')[0] for line in lines), sorted(expected.values_list('post_id', flat=True)))
+
+        today = timezone.localdate().isoformat()
+        lines = self.export(start=today, end=today).decode().splitlines()[1:]
+        self.assertEqual(len(lines), Post.objects.filter(posted_at__date=today).count())
+
+        response = self.client.get(reverse('export_report'), {'start': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_gzip(self):
+        import gzip
+        response = self.client.get(reverse('export_report'), {'gzip': '1'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('.csv.gz', response['Content-Disposition'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.export())
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        import tempfile
+        self.root = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(exports, 'EXPORT_ROOT', exports.Path(self.root.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.root.cleanup)
+
+        self.user = User.objects.create_user(username='tam', password='secret')
+        self.account = SocialAccount.objects.create(user=self.user, platform='instagram', username='tam')
+        make_posts(self.account, 25)
+        self.client.force_login(self.user)
+
+    def read_ndjson(self, job):
+        import json
+        with open(exports.export_file(job)) as handle:
+            return [json.loads(line) for line in handle]
+
+    def test_worker_exports_posts_with_analytics_and_links_the_file(self):
+        score_user_posts(self.user)
+        data = self.client.post(reverse('create_export'), {'format': 'ndjson'}).json()
+        self.assertEqual((data['status'], data['download_url']), ('pending', None))
+
+        call_command('run_export_worker', '--once', stdout=StringIO())
+        data = self.client.get(reverse('export_status', args=[data['id']])).json()
+        self.assertEqual((data['status'], data['rows_written'], data['total_rows']), ('success', 25, 25))
+
+        rows = self.read_ndjson(ExportJob.objects.get(id=data['id']))
+        self.assertEqual(sorted(row['id'] for row in rows), sorted(Post.objects.values_list('id', flat=True)))
+        self.assertEqual(rows[0]['platform'], 'instagram')
+        self.assertIsNotNone(rows[0]['viral_score'])
+
+        response = self.client.get(data['download_url'])
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 25)
+
+    def test_interrupted_export_resumes_from_its_checkpoint(self):
+        job = exports.enqueue_export(self.user, 'ndjson')
+        chunk = exports.export_chunk
+        calls = []
+
+        def flaky(*args):
+            calls.append(1)
+            if len(calls) == 3:
+                raise OSError("disk went away")
+            return chunk(*args)
+
+        with mock.patch.object(exports, 'export_chunk', flaky):
+            job = exports.run_export_job(job, chunk_size=10)
+        self.assertEqual((job.status, job.rows_written), ('failed', 20))
+        # Bytes from a chunk that never reached its checkpoint are discarded on resume
+        with open(exports.export_file(job), 'a') as handle:
+            handle.write('{"partial": ')
+
+        exports.requeue_stale_exports(timedelta(0), include_failed=True)
+        job = exports.run_export_job(exports.claim_next_export(), chunk_size=10)
+        self.assertEqual((job.status, job.rows_written), ('success', 25))
+        ids = [row['id'] for row in self.read_ndjson(job)]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(len(ids), 25)
+
+    def test_incremental_export_only_has_changes_since_the_last_one(self):
+        exports.run_export_job(exports.enqueue_export(self.user, 'ndjson'))
+        with PostBatchWriter(self.account) as writer:
+            writer.add(f"{self.account.platform}_{self.account.id}_3", likes=999)
+            writer.add('brand_new', url='https://instagram.com', posted_at=timezone.now())
+
+        job = exports.run_export_job(exports.enqueue_export(self.user, 'ndjson', incremental=True))
+        self.assertIsNotNone(job.since)
+        rows = self.read_ndjson(job)
+        self.assertEqual(sorted(row['post_id'] for row in rows), ['brand_new', 'instagram_%d_3' % self.account.id])
+
+    def test_parquet_falls_back_to_csv_without_pyarrow(self):
+        with mock.patch.object(exports, 'parquet_available', return_value=False):
+            job = exports.enqueue_export(self.user, 'parquet')
+        self.assertEqual(job.format, 'csv')
+        job = exports.run_export_job(job, chunk_size=7)
+        with open(exports.export_file(job)) as handle:
+            lines = handle.read().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'post_id', 'platform'])
+        self.assertEqual(len(lines), 26)
+
+
+class SeedLoadDataTests(TestCase):
+    def seed(self, prefix, seed=7):
+        end = timezone.make_aware(datetime(2026, 1, 1))
+        call_command('seed_load_data', users=4, accounts=2, posts=250, seed=seed, hashtags=200,
+                     prefix=prefix, end='2026-01-01', stdout=StringIO())
+        return Post.objects.filter(account__user__username__startswith=prefix).order_by('id'), end
+
+    def test_writes_every_table_deterministically(self):
+        posts, end = self.seed('a')
+        self.assertEqual(posts.count(), 2000)
+        self.assertEqual(PostAnalytics.objects.filter(post__in=posts).count(), 2000)
+        self.assertGreater(PostHashtag.objects.filter(post__in=posts).count(), 2000)
+        # Every account has rollups, Instagram ones included, since their ids look like shortcodes
+        accounts = SocialAccount.objects.filter(user__username__startswith='a')
+        self.assertIn('instagram', set(accounts.values_list('platform', flat=True)))
+        for account in accounts:
+            self.assertEqual(
+                AccountDailyStats.objects.filter(account=account).aggregate(n=Sum('post_count'))['n'],
+                Post.objects.filter(account=account).count(),
+            )
+        self.assertEqual(
+            BestTimeToPost.objects.filter(account__user__username='a0').aggregate(n=Sum('post_count'))['n'], 500
+        )
+        # The search index is rebuilt once the bulk load finishes
+        self.assertTrue(search_posts(User.objects.get(username='a0'), posts[0].caption.split()[0]))
+        self.assertTrue(all(post.posted_at < end for post in posts))
+
+        again, _ = self.seed('b')
+        fields = ('likes', 'comments', 'post_type', 'caption', 'posted_at')
+        self.assertEqual(list(posts.values_list(*fields)), list(again.values_list(*fields)))
+        other, _ = self.seed('c', seed=8)
+        self.assertNotEqual(list(posts.values_list(*fields)), list(other.values_list(*fields)))
+
+        with self.assertRaises(CommandError):
+            self.seed('a')
+
+    def test_distributions(self):
+        import numpy as np
+        posts, _ = self.seed('d')
+        likes = np.array(posts.values_list('likes', flat=True))
+        # Heavy tail: the mean sits well above the median
+        self.assertGreater(likes.mean(), 1.3 * np.median(likes))
+
+        hours = np.bincount([posted_at.hour for posted_at in posts.values_list('posted_at', flat=True)], minlength=24)
+        self.assertGreater(hours[20], 3 * hours[4])
+
+        uses = sorted(PostHashtag.objects.filter(post__in=posts).values('hashtag').annotate(n=Count('id')).values_list('n', flat=True), reverse=True)
+        self.assertGreater(uses[0], 5 * uses[20])
+
+
+class ViewBenchmarkTests(TestCase):
+    def setUp(self):
+        seed_load_data(3, 2, 150, seed=3, hashtag_count=100, prefix='bench', log=lambda message: None)
+        self.user = User.objects.get(username='bench0')
+
+    def test_views_stay_within_query_budgets(self):
+        results = benchmark_views(self.user, repeat=1)
+        self.assertEqual(set(results), set(load_budgets()))
+        self.assertTrue(all(result['bytes'] and result['peak_kb'] for result in results.values()))
+        # Timings depend on the machine, so only query counts are enforced here
+        budgets = {name: {'queries': limits['queries']} for name, limits in load_budgets().items()}
+        self.assertEqual(budget_violations('small', results, budgets), [])
+
+    @override_settings(VIEW_BENCHMARK_BUDGETS={'dashboard': {'queries': 1}, 'export_report': {'ms': {'large': 1}}})
+    def test_overridden_budgets_are_reported(self):
+        budgets = load_budgets()
+        self.assertEqual(budgets['dashboard']['peak_kb'], 2048)
+        results = benchmark_views(self.user, views=[('dashboard', 'dashboard', 'GET', {})], repeat=1)
+        violations = budget_violations('small', results, budgets)
+        self.assertEqual(len(violations), 1)
+        self.assertTrue(violations[0].startswith('small dashboard: queries'))
+
+
+class SQLInstrumentationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ira', password='secret')
+        account = SocialAccount.objects.create(user=self.user, platform='instagram', username='ira')
+        make_posts(account, 10)
+        self.client.force_login(self.user)
+        request_log.clear()
+
+    def test_repeated_and_duplicate_queries_are_flagged(self):
+        recorder = QueryRecorder()
+        recorder.install()
+        try:
+            for post in Post.objects.all():
+                post.account.platform
+            list(Post.objects.filter(id=1))
+            list(Post.objects.filter(id=1))
+        finally:
+            recorder.uninstall()
+        summary = recorder.summary()
+        self.assertEqual(summary['queries'], 13)
+        self.assertEqual(summary['repeated'][0]['count'], 10)
+        self.assertIn('main_socialaccount', summary['repeated'][0]['sql'])
+        self.assertEqual([query['count'] for query in summary['duplicates']], [10, 2])
+        self.assertEqual(len(summary['slowest']), 5)
+
+    @override_settings(SQL_INSTRUMENTATION=True)
+    def test_records_requests_including_streamed_bodies(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", total;dur=[\d.]+$')
+
+        response = self.client.get(reverse('export_report'))
+        b''.join(response.streaming_content)
+        response.close()
+
+        export, dashboard = request_log.recent()
+        self.assertEqual((dashboard['view'], dashboard['status']), ('dashboard', 200))
+        self.assertGreater(dashboard['queries'], 0)
+        self.assertEqual(export['path'], reverse('export_report'))
+        # The CSV query runs while streaming and is still counted
+        self.assertTrue(any('"main_post"."post_type"' in query['sql'] for query in export['slowest']))
+
+    def test_disabled_by_default(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(request_log.recent(), [])
+
+    @override_settings(SQL_INSTRUMENTATION=True)
+    def test_inspection_page_is_staff_only(self):
+        self.assertEqual(self.client.get(reverse('request_profiles')).status_code, 302)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('request_profiles'))
+        self.assertContains(response, reverse('request_profiles'))
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='oda', password='secret')
+        account = SocialAccount.objects.create(user=self.user, platform='instagram', username='oda')
+        make_posts(account, 10)
+        self.client.force_login(self.user)
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        patcher = mock.patch.object(profiling, 'PROFILE_ROOT', Path(self.root.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_staff_can_profile_a_request(self):
+        url = reverse('viral_predictor')
+        self.client.get(url, {'profile': '1'})
+        self.assertFalse(RequestProfile.objects.exists())
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url, HTTP_X_PROFILE='1')
+        profile = RequestProfile.objects.get()
+        self.assertEqual(response['X-Profile-Id'], str(profile.id))
+        self.assertEqual((profile.trigger, profile.view_name, profile.status_code), ('staff', 'viral_predictor', 200))
+        self.assertGreater(profile.function_calls, 0)
+        self.assertIn('top_viral_posts', profiling.profile_summary(profile))
+
+        self.assertFalse(profile.streamed)
+
+        download = self.client.get(reverse('download_profile', args=[profile.id]))
+        self.assertTrue(b''.join(download.streaming_content))
+
+    def test_signed_token_is_bound_to_its_path(self):
+        token = profile_token(reverse('dashboard'))
+        self.client.get(reverse('analytics'), {'profile': token})
+        self.assertFalse(RequestProfile.objects.exists())
+        self.client.get(reverse('dashboard'), {'profile': token})
+        self.assertEqual(RequestProfile.objects.get().trigger, 'token')
+
+    def test_sampled_requests_are_kept_only_when_slow(self):
+        with mock.patch.object(profiling, 'PROFILE_SAMPLE_RATE', 1.0):
+            with mock.patch.object(profiling, 'PROFILE_SLOW_MS', 60000):
+                self.client.get(reverse('dashboard'))
+            self.assertFalse(RequestProfile.objects.exists())
+            with mock.patch.object(profiling, 'PROFILE_SLOW_MS', 0), mock.patch.object(profiling, 'PROFILE_KEEP', 2):
+                for _ in range(3):
+                    self.client.get(reverse('dashboard'))
+        self.assertEqual(RequestProfile.objects.filter(trigger='slow').count(), 2)
+        self.assertEqual(len(list(Path(self.root.name).rglob('*.prof'))), 2)
+
+    def test_profiler_overhead_does_not_count_as_slow(self):
+        # Every profiled call is taken to cost a second, so no request is slow once that is removed
+        with mock.patch.object(profiling, 'PROFILE_SAMPLE_RATE', 1.0), \
+                mock.patch.object(profiling, 'PROFILE_SLOW_MS', 1), \
+                mock.patch.object(profiling, 'call_overhead_ms', return_value=1000.0):
+            self.client.get(reverse('dashboard'))
+        self.assertFalse(RequestProfile.objects.exists())
+
+        with mock.patch.object(profiling, 'call_overhead_ms', return_value=0.0001):
+            self.client.get(reverse('dashboard'), HTTP_X_PROFILE=profile_token(reverse('dashboard')))
+        profile = RequestProfile.objects.get()
+        self.assertAlmostEqual(profile.overhead_ms, profile.function_calls * 0.0001, places=1)
+        self.assertGreaterEqual(profiling.call_overhead_ms(), 0)
+
+    def test_admin_lists_profiles(self):
+        self.user.is_staff = self.user.is_superuser = True
+        self.user.save()
+        self.client.get(reverse('dashboard'), {'profile': '1'})
+        profile = RequestProfile.objects.get()
+        self.assertContains(self.client.get(reverse('admin:main_requestprofile_changelist')), reverse('dashboard'))
+        self.assertContains(self.client.get(reverse('admin:main_requestprofile_change', args=[profile.id])), 'cumulative')
+
+        # A file download streams its body after the view has returned
+        self.client.get(reverse('download_profile', args=[profile.id]), {'profile': '1'})
+        streamed = RequestProfile.objects.get(streamed=True)
+        self.assertEqual(streamed.view_name, 'download_profile')
+        self.assertContains(self.client.get(reverse('admin:main_requestprofile_change', args=[streamed.id])), 'only the view is profiled')
+
+
+class HashtagStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='uma', password='secret')
+        self.account = SocialAccount.objects.create(user=self.user, platform='instagram', username='uma')
+
+    def write(self, captions, engagement=None):
+        now = timezone.now()
+        with PostBatchWriter(self.account) as writer:
+            for i, caption in captions.items():
+                writer.add(f"p{i}", caption=caption, engagement_rate=(engagement or {}).get(i, i % 5), posted_at=now - timedelta(days=i))
+
+    def stats(self):
+        return {
+            row.hashtag.tag: (row.uses, round(row.engagement_sum, 6), round(row.avg_engagement, 6), row.last_used_at)
+            for row in UserHashtagStats.objects.filter(user=self.user).select_related('hashtag')
+        }
+
+    def test_writer_keeps_stats_in_step_with_full_recompute(self):
+        self.write({i: f"post {i} #all #{'even' if i % 2 else 'odd'}" for i in range(40)})
+        # New engagement for some posts, and changed tags for others
+        self.write({i: f"post {i} #all #{'even' if i % 2 else 'odd'}" for i in range(5)}, engagement={i: 9 for i in range(5)})
+        self.write({i: f"post {i} #fresh" for i in range(35, 40)})
+
+        incremental = self.stats()
+        recompute_hashtag_stats([self.user])
+        self.assertEqual(incremental, self.stats())
+        self.assertEqual(incremental['all'][0], 35)
+        self.assertEqual(incremental['fresh'][0], 5)
+        self.assertEqual(PostHashtag.objects.filter(hashtag__tag='fresh').count(), 5)
+        all_tag = Hashtag.objects.get(tag='all')
+        self.assertEqual(all_tag.total_uses, 35)
+        self.assertAlmostEqual(all_tag.avg_engagement, incremental['all'][2])
+
+    def test_deltas_are_applied_as_increments(self):
+        self.write({0: "#a"}, engagement={0: 4})
+        # Two writers that each started from the same row both land
+        first, second = HashtagTracker(), HashtagTracker()
+        first.add({'a'}, 2)
+        second.add({'a'}, 6)
+        first.apply(self.user.id)
+        with CaptureQueriesContext(connection) as queries:
+            second.apply(self.user.id)
+        self.assertEqual(self.stats()['a'][:3], (3, 12.0, 4.0))
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "main_userhashtagstats"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('CASE WHEN', updates[0])
+
+    def test_top_hashtags_read_the_stats(self):
+        self.write({0: "#low", 1: "#high", 2: "#high #low"}, engagement={0: 1, 1: 9, 2: 5})
+        self.assertEqual([row.hashtag.tag for row in top_user_hashtags(self.user)], ['high', 'low'])
+
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('analytics'))
+        self.assertContains(response, '#high')
+        self.assertFalse(any('main_posthashtag' in q['sql'] for q in queries))
+        self.assertEqual(answer_query(self.user, "best hashtags")[0], "Your top performing hashtags are: #high (7.00% avg engagement), #low (3.00% avg engagement)")
+
+        self.account.delete()
+        self.assertFalse(UserHashtagStats.objects.filter(user=self.user).exists())
+        self.assertEqual(Hashtag.objects.get(tag='high').total_uses, 0)
+
+    def test_deleting_a_user_takes_their_posts_out_of_global_totals(self):
+        other = User.objects.create_user(username='vic', password='secret')
+        other_account = SocialAccount.objects.create(user=other, platform='instagram', username='vic')
+        with PostBatchWriter(other_account) as writer:
+            writer.add('v0', caption="#shared", engagement_rate=8, posted_at=timezone.now())
+        self.write({0: "#shared", 1: "#shared #mine"}, engagement={0: 2, 1: 4})
+        self.assertEqual(Hashtag.objects.get(tag='shared').total_uses, 3)
+
+        # As the admin does it: the accounts and stats go by cascade
+        self.user.delete()
+        shared = Hashtag.objects.get(tag='shared')
+        self.assertEqual((shared.total_uses, shared.avg_engagement), (1, 8.0))
+        self.assertEqual(Hashtag.objects.get(tag='mine').total_uses, 0)
 
-# Create your tests here.
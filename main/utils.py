@@ -1,9 +1,14 @@
 import random
 from datetime import datetime, timedelta
 from django.utils import timezone
-from django.db.models import Avg, Sum, Count
+from django.db.models import Avg
 from .models import *
-import re
+from .ingest import PostBatchWriter
+from .snapshots import pack_samples
+from .stats import rollup_rows, summarize_rollups
+
+# (hours after posting, share of final totals) for the sample posts' growth curves
+SAMPLE_GROWTH_CURVE = [(0, 0.09), (1, 0.17), (3, 0.35), (6, 0.52), (12, 0.7), (24, 0.87), (48, 0.96), (72, 1.0)]
 
 def generate_sample_posts(account, count=30):
     post_types = ['reel', 'carousel', 'static', 'story', 'video']
@@ -21,241 +26,131 @@ def generate_sample_posts(account, count=30):
         "Transform your life in 30 days"
     ]
     
-    for i in range(count):
-        days_ago = random.randint(0, 90)
-        posted_at = timezone.now() - timedelta(days=days_ago, hours=random.randint(0, 23))
-        
-        likes = random.randint(100, 10000)
-        comments = random.randint(10, 500)
-        shares = random.randint(5, 200)
-        views = likes * random.randint(3, 10)
-        reach = int(views * 0.8)
-        
-        post = Post.objects.create(
-            account=account,
-            post_id=f"{account.platform}_{account.username}_{i}_{int(time.time())}",
-            post_type=random.choice(post_types),
-            caption=random.choice(captions),
-            url=f"https://{account.platform}.com/{account.username}/post/{i}",
-            likes=likes,
-            comments=comments,
-            shares=shares,
-            views=views,
-            reach=reach,
-            posted_at=posted_at
-        )
-        
-        post.calculate_engagement_rate()
-        post.save()
-        
-        hashtags = re.findall(r'#(\w+)', post.caption)
-        for tag in hashtags:
-            hashtag, created = Hashtag.objects.get_or_create(tag=tag)
-            hashtag.total_uses += 1
-            hashtag.save()
-            PostHashtag.objects.get_or_create(post=post, hashtag=hashtag)
-        
-        PostAnalytics.objects.create(
-            post=post,
-            hour_0=int(likes * 0.1),
-            hour_1=int(likes * 0.2),
-            hour_3=int(likes * 0.4),
-            hour_6=int(likes * 0.6),
-            hour_12=int(likes * 0.8),
-            hour_24=likes,
-            hour_48=int(likes * 1.1),
-            hour_72=int(likes * 1.15),
-            sentiment_score=random.uniform(0.5, 1.0),
-            viral_score=random.uniform(30, 95)
-        )
+    curves = []
+    with PostBatchWriter(account) as writer:
+        for i in range(count):
+            days_ago = random.randint(0, 90)
+            posted_at = timezone.now() - timedelta(days=days_ago, hours=random.randint(0, 23))
+            
+            likes = random.randint(100, 10000)
+            comments = random.randint(10, 500)
+            shares = random.randint(5, 200)
+            views = likes * random.randint(3, 10)
+            reach = int(views * 0.8)
+            
+            # Unsaved post, only so the rate comes from the model's own formula
+            engagement_rate = Post(
+                account=account, likes=likes, comments=comments, shares=shares
+            ).calculate_engagement_rate()
+            
+            post_id = f"{account.platform}_{account.username}_{i}_{int(time.time())}"
+            caption = random.choice(captions)
+            writer.add(
+                post_id,
+                post_type=random.choice(post_types),
+                caption=caption,
+                url=f"https://{account.platform}.com/{account.username}/post/{i}",
+                likes=likes,
+                comments=comments,
+                shares=shares,
+                views=views,
+                reach=reach,
+                engagement_rate=engagement_rate,
+                posted_at=posted_at
+            )
+            curves.append((post_id, posted_at, likes, comments, views))
+    
+    # The writer has already linked hashtags and updated their stats
+    post_ids = writer.post_ids(post_id for post_id, *_ in curves)
+    
+    # The writer already created each post's analytics row with its viral score
+    analytics = list(PostAnalytics.objects.filter(post_id__in=list(post_ids.values())))
+    for row in analytics:
+        row.sentiment_score = random.uniform(0.5, 1.0)
+    PostAnalytics.objects.bulk_update(analytics, ['sentiment_score'])
+    
+    # Synthetic early history, standing in for the snapshots hourly syncs would have recorded
+    now = timezone.now()
+    series = []
+    for post_id, posted_at, likes, comments, views in curves:
+        samples = [
+            (hours * 3600, int(likes * share), int(comments * share), int(views * share))
+            for hours, share in SAMPLE_GROWTH_CURVE
+            if posted_at + timedelta(hours=hours) <= now
+        ]
+        series.append(PostMetricSeries(
+            post_id=post_ids[post_id],
+            origin=posted_at,
+            samples=pack_samples(samples),
+            sample_count=len(samples)
+        ))
+    PostMetricSeries.objects.bulk_create(series)
 
 import time
 
-def process_natural_language_query(user, query):
-    query_lower = query.lower()
-    
-    posts = Post.objects.filter(account__user=user)
-    
-    if 'best' in query_lower and 'post' in query_lower:
-        top_post = posts.order_by('-engagement_rate').first()
-        if top_post:
-            return f"Your best performing post was on {top_post.account.platform} with {top_post.engagement_rate:.2f}% engagement rate. It received {top_post.likes} likes, {top_post.comments} comments, and {top_post.shares} shares. Posted on {top_post.posted_at.strftime('%B %d, %Y')}."
-        return "No posts found."
-    
-    if 'worst' in query_lower and 'post' in query_lower:
-        worst_post = posts.order_by('engagement_rate').first()
-        if worst_post:
-            return f"Your lowest performing post was on {worst_post.account.platform} with {worst_post.engagement_rate:.2f}% engagement rate. Consider analyzing what went wrong - was it the timing, content type, or hashtags?"
-        return "No posts found."
-    
-    if 'engagement' in query_lower and 'rate' in query_lower:
-        avg_engagement = posts.aggregate(avg=Avg('engagement_rate'))['avg']
-        if avg_engagement:
-            return f"Your average engagement rate across all posts is {avg_engagement:.2f}%. Industry average is typically 3-6%, so you're {'performing well!' if avg_engagement > 4 else 'below average. Consider improving your content strategy.'}"
-        return "No engagement data available."
-    
-    if 'total' in query_lower and 'likes' in query_lower:
-        total_likes = posts.aggregate(total=Sum('likes'))['total'] or 0
-        return f"You have received a total of {total_likes:,} likes across all your posts! Keep up the great work."
-    
-    if 'last' in query_lower and ('month' in query_lower or 'week' in query_lower):
-        if 'month' in query_lower:
-            date_threshold = timezone.now() - timedelta(days=30)
-            period = "last month"
-        else:
-            date_threshold = timezone.now() - timedelta(days=7)
-            period = "last week"
-        
-        recent_posts = posts.filter(posted_at__gte=date_threshold)
-        count = recent_posts.count()
-        total_engagement = recent_posts.aggregate(
-            likes=Sum('likes'),
-            comments=Sum('comments'),
-            shares=Sum('shares')
-        )
-        return f"In the {period}, you posted {count} times with {total_engagement['likes']} likes, {total_engagement['comments']} comments, and {total_engagement['shares']} shares."
-    
-    if 'reel' in query_lower or 'carousel' in query_lower or 'static' in query_lower:
-        post_type = 'reel' if 'reel' in query_lower else 'carousel' if 'carousel' in query_lower else 'static'
-        type_posts = posts.filter(post_type=post_type)
-        avg_eng = type_posts.aggregate(avg=Avg('engagement_rate'))['avg']
-        count = type_posts.count()
-        if avg_eng:
-            return f"Your {post_type} posts have an average engagement rate of {avg_eng:.2f}% across {count} posts. {'Reels' if post_type == 'reel' else 'Carousels' if post_type == 'carousel' else 'Static posts'} are {'performing excellently!' if avg_eng > 5 else 'performing average.'}"
-        return f"No {post_type} posts found."
-    
-    if 'hashtag' in query_lower:
-        top_hashtags = Hashtag.objects.filter(
-            posthashtag__post__account__user=user
-        ).annotate(
-            uses=Count('posthashtag'),
-            avg_eng=Avg('posthashtag__post__engagement_rate')
-        ).order_by('-avg_eng')[:3]
-        
-        if top_hashtags:
-            result = "Your top performing hashtags are: "
-            for ht in top_hashtags:
-                result += f"#{ht.tag} ({ht.avg_eng:.2f}% avg engagement), "
-            return result[:-2]
-        return "No hashtag data available."
-    
-    if 'when' in query_lower and 'post' in query_lower:
-        hourly_performance = {}
-        for post in posts:
-            hour = post.posted_at.hour
-            if hour not in hourly_performance:
-                hourly_performance[hour] = []
-            hourly_performance[hour].append(post.engagement_rate)
-        
-        best_hour = max(hourly_performance.items(), key=lambda x: sum(x[1])/len(x[1]))
-        return f"Based on your historical data, the best time to post is around {best_hour[0]:02d}:00 hours with an average engagement rate of {sum(best_hour[1])/len(best_hour[1]):.2f}%."
-    
-    if 'instagram' in query_lower or 'twitter' in query_lower or 'facebook' in query_lower:
-        platform = 'instagram' if 'instagram' in query_lower else 'twitter' if 'twitter' in query_lower else 'facebook'
-        platform_posts = posts.filter(account__platform=platform)
-        stats = platform_posts.aggregate(
-            count=Count('id'),
-            avg_eng=Avg('engagement_rate'),
-            total_likes=Sum('likes')
-        )
-        if stats['count']:
-            return f"On {platform.capitalize()}, you have {stats['count']} posts with an average engagement rate of {stats['avg_eng']:.2f}% and {stats['total_likes']:,} total likes."
-        return f"No posts found on {platform.capitalize()}."
-    
-    return "I analyzed your query but need more specific information. Try asking about: 'best post', 'engagement rate', 'total likes', 'last week performance', 'reel vs carousel', 'best hashtags', or 'when to post'."
-
 def generate_ai_insights(user):
+    # Builds unsaved insights; main.insights decides whether and what to write
     posts = Post.objects.filter(account__user=user)
+    daily_rows = rollup_rows(AccountDailyStats.objects.filter(account__user=user))
     
-    if not posts.exists():
-        return
+    if not daily_rows:
+        return []
     
-    AIInsight.objects.filter(user=user, is_read=False).delete()
+    insights = []
+    summary = summarize_rollups(daily_rows)
     
-    avg_engagement = posts.aggregate(avg=Avg('engagement_rate'))['avg']
+    avg_engagement = summary['avg_engagement']
     if avg_engagement and avg_engagement < 3:
-        AIInsight.objects.create(
+        insights.append(AIInsight(
             user=user,
             insight_type='warning',
             title='Low Engagement Rate Detected',
             description=f'Your average engagement rate is {avg_engagement:.2f}%, which is below the industry standard of 3-6%. Consider experimenting with different content types, posting times, and hashtags.',
             priority=5
-        )
+        ))
     
-    post_type_performance = posts.values('post_type').annotate(
-        avg_eng=Avg('engagement_rate'),
-        count=Count('id')
-    ).order_by('-avg_eng')
+    post_type_performance = summary['post_type_comparison']
     
     if len(post_type_performance) > 1:
         best_type = post_type_performance[0]
-        AIInsight.objects.create(
+        insights.append(AIInsight(
             user=user,
             insight_type='recommendation',
             title=f'{best_type["post_type"].title()}s Are Your Best Performers',
-            description=f'Your {best_type["post_type"]} posts have {best_type["avg_eng"]:.2f}% average engagement rate. Consider creating more {best_type["post_type"]} content to maximize reach.',
+            description=f'Your {best_type["post_type"]} posts have {best_type["avg_engagement"]:.2f}% average engagement rate. Consider creating more {best_type["post_type"]} content to maximize reach.',
             priority=4
-        )
+        ))
     
-    recent_posts = posts.filter(posted_at__gte=timezone.now() - timedelta(days=7))
-    if recent_posts.count() < 3:
-        AIInsight.objects.create(
+    week_ago = timezone.localdate() - timedelta(days=7)
+    recent_count = sum(row['post_count'] for row in daily_rows if row['date'] >= week_ago)
+    if recent_count < 3:
+        insights.append(AIInsight(
             user=user,
             insight_type='opportunity',
             title='Posting Frequency Is Low',
             description='You have posted less than 3 times in the last week. Consistent posting (3-5 times per week) can significantly improve your reach and engagement.',
             priority=3
-        )
+        ))
     
-    top_posts = posts.order_by('-engagement_rate')[:5]
+    # One read of the links the writer keeps, rather than parsing the captions again
+    top_posts = posts.order_by('-engagement_rate').values('id')[:5]
+    links = PostHashtag.objects.filter(post__in=top_posts).values('post_id', 'hashtag__tag').order_by('-post__engagement_rate', 'post_id', 'id')
     common_hashtags = {}
-    for post in top_posts:
-        tags = re.findall(r'#(\w+)', post.caption)
-        for tag in tags:
-            common_hashtags[tag] = common_hashtags.get(tag, 0) + 1
+    for link in links:
+        tag = link['hashtag__tag']
+        common_hashtags[tag] = common_hashtags.get(tag, 0) + 1
     
     if common_hashtags:
         top_tag = max(common_hashtags.items(), key=lambda x: x[1])
-        AIInsight.objects.create(
+        insights.append(AIInsight(
             user=user,
             insight_type='trend',
             title=f'#{top_tag[0]} Is Your Top Hashtag',
             description=f'The hashtag #{top_tag[0]} appears in {top_tag[1]} of your top performing posts. Continue using this hashtag and explore related tags.',
             priority=2
-        )
-
-def calculate_best_posting_times(account):
-    posts = Post.objects.filter(account=account)
+        ))
     
-    hourly_performance = {}
-    for hour in range(24):
-        hour_posts = posts.filter(posted_at__hour=hour)
-        if hour_posts.exists():
-            avg_eng = hour_posts.aggregate(avg=Avg('engagement_rate'))['avg']
-            hourly_performance[hour] = avg_eng
-    
-    sorted_hours = sorted(hourly_performance.items(), key=lambda x: x[1], reverse=True)
-    
-    return sorted_hours[:5]
-
-def generate_posting_heatmap(user):
-    posts = Post.objects.filter(account__user=user)
-    
-    heatmap = []
-    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    
-    for day_num in range(7):
-        day_data = {'day': days[day_num], 'hours': []}
-        for hour in range(24):
-            hour_posts = posts.filter(
-                posted_at__week_day=day_num+2 if day_num < 6 else 1,
-                posted_at__hour=hour
-            )
-            avg_eng = hour_posts.aggregate(avg=Avg('engagement_rate'))['avg'] or 0
-            day_data['hours'].append(round(avg_eng, 2))
-        heatmap.append(day_data)
-    
-    return heatmap
+    return insights
 
 def analyze_competitor(user, username, platform):
     analysis, created = CompetitorAnalysis.objects.get_or_create(
@@ -290,40 +185,3 @@ def analyze_competitor(user, username, platform):
     }
     
     return comparison
-
-def calculate_viral_score(post):
-    score = 0
-    
-    if post.likes > 1000:
-        score += 30
-    elif post.likes > 500:
-        score += 20
-    elif post.likes > 100:
-        score += 10
-    
-    if post.engagement_rate > 8:
-        score += 25
-    elif post.engagement_rate > 5:
-        score += 15
-    elif post.engagement_rate > 3:
-        score += 10
-    
-    if post.shares > 100:
-        score += 20
-    elif post.shares > 50:
-        score += 15
-    elif post.shares > 20:
-        score += 10
-    
-    if post.comments > 100:
-        score += 15
-    elif post.comments > 50:
-        score += 10
-    elif post.comments > 20:
-        score += 5
-    
-    time_diff = timezone.now() - post.posted_at
-    if time_diff.days < 1:
-        score += 10
-    
-    return min(score, 100)
\ No newline at end of file
@@ -0,0 +1,24 @@
+from django.db.models import F
+from .models import UserDataVersion
+
+
+def bump_data_version(user_id):
+    updated = UserDataVersion.objects.filter(user_id=user_id).update(version=F('version') + 1)
+    if not updated:
+        # First change recorded for this user; start ahead of insights_version
+        UserDataVersion.objects.get_or_create(user_id=user_id, defaults={'version': 1})
+
+
+def data_version(user):
+    # Users that predate the watermark start one version ahead so they get a first run
+    row, _ = UserDataVersion.objects.get_or_create(user=user, defaults={'version': 1})
+    return row
+
+
+def current_data_version(user):
+    # Read on every call (one indexed lookup) rather than cached: bumps come from sync and
+    # export workers in other processes, and a per-process cache would never hear of them
+    version = UserDataVersion.objects.filter(user_id=user.id).values_list('version', flat=True).first()
+    if version is None:
+        version = data_version(user).version
+    return version
@@ -0,0 +1,158 @@
+import json
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+# (users, accounts per user, posts per account); the benchmark user is the first one seeded,
+# so it owns accounts_per_user * posts_per_account posts among everyone else's
+DATASET_SIZES = {
+    'small': (5, 2, 100),
+    'medium': (10, 2, 1000),
+    'large': (10, 2, 10000),
+}
+
+# (name, url name, method, request data)
+BENCHMARK_VIEWS = [
+    ('dashboard', 'dashboard', 'GET', {}),
+    ('analytics', 'analytics', 'GET', {'date_range': '90'}),
+    ('best_time_to_post', 'best_time', 'GET', {}),
+    ('insights', 'insights', 'GET', {}),
+    ('viral_predictor', 'viral_predictor', 'GET', {}),
+    ('ai_query', 'ai_query', 'POST', {'query': 'What was my best performing post?'}),
+    ('export_report', 'export_report', 'GET', {}),
+]
+
+# Per view: queries (the worst request, session and auth included), ms (median request)
+# and peak_kb (Python allocations during one request). A limit is either one number for
+# every size or a {size: number} dict; sizes missing from the dict are not checked.
+# Query limits hold at every size, since no view may issue per-row queries.
+VIEW_BUDGETS = {
+    'dashboard': {'queries': 10, 'ms': {'small': 100, 'medium': 150, 'large': 250}, 'peak_kb': 2048},
+    'analytics': {'queries': 8, 'ms': {'small': 100, 'medium': 150, 'large': 500}, 'peak_kb': 2048},
+    'best_time_to_post': {'queries': 5, 'ms': 100, 'peak_kb': 1024},
+    'insights': {'queries': 15, 'ms': {'small': 100, 'medium': 150, 'large': 250}, 'peak_kb': 512},
+    'viral_predictor': {'queries': 4, 'ms': 100, 'peak_kb': 1024},
+    'ai_query': {'queries': 6, 'ms': 100, 'peak_kb': 256},
+    'export_report': {'queries': 4, 'ms': {'small': 100, 'medium': 250, 'large': 1500}, 'peak_kb': 3072},
+}
+
+
+def load_budgets(path=None):
+    # VIEW_BENCHMARK_BUDGETS in settings, then a JSON file, override the defaults per metric
+    budgets = {name: dict(limits) for name, limits in VIEW_BUDGETS.items()}
+    overrides = [getattr(settings, 'VIEW_BENCHMARK_BUDGETS', {})]
+    if path:
+        with open(path) as handle:
+            overrides.append(json.load(handle))
+    for override in overrides:
+        for name, limits in override.items():
+            budgets.setdefault(name, {}).update(limits)
+    return budgets
+
+
+def response_size(response):
+    # Streaming responses are drained, so their queries and memory are measured too
+    if response.streaming:
+        size = sum(len(chunk) for chunk in response.streaming_content)
+        response.close()
+        return size
+    return len(response.content)
+
+
+def measure_view(client, url, method, data, repeat):
+    request = client.post if method == 'POST' else client.get
+    timings = []
+    queries = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = request(url, data)
+            size = response_size(response)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+
+    # Memory is traced in a separate request so tracing does not skew the timings.
+    # Only Python allocations are seen; SQLite's own page cache is not.
+    tracemalloc.start()
+    try:
+        response_size(request(url, data))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': response.status_code,
+        'bytes': size,
+        'queries': max(queries),
+        'queries_first': queries[0],
+        'ms': round(statistics.median(timings), 2),
+        'ms_first': round(timings[0], 2),
+        'ms_max': round(max(timings), 2),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def benchmark_views(user, views=BENCHMARK_VIEWS, repeat=3):
+    # Each view starts from a cold cache, so the first request pays for any regeneration
+    client = Client()
+    client.force_login(user)
+    results = {}
+    # Query logs are written inline, so the insert is counted against ai_query
+    with override_settings(QUERY_LOG_BUFFERED=False):
+        for name, url_name, method, data in views:
+            cache.clear()
+            results[name] = measure_view(client, reverse(url_name), method, data, repeat)
+    return results
+
+
+def budget_limit(limit, size):
+    return limit.get(size) if isinstance(limit, dict) else limit
+
+
+def budget_violations(size, results, budgets):
+    violations = []
+    for name, result in results.items():
+        if result['status'] != 200:
+            violations.append(f"{size} {name}: status {result['status']}")
+        for metric, limit in budgets.get(name, {}).items():
+            limit = budget_limit(limit, size)
+            if limit is not None and result[metric] > limit:
+                violations.append(f"{size} {name}: {metric} {result[metric]} > {limit}")
+    return violations
+
+
+@contextmanager
+def benchmark_test_database():
+    # Swaps the default database for a fresh, migrated test database, because the views
+    # always read from the default connection. A file rather than SQLite's in-memory test
+    # database, so timings include real I/O and each size starts empty.
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    directory = tempfile.mkdtemp()
+    test_settings['NAME'] = os.path.join(directory, 'view_benchmark.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+        os.rmdir(directory)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
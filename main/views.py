@@ -1,18 +1,41 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.models import User
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, FileResponse, Http404
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.db import transaction
 from django.db.models import Sum, Avg, Count, Q, F
 from django.utils import timezone
 from datetime import timedelta, datetime
 import json
 import random
 import time
-import csv
+import pytz
 from .models import *
 from .utils import *
-from .insta import sync_public_instagram_account
+from .stats import get_dashboard_stats, bucket_series, hourly_breakdown, pick_granularity, rollup_rows, rollup_series, summarize_rollups
+from .rollups import counted_posts, user_counted_posts
+from .pagination import paginate_posts, InvalidCursor, POST_CARD_FIELDS
+from .jobs import enqueue_sync, latest_job
+from .connectors import available_platforms, get_connector
+from .scheduler import store_fetch_result
+from .besttimes import best_times_for_user
+from .heatmap import posting_heatmap
+from .insights import refresh_insights
+from .versions import bump_data_version
+from .nlquery import answer_query
+from .querylog import log_query
+from .search import search_posts, SEARCH_LIMIT
+from .hashtags import top_user_hashtags
+from .viral import top_viral_posts, viral_prediction
+from .snapshots import post_velocity, VELOCITY_HOURS
+from .instrumentation import request_log
+from .profiling import profile_file
+from .exports import export_filters, export_posts, stream_csv, InvalidExportFilter, enqueue_export, export_file
 
 def register(request):
     if request.method == 'POST':
@@ -48,6 +71,11 @@ def user_logout(request):
     return redirect('login')
 
 
+def content_posts(account):
+    # Same posts the dashboard rollup counts, minus stories
+    return counted_posts(account).exclude(post_type='story')
+
+
 @login_required
 def dashboard(request):
     selected_account_id = request.session.get('selected_account_id')
@@ -71,37 +99,16 @@ def dashboard(request):
     
     request.session['selected_account_id'] = account.id
     
+    sync_job = None
     if account.platform == "instagram":
-        post_count = Post.objects.filter(account=account).count()
-        if post_count == 0:
-            try:
-                sync_public_instagram_account(
-                    username=account.username,
-                    user=request.user
-                )
-            except Exception as e:
-                print(f"❌ Instagram sync error: {e}")
+        sync_job = latest_job(account)
+        if sync_job is None and not Post.objects.filter(account=account).exists():
+            sync_job = enqueue_sync(account)
     
-    if account.platform == "instagram":
-        all_posts = Post.objects.filter(
-            account=account
-        ).exclude(
-            post_type='story'
-        ).filter(
-            post_id__isnull=False,
-            post_id__regex=r'^[A-Za-z0-9_-]{10,12}$'
-        )
-    else:
-        all_posts = Post.objects.filter(
-            account=account
-        ).exclude(post_type='story')
+    all_posts = content_posts(account)
     
     total_followers = account.followers_count or 0
-    total_posts = all_posts.count()
-    total_likes = all_posts.aggregate(Sum("likes"))["likes__sum"] or 0
-    total_comments = all_posts.aggregate(Sum("comments"))["comments__sum"] or 0
-    total_views = all_posts.aggregate(Sum("views"))["views__sum"] or 0
-    avg_engagement_rate = all_posts.aggregate(Avg("engagement_rate"))["engagement_rate__avg"] or 0
+    stats = get_dashboard_stats(account, days=7)
     
     top_posts = all_posts.order_by("-engagement_rate")[:5]
     
@@ -119,46 +126,115 @@ def dashboard(request):
         total_likes=Sum('likes')
     ).order_by('-avg_engagement')
     
-    daily_engagement = []
-    for i in range(6, -1, -1):
-        day = timezone.now() - timedelta(days=i)
-        day_posts = all_posts.filter(posted_at__date=day.date())
-        
-        daily_engagement.append({
-            "date": day.strftime("%Y-%m-%d"),
-            "engagement": (
-                (day_posts.aggregate(Sum("likes"))["likes__sum"] or 0) +
-                (day_posts.aggregate(Sum("comments"))["comments__sum"] or 0)
-            )
-        })
-    
     all_accounts = SocialAccount.objects.filter(
         user=request.user,
         is_active=True
     ).order_by('-created_at')
     
-    all_posts_display = all_posts.order_by('-posted_at')
+    posts, next_cursor = paginate_posts(all_posts)
     
     context = {
         "account": account,
         "all_accounts": all_accounts,
         "total_followers": total_followers,
-        "total_posts": total_posts,
-        "total_likes": total_likes,
-        "total_comments": total_comments,
-        "total_views": total_views,
-        "avg_engagement_rate": round(avg_engagement_rate, 2),
+        "total_posts": stats["total_posts"],
+        "total_likes": stats["total_likes"],
+        "total_comments": stats["total_comments"],
+        "total_views": stats["total_views"],
+        "avg_engagement_rate": round(stats["avg_engagement_rate"], 2),
         "top_posts": top_posts,
         "platform_stats": platform_stats,
         "post_type_performance": post_type_performance,
-        "daily_engagement": json.dumps(daily_engagement),
-        "all_posts": all_posts_display,
+        "daily_engagement": json.dumps(stats["daily_engagement"]),
+        "posts": posts,
+        "next_cursor": next_cursor,
+        "sync_job": sync_job,
         "insights": [],
     }
     
     return render(request, "dashboard.html", context)
 
 
+@login_required
+def post_feed(request):
+    account_id = request.GET.get('account_id') or request.session.get('selected_account_id')
+    try:
+        account_id = int(account_id) if account_id is not None else None
+    except ValueError:
+        return JsonResponse({'error': 'account_id must be an integer'}, status=400)
+    account = get_object_or_404(
+        SocialAccount,
+        id=account_id,
+        user=request.user,
+        is_active=True
+    )
+    
+    try:
+        posts, next_cursor = paginate_posts(
+            content_posts(account),
+            cursor=request.GET.get('cursor')
+        )
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse({
+        'posts': posts,
+        'html': render_to_string('post_cards.html', {'posts': posts}, request=request),
+        'next_cursor': next_cursor,
+    })
+
+
+@login_required
+def search_posts_view(request):
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = max(1, min(int(request.GET.get('limit', SEARCH_LIMIT)), 100))
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+    
+    posts = search_posts(request.user, query, limit=limit)
+    
+    return JsonResponse({
+        'query': query,
+        'posts': [
+            dict(
+                {field: getattr(post, field) for field in POST_CARD_FIELDS},
+                platform=post.platform,
+                score=round(post.score, 4),
+            )
+            for post in posts
+        ],
+    })
+
+
+@login_required
+def post_velocity_view(request, post_id):
+    post = get_object_or_404(Post, id=post_id, account__user=request.user)
+    try:
+        hours = int(request.GET.get('hours', VELOCITY_HOURS))
+    except ValueError:
+        return JsonResponse({'error': 'hours must be an integer'}, status=400)
+    if not 1 <= hours <= 24 * 90:
+        return JsonResponse({'error': 'hours must be between 1 and 2160'}, status=400)
+    
+    return JsonResponse(post_velocity(post, hours))
+
+
+@login_required
+def sync_status(request, job_id):
+    job = get_object_or_404(SyncJob, id=job_id, user=request.user)
+    
+    return JsonResponse({
+        'id': job.id,
+        'status': job.status,
+        'progress': job.progress,
+        'error': job.error,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    })
+
+
 @login_required
 def switch_account(request, account_id):
     account = SocialAccount.objects.filter(
@@ -175,11 +251,12 @@ def switch_account(request, account_id):
 
 @login_required
 def add_account(request):
-    platforms = ['instagram', 'twitter', 'facebook', 'youtube', 'tiktok']
+    platforms = available_platforms()
     
     if request.method == 'POST':
         platform = request.POST.get('platform', '').lower()
         username = request.POST.get('username', '').strip().replace('@', '')  # Remove @ if user adds it
+        audience_timezone = request.POST.get('audience_timezone', '').strip() or 'UTC'
         
         # Validation
         if not platform or not username:
@@ -194,6 +271,12 @@ def add_account(request):
                 'platforms': platforms
             })
         
+        if audience_timezone not in pytz.all_timezones_set:
+            return render(request, 'add_account.html', {
+                'error': f'Unknown timezone {audience_timezone}.',
+                'platforms': platforms
+            })
+        
         # Check for existing account
         existing = SocialAccount.objects.filter(
             user=request.user,
@@ -214,50 +297,22 @@ def add_account(request):
             platform=platform,
             username=username,
             followers_count=0,
+            audience_timezone=audience_timezone,
             is_active=True
         )
         
-        # Handle Instagram
+        # Handle Instagram in the background; the dashboard polls the job
         if platform == "instagram":
-            try:
-                synced_account = sync_public_instagram_account(
-                    username=username,
-                    user=request.user
-                )
-                
-                if synced_account:
-                    post_count = Post.objects.filter(account=synced_account).count()
-                    request.session['selected_account_id'] = synced_account.id
-                    
-                    # Redirect to dashboard on success instead of showing form again
-                    from django.contrib import messages
-                    messages.success(request, f'✅ Successfully synced @{username} from Instagram! Found {post_count} posts.')
-                    return redirect('dashboard')
-                else:
-                    account.delete()
-                    return render(request, 'add_account.html', {
-                        'error': f'❌ Could not find Instagram account @{username}. Make sure the account is public.',
-                        'platforms': platforms
-                    })
-                    
-            except Exception as e:
-                account.delete()
-                error_msg = str(e)
-                if "login" in error_msg.lower() or "private" in error_msg.lower():
-                    error_msg = f'Account @{username} is private or requires login. Please use a public Instagram account.'
-                else:
-                    error_msg = f'Error syncing @{username}: {error_msg}'
-                
-                return render(request, 'add_account.html', {
-                    'error': f'❌ {error_msg}',
-                    'platforms': platforms
-                })
+            enqueue_sync(account)
+            request.session['selected_account_id'] = account.id
+            
+            from django.contrib import messages
+            messages.success(request, f'⏳ Syncing @{username} from Instagram in the background...')
+            return redirect('dashboard')
         
-        # Handle other platforms
+        # Handle other platforms through their connector
         else:
-            account.followers_count = random.randint(1000, 50000)
-            account.save()
-            generate_sample_posts_for_platform(account)
+            store_fetch_result(account, get_connector(platform).fetch(username))
             
             request.session['selected_account_id'] = account.id
             
@@ -269,40 +324,6 @@ def add_account(request):
     return render(request, 'add_account.html', {
         'platforms': platforms
     })
-def generate_sample_posts_for_platform(account):
-    if account.platform == "instagram":
-        return
-    
-    post_types = ['photo', 'video', 'carousel']
-    sample_captions = [
-        "Check out our latest product! 🚀",
-        "Behind the scenes content 🎬",
-        "Thank you for all the support! ❤️",
-        "New blog post is live! 📝",
-        "Weekend vibes ✨",
-        "Excited to announce... 🎉",
-        "Throwback to this amazing moment 📸",
-        "Stay tuned for more updates! 👀",
-        "Loving this community! 🙌",
-        "What's your favorite? Comment below! 💬"
-    ]
-    
-    for i in range(15):
-        Post.objects.create(
-            account=account,
-            post_id=f"{account.platform}_{account.id}_{i}_{random.randint(1000, 9999)}",
-            post_type=random.choice(post_types),
-            caption=random.choice(sample_captions),
-            likes=random.randint(100, 10000),
-            comments=random.randint(10, 500),
-            shares=random.randint(5, 200),
-            views=random.randint(1000, 50000) if random.choice([True, False]) else 0,
-            engagement_rate=round(random.uniform(3, 15), 2),
-            posted_at=timezone.now() - timedelta(days=random.randint(1, 60)),
-            url=f"https://{account.platform}.com/p/{random.randint(100000, 999999)}"
-        )
-
-
 @login_required
 def delete_account(request, account_id):
     account = SocialAccount.objects.filter(
@@ -311,14 +332,18 @@ def delete_account(request, account_id):
     ).first()
     
     if account:
-        account.delete()
+        # The pre_delete handler takes the posts out of the hashtag stats in the same transaction
+        with transaction.atomic():
+            account.delete()
+            bump_data_version(request.user.id)
     
     return redirect('dashboard')
 
 @login_required
 def analytics(request):
     accounts = SocialAccount.objects.filter(user=request.user)
-    all_posts = Post.objects.filter(account__user=request.user)
+    # The same posts the rollup totals count, so the list and charts agree with them
+    all_posts = user_counted_posts(request.user)
     
     platform_filter = request.GET.get('platform')
     post_type_filter = request.GET.get('post_type')
@@ -332,59 +357,59 @@ def analytics(request):
     if post_type_filter:
         filtered_posts = filtered_posts.filter(post_type=post_type_filter)
     
-    date_threshold = timezone.now() - timedelta(days=int(date_range))
-    filtered_posts = filtered_posts.filter(posted_at__gte=date_threshold)
-    
-    engagement_over_time = []
     days = int(date_range)
-    for i in range(days):
-        day = timezone.now() - timedelta(days=i)
-        day_posts = filtered_posts.filter(posted_at__date=day.date())
-        engagement_over_time.append({
-            'date': day.strftime('%Y-%m-%d'),
-            'likes': day_posts.aggregate(total=Sum('likes'))['total'] or 0,
-            'comments': day_posts.aggregate(total=Sum('comments'))['total'] or 0,
-            'shares': day_posts.aggregate(total=Sum('shares'))['total'] or 0,
-        })
+    granularity = pick_granularity(days, request.GET.get('granularity'))
     
-    post_type_comparison = filtered_posts.values('post_type').annotate(
-        count=Count('id'),
-        avg_likes=Avg('likes'),
-        avg_comments=Avg('comments'),
-        avg_shares=Avg('shares'),
-        avg_engagement=Avg('engagement_rate')
+    # Rollups are keyed by local date, so raw posts start at the same local midnight
+    start_date = timezone.localdate() - timedelta(days=days)
+    date_threshold = timezone.make_aware(datetime.combine(start_date, datetime.min.time()))
+    filtered_posts = filtered_posts.filter(posted_at__gte=date_threshold)
+    
+    daily_stats = AccountDailyStats.objects.filter(
+        account__user=request.user,
+        date__gte=start_date
     )
+    if platform_filter:
+        daily_stats = daily_stats.filter(account__platform=platform_filter)
+    daily_rows = rollup_rows(daily_stats)
+    
+    post_types = [post_type_filter] if post_type_filter else None
+    summary = summarize_rollups(daily_rows, post_types=post_types)
+    
+    # Rollups are daily, so only the hourly view has to touch raw posts
+    if granularity == 'hour':
+        engagement_over_time = bucket_series(
+            filtered_posts,
+            start=date_threshold,
+            granularity=granularity
+        )
+    else:
+        engagement_over_time = rollup_series(
+            daily_rows,
+            start=start_date,
+            granularity=granularity,
+            post_types=post_types
+        )
     
-    top_hashtags = Hashtag.objects.filter(
-        posthashtag__post__account__user=request.user
-    ).annotate(
-        uses=Count('posthashtag'),
-        avg_eng=Avg('posthashtag__post__engagement_rate')
-    ).order_by('-avg_eng')[:10]
-    
-    hourly_performance = []
-    for hour in range(24):
-        hour_posts = filtered_posts.filter(posted_at__hour=hour)
-        hourly_performance.append({
-            'hour': hour,
-            'avg_engagement': hour_posts.aggregate(avg=Avg('engagement_rate'))['avg'] or 0,
-            'count': hour_posts.count()
-        })
+    top_hashtags = top_user_hashtags(request.user)
+    
+    hourly_performance = hourly_breakdown(filtered_posts)
     
     display_posts = filtered_posts.order_by('-posted_at')[:50]
     
     context = {
         'accounts': accounts,
         'posts': display_posts,
-        'total_posts': filtered_posts.count(),
-        'avg_engagement': filtered_posts.aggregate(avg=Avg('engagement_rate'))['avg'] or 0,
-        'engagement_over_time': json.dumps(engagement_over_time[::-1]),
-        'post_type_comparison': post_type_comparison,
+        'total_posts': summary['total_posts'],
+        'avg_engagement': summary['avg_engagement'],
+        'engagement_over_time': json.dumps(engagement_over_time),
+        'post_type_comparison': summary['post_type_comparison'],
         'top_hashtags': top_hashtags,
         'hourly_performance': json.dumps(hourly_performance),
         'selected_platform': platform_filter,
         'selected_post_type': post_type_filter,
         'selected_date_range': date_range,
+        'selected_granularity': granularity,
     }
     
     return render(request, 'analytics.html', context)
@@ -395,19 +420,23 @@ def ai_query(request):
         query = request.POST.get('query')
         start_time = time.time()
         
-        response = process_natural_language_query(request.user, query)
+        response, intent, cache_hit = answer_query(request.user, query)
         
         execution_time = time.time() - start_time
         
-        QueryLog.objects.create(
+        # Buffered and written in batches off the request path
+        log_query(
             user=request.user,
             query=query,
             response=response,
+            intent=intent,
             execution_time=execution_time
         )
         
         return JsonResponse({
             'response': response,
+            'intent': intent,
+            'cache_hit': cache_hit,
             'execution_time': round(execution_time, 2)
         })
     
@@ -426,7 +455,7 @@ def insights(request):
         insight.save()
         return JsonResponse({'status': 'success'})
     
-    generate_ai_insights(request.user)
+    refresh_insights(request.user)
     
     context = {
         'insights': all_insights,
@@ -437,17 +466,8 @@ def insights(request):
 
 @login_required
 def best_time_to_post(request):
-    accounts = SocialAccount.objects.filter(user=request.user)
-    
-    best_times = []
-    for account in accounts:
-        times = calculate_best_posting_times(account)
-        best_times.append({
-            'account': account,
-            'times': times
-        })
-    
-    heatmap_data = generate_posting_heatmap(request.user)
+    best_times = best_times_for_user(request.user)
+    heatmap_data = posting_heatmap(request.user)
     
     context = {
         'best_times': best_times,
@@ -476,45 +496,99 @@ def competitor_analysis(request):
 
 @login_required
 def viral_predictor(request):
-    all_posts = Post.objects.filter(account__user=request.user).order_by('-posted_at')[:50]
-    
-    predictions = []
-    for post in all_posts:
-        viral_score = calculate_viral_score(post)
-        predictions.append({
-            'post': post,
-            'viral_score': viral_score,
-            'prediction': 'High' if viral_score > 75 else 'Medium' if viral_score > 50 else 'Low'
-        })
-    
-    predictions.sort(key=lambda x: x['viral_score'], reverse=True)
+    predictions = [
+        {
+            'post': analytics.post,
+            'viral_score': analytics.viral_score,
+            'prediction': viral_prediction(analytics.viral_score)
+        }
+        for analytics in top_viral_posts(request.user)
+    ]
     
     context = {
-        'predictions': predictions[:20],
+        'predictions': predictions,
     }
     
     return render(request, 'viral_predictor.html', context)
 
 @login_required
 def export_report(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="social_analytics_report.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Post ID', 'Platform', 'Type', 'Likes', 'Comments', 'Shares', 'Engagement Rate', 'Posted At'])
-    
-    posts = Post.objects.filter(account__user=request.user).order_by('-posted_at')
-    
-    for post in posts:
-        writer.writerow([
-            post.post_id,
-            post.account.platform,
-            post.post_type,
-            post.likes,
-            post.comments,
-            post.shares,
-            f"{post.engagement_rate:.2f}%",
-            post.posted_at.strftime('%Y-%m-%d %H:%M')
-        ])
-    
-    return response
\ No newline at end of file
+    try:
+        filters = export_filters(request.GET)
+    except InvalidExportFilter as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    compress = request.GET.get('gzip') in ('1', 'true', 'yes')
+    
+    posts = export_posts(request.user, filters)
+    
+    # Streamed in chunks so memory stays flat however many posts there are
+    response = StreamingHttpResponse(
+        stream_csv(posts, compress=compress),
+        content_type='application/gzip' if compress else 'text/csv'
+    )
+    filename = 'social_analytics_report.csv.gz' if compress else 'social_analytics_report.csv'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def export_job_data(job):
+    return {
+        'id': job.id,
+        'format': job.format,
+        'status': job.status,
+        'incremental': job.since is not None,
+        'since': job.since,
+        'until': job.until,
+        'rows_written': job.rows_written,
+        'total_rows': job.total_rows,
+        'bytes_written': job.bytes_written,
+        'error': job.error,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+        'download_url': reverse('download_export', args=[job.id]) if job.status == 'success' else None,
+    }
+
+@login_required
+def create_export(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    
+    export_format = request.POST.get('format', 'ndjson')
+    if export_format not in dict(ExportJob.FORMAT_CHOICES):
+        return JsonResponse({'error': 'format must be ndjson, parquet or csv'}, status=400)
+    incremental = request.POST.get('incremental') in ('1', 'true', 'yes')
+    
+    job = enqueue_export(request.user, format=export_format, incremental=incremental)
+    return JsonResponse(export_job_data(job), status=202)
+
+@login_required
+def export_status(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id, user=request.user)
+    return JsonResponse(export_job_data(job))
+
+@login_required
+def download_export(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id, user=request.user, status='success')
+    path = export_file(job)
+    if not path.exists():
+        raise Http404("Export file is no longer available")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
+
+@staff_member_required
+def request_profiles(request):
+    context = {
+        'enabled': getattr(settings, 'SQL_INSTRUMENTATION', False),
+        'entries': request_log.recent(limit=100),
+        'recorded': request_log.recorded,
+    }
+    
+    return render(request, 'request_profiles.html', context)
+
+@staff_member_required
+def download_profile(request, profile_id):
+    profile = get_object_or_404(RequestProfile, id=profile_id)
+    path = profile_file(profile)
+    if not path.exists():
+        raise Http404("Profile file is missing")
+    
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
\ No newline at end of file
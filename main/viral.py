@@ -0,0 +1,96 @@
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from .models import Post, PostAnalytics
+
+# Keeps each chunk's post_id__in under SQLite's default bound-parameter limit
+SCORE_CHUNK_SIZE = 900
+
+# (threshold, points) per metric, highest first; a post earns the first tier it exceeds
+LIKES_TIERS = [(1000, 30), (500, 20), (100, 10)]
+ENGAGEMENT_TIERS = [(8, 25), (5, 15), (3, 10)]
+SHARES_TIERS = [(100, 20), (50, 15), (20, 10)]
+COMMENTS_TIERS = [(100, 15), (50, 10), (20, 5)]
+RECENT_SECONDS = 86400
+RECENT_POINTS = 10
+MAX_SCORE = 100
+
+
+def tier_points(values, tiers):
+    return np.select([values > threshold for threshold, _ in tiers], [points for _, points in tiers], 0)
+
+
+def viral_scores(likes, engagement_rate, shares, comments, age_seconds):
+    # All arguments are equal-length arrays; returns one score per post
+    score = (
+        tier_points(likes, LIKES_TIERS)
+        + tier_points(engagement_rate, ENGAGEMENT_TIERS)
+        + tier_points(shares, SHARES_TIERS)
+        + tier_points(comments, COMMENTS_TIERS)
+        + np.where(age_seconds < RECENT_SECONDS, RECENT_POINTS, 0)
+    )
+    return np.minimum(score, MAX_SCORE).astype(np.float64)
+
+
+def viral_prediction(score):
+    return 'High' if score > 75 else 'Medium' if score > 50 else 'Low'
+
+
+def store_scores(rows, now):
+    ids, users, likes, engagement_rate, shares, comments, posted_at = zip(*rows)
+    scores = viral_scores(
+        np.array(likes, dtype=np.int64),
+        np.array(engagement_rate, dtype=np.float64),
+        np.array(shares, dtype=np.int64),
+        np.array(comments, dtype=np.int64),
+        np.array([(now - value).total_seconds() for value in posted_at]),
+    )
+    scores = dict(zip(ids, scores.tolist()))
+    owners = dict(zip(ids, users))
+
+    # No savepoint when called inside the writer's transaction
+    with transaction.atomic(savepoint=False):
+        to_update = []
+        missing = set(scores)
+        for analytics in PostAnalytics.objects.filter(post_id__in=ids).only('id', 'post_id', 'user_id', 'viral_score'):
+            post_id = analytics.post_id
+            missing.discard(post_id)
+            if (analytics.viral_score, analytics.user_id) != (scores[post_id], owners[post_id]):
+                analytics.viral_score = scores[post_id]
+                analytics.user_id = owners[post_id]
+                to_update.append(analytics)
+
+        PostAnalytics.objects.bulk_update(to_update, ['viral_score', 'user'], batch_size=SCORE_CHUNK_SIZE)
+        PostAnalytics.objects.bulk_create([
+            PostAnalytics(post_id=post_id, user_id=owners[post_id], viral_score=scores[post_id])
+            for post_id in sorted(missing)
+        ], batch_size=SCORE_CHUNK_SIZE)
+    return len(scores)
+
+
+def score_posts(posts, chunk_size=SCORE_CHUNK_SIZE):
+    # Scores a Post queryset in vectorized chunks and stores the result on PostAnalytics.
+    # Posts without an analytics row (e.g. synced ones) get one. Returns the number of posts scored.
+    now = timezone.now()
+    rows = posts.order_by('id').values_list('id', 'account__user_id', 'likes', 'engagement_rate', 'shares', 'comments', 'posted_at')
+    scored = 0
+    last_id = 0
+    while True:
+        # Keyset pages, so no read cursor stays open while the chunk is written
+        chunk = list(rows.filter(id__gt=last_id)[:chunk_size])
+        if chunk:
+            scored += store_scores(chunk, now)
+        if len(chunk) < chunk_size:
+            return scored
+        last_id = chunk[-1][0]
+
+
+def score_user_posts(user):
+    return score_posts(Post.objects.filter(account__user=user))
+
+
+def top_viral_posts(user, limit=20):
+    # Served straight from the viral_score index rather than scoring on request
+    return PostAnalytics.objects.filter(
+        user=user
+    ).select_related('post__account').order_by('-viral_score', '-id')[:limit]
@@ -41,12 +41,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main.instrumentation.SQLInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'main.profiling.ProfilingMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -124,3 +126,13 @@ STATIC_URL = '/static/'
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Per-request SQL and timing profiles (see /debug/requests/). Off by default; when off the
+# middleware removes itself at startup.
+SQL_INSTRUMENTATION = False
+
+# Staff can profile any request with ?profile=1 (saved .prof files are listed in the admin).
+# Set PROFILE_SAMPLE_RATE above 0 to also profile that fraction of requests and keep the
+# ones slower than PROFILE_SLOW_MS.
+PROFILE_SAMPLE_RATE = 0.0
+PROFILE_SLOW_MS = 1000
@@ -5,6 +5,10 @@ from main import views
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.dashboard, name='dashboard'),
+    path('posts/', views.post_feed, name='post_feed'),
+    path('search/', views.search_posts_view, name='search_posts'),
+    path('posts/<int:post_id>/velocity/', views.post_velocity_view, name='post_velocity'),
+    path('sync-status/<int:job_id>/', views.sync_status, name='sync_status'),
     path('register/', views.register, name='register'),
     path('login/', views.user_login, name='login'),
     path('logout/', views.user_logout, name='logout'),
@@ -16,6 +20,11 @@ urlpatterns = [
     path('competitor/', views.competitor_analysis, name='competitor'),
     path('viral-predictor/', views.viral_predictor, name='viral_predictor'),
     path('export-report/', views.export_report, name='export_report'),
+    path('exports/', views.create_export, name='create_export'),
+    path('exports/<int:job_id>/', views.export_status, name='export_status'),
+    path('exports/<int:job_id>/download/', views.download_export, name='download_export'),
+    path('debug/requests/', views.request_profiles, name='request_profiles'),
+    path('debug/profiles/<int:profile_id>/download/', views.download_profile, name='download_profile'),
     path('delete-account/', views.delete_account, name='delete_account'),
     path('switch-account/', views.switch_account, name='switch_account'),
 